@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify, Response, stream_with_context
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -8,6 +8,7 @@ from urllib.parse import urljoin
 from typing import List, Dict
 import time
 import os
+import json
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, AnyUrl
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
@@ -16,7 +17,6 @@ from selenium import webdriver
 
 from webdriver_manager.chrome import ChromeDriverManager
 from langchain_community.vectorstores import FAISS  
-from langchain_community.document_loaders import UnstructuredURLLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
@@ -28,18 +28,56 @@ from flask_cors import CORS
 from flask import Flask, request, jsonify
 from langchain_core.documents.base import Document
 from typing import Optional
+from src.config.config import Config
+from src.services.embedding_cache import create_embeddings
+from src.services.vector_store import VectorStoreService
+from src.services.llm_service import LLMService
+from src.services.main_service import MainService
+from werkzeug.local import LocalProxy
+from werkzeug.serving import is_running_from_reloader
 
 # Load environment variables
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 MODEL = os.getenv("MODEL")
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
+
+# The services of the app serving the current request, see create_app
+main_service: MainService = LocalProxy(lambda: current_app.extensions['main_service'])
+vector_store_service: VectorStoreService = LocalProxy(lambda: main_service.vector_store)
 
-# Initialize LLM and embeddings
-llm = ChatGoogleGenerativeAI(model=MODEL)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+def create_app(service: Optional[MainService] = None) -> Flask:
+    """Build the Flask app
+    
+    Importing this module and building the app start nothing, so importing
+    it from tests, spawned processes or the ASGI app has no side effects.
+    Whoever serves the app starts the background jobs of its service, see
+    the __main__ block and asgi.py.
+    
+    Args:
+        service: Service behind the routes; defaults to one using the
+            Gemini model and the cached embeddings
+    """
+    if service is None:
+        llm = ChatGoogleGenerativeAI(model=MODEL)
+        service = MainService(vector_store=VectorStoreService(create_embeddings()), llm_service=LLMService(llm))
+    app = Flask(__name__)
+    CORS(app)
+    app.extensions['main_service'] = service
+    app.register_blueprint(api)
+    return app
+
+def wants_job() -> bool:
+    """Whether the client asked for the request to run as a background job"""
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def job_accepted(job_type: str, params: Dict):
+    """Queue a background job and answer 202 with where to follow it"""
+    job = main_service.jobs.submit(job_type, params)
+    response = jsonify({'job_id': job['id'], 'status': job['status'], 'status_url': f"/jobs/{job['id']}"})
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response, 202
 
 # Pydantic models
 class UrlClassify(BaseModel):
@@ -108,11 +146,6 @@ def extract_nav_urls(homepage_url: str) -> List[str]:
         if driver:
             driver.quit()
 
-# Initialize classifiers
-web_classifier = llm.with_structured_output(UrlClassify)
-retriever_selector = llm.with_structured_output(SelectRetriverRatio)
-prod_format_llm = llm.with_structured_output(List_product)
-
 # def serialize_url_classify(url_classify: UrlClassify) -> dict:
 #     """Convert UrlClassify object to JSON serializable dictionary"""
 #     return {
@@ -122,7 +155,7 @@ prod_format_llm = llm.with_structured_output(List_product)
 
 
 # Routes
-# @app.route('/extract-urls', methods=['POST'])
+# @api.route('/extract-urls', methods=['POST'])
 # def extract_urls():
 #     try:
 #         data = request.get_json()
@@ -140,7 +173,7 @@ prod_format_llm = llm.with_structured_output(List_product)
 #         return jsonify({'error': str(e)}), 500
     
 
-@app.route('/update-url-classification', methods=['POST'])
+@api.route('/update-url-classification', methods=['POST'])
 def update_url_classification():
     try:
         data = request.get_json()
@@ -159,7 +192,7 @@ def update_url_classification():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process-desc-urls', methods=['POST'])
+@api.route('/process-desc-urls', methods=['POST'])
 def process_desc_urls():
     try:
         data = request.get_json()
@@ -168,24 +201,17 @@ def process_desc_urls():
         if not urls:
             return jsonify({'error': 'URLs are required'}), 400
             
-        desc_loader = UnstructuredURLLoader(urls=urls)
-        desc_data = desc_loader.load()
-        
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        final_desc_data = splitter.split_documents(desc_data)
-        
-        # Create and save vector store
-        desc_vectorstore = FAISS.from_documents(
-            documents=final_desc_data,
-            embedding=embeddings
-        )
-        desc_vectorstore.save_local("vectors/description_index")
+        if wants_job():
+            return job_accepted('process-desc-urls', {'urls': urls})
+            
+        # Only pages changed since the last crawl are re-processed; their chunks replace the old ones
+        counters = main_service.process_description_urls(urls)
         
-        return jsonify({'message': 'Description URLs processed successfully'})
+        return jsonify({'message': 'Description URLs processed successfully', **counters})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process-product-urls', methods=['POST'])
+@api.route('/process-product-urls', methods=['POST'])
 def process_product_urls():
     try:
         data = request.get_json()
@@ -194,23 +220,21 @@ def process_product_urls():
         if not urls:
             return jsonify({'error': 'URLs are required'}), 400
             
-        prod_loader = UnstructuredURLLoader(urls=urls)
-        prod_data = prod_loader.load()
-        
-        splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=0)
-        final_prod_data = splitter.split_documents(prod_data)
-        
-        product_info = []
-        for docs in final_prod_data[:10]:
-            product_info.append(prod_format_llm.invoke(docs.page_content))
+        if wants_job():
+            return job_accepted('process-product-urls', {'urls': urls})
             
-        result = reduce(lambda x, y: List_product(products=x.products + y.products), product_info)
+        # Only pages changed since the last crawl are sent to the LLM; their products replace the old ones
+        products, failed_chunks = main_service.process_product_urls(urls)
         
-        return jsonify({'products': [dict(prod) for prod in result.products]})
+        return jsonify({
+            'message': 'Product URLs processed successfully',
+            'products': products,
+            'failed_chunks': failed_chunks
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process-desc-text', methods=['POST'])
+@api.route('/process-desc-text', methods=['POST'])
 def process_desc_text():
     try:
         data = request.get_json()
@@ -232,15 +256,15 @@ def process_desc_text():
         # Create and save vector store
         desc_vectorstore = FAISS.from_documents(
             documents=split_docs,
-            embedding=embeddings
+            embedding=vector_store_service.embeddings
         )
-        desc_vectorstore.save_local("vectors/description_index")
+        vector_store_service.save_vector_store(desc_vectorstore, "description_index")
         
         return jsonify({'message': 'Description text processed successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/process-product-text', methods=['POST'])
+@api.route('/process-product-text', methods=['POST'])
 def process_product_text():
     try:
         data = request.get_json()
@@ -249,53 +273,25 @@ def process_product_text():
         if not text or len(text.strip()) < 50:
             return jsonify({'error': 'Text content is required and must be at least 50 characters'}), 400
             
-        # Create a Document from the text
-        doc = Document(
-            page_content=text,
-            metadata={"type": "product", "source": "direct_input"}
+        # Extract product information from every chunk using the LLM
+        products, failed_chunks = main_service.extract_product_text(
+            text,
+            chunk_size=Config.PRODUCT_TEXT_CHUNK_SIZE,
+            chunk_overlap=Config.PRODUCT_TEXT_CHUNK_OVERLAP
         )
         
-        # Split the document
-        splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=100)
-        split_docs = splitter.split_documents([doc])
-        
-        # Extract product information using the LLM
-        product_info = []
-        for doc in split_docs[:3]:  # Limit to first 3 chunks to avoid timeouts
-            product_info.append(prod_format_llm.invoke(doc.page_content))
-            
-        # Combine results
-        if product_info:
-            result = reduce(lambda x, y: List_product(products=x.products + y.products), product_info)
-            
-            # Store in vector store
+        if products:
+            # Add new documents to the vector store
             product_docs = [Document(
-                page_content=str(dict(prod)),
+                page_content=str(prod),
                 metadata={"type": "product", "source": "direct_input"}
-            ) for prod in result.products]
-            
-            try:
-                # Try to load existing vector store
-                product_vectorstore = FAISS.load_local(
-                    "vectors/product_info_index", 
-                    embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                # Add new documents
-                product_vectorstore.add_documents(product_docs)
-            except Exception:
-                # If loading fails, create new vector store
-                product_vectorstore = FAISS.from_documents(
-                    documents=product_docs,
-                    embedding=embeddings
-                )
-                
-            # Save vector store
-            product_vectorstore.save_local("vectors/product_info_index")
+            ) for prod in products]
+            vector_store_service.add_documents(product_docs, "product_info_index")
             
             return jsonify({
                 'message': 'Product text processed successfully',
-                'products': [dict(prod) for prod in result.products]
+                'products': products,
+                'failed_chunks': failed_chunks
             })
         else:
             return jsonify({'error': 'No product information could be extracted'}), 400
@@ -317,7 +313,7 @@ def process_product_text():
 #         vector_store.save_local(store_path)
 #     return FAISS.load_local(store_path, embeddings, allow_dangerous_deserialization=True)
 
-def initialize_vector_stores():
+def initialize_vector_stores(embeddings):
     """Initialize vector stores if they don't exist"""
     os.makedirs('vectors', exist_ok=True)
     
@@ -337,26 +333,34 @@ def initialize_vector_stores():
 
 
 
-@app.route('/view-all-products', methods=['GET'])
+def get_page_args():
+    """Read pagination arguments from the query string
+    
+    Any query parameter other than cursor and limit is used as a metadata filter.
+    """
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', default=Config.LIST_PAGE_SIZE, type=int)
+    filters = {
+        key: value for key, value in request.args.items()
+        if key not in ('cursor', 'limit')
+    }
+    return cursor, limit, filters or None
+
+@api.route('/view-all-products', methods=['GET'])
 def view_all_products():
     try:
-        # Load the product vector store
+        cursor, limit, filters = get_page_args()
+        
+        # Walk the product docstore directly, one page at a time
         try:
-            product_vectorstore = FAISS.load_local(
-                "vectors/product_info_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
+            all_docs, next_cursor = vector_store_service.list_documents(
+                "product_info_index", cursor=cursor, limit=limit, filters=filters
             )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to load product vector store: {str(e)}'}), 500
         
-        # Since FAISS doesn't have a built-in method to get all documents,
-        # we'll use a very general query that should match most products
-        all_docs = product_vectorstore.similarity_search(
-            "product information", 
-            k=100  # Adjust this number based on how many products you expect to have
-        )
-        
         products = []
         for doc in all_docs:
             # Skip the initialization document
@@ -379,14 +383,15 @@ def view_all_products():
         
         return jsonify({
             'message': f'Successfully retrieved {len(products)} products',
-            'products': products
+            'products': products,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
 # Add these new routes to your existing Flask application
 
-@app.route('/add-product', methods=['POST'])
+@api.route('/add-product', methods=['POST'])
 def add_product():
     try:
         data = request.get_json()
@@ -411,42 +416,23 @@ def add_product():
             page_content=str(dict(product)),
             metadata={
                 "type": "product",
-                "product_id": data.get('product_id', str(time.time())),  # Use provided ID or generate timestamp-based ID
+                "doc_id": data.get('product_id', str(time.time())),  # Use provided ID or generate timestamp-based ID
                 "name": product.name  # Store name in metadata for easier lookup
             }
         )
         
-        try:
-            # Load existing vector store
-            product_vectorstore = FAISS.load_local(
-                "vectors/product_info_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-        except Exception:
-            # If loading fails, initialize new vector store
-            empty_doc = Document(
-                page_content="Initialization document",
-                metadata={"type": "init"}
-            )
-            product_vectorstore = FAISS.from_documents(
-                documents=[empty_doc],
-                embedding=embeddings
-            )
-        
         # Add new document to vector store
-        product_vectorstore.add_documents([doc])
-        product_vectorstore.save_local("vectors/product_info_index")
+        vector_store_service.add_documents([doc], "product_info_index")
         
         return jsonify({
             'message': 'Product added successfully',
             'product': dict(product),
-            'product_id': doc.metadata.get('product_id')
+            'product_id': doc.metadata.get('doc_id')
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/remove-product', methods=['POST'])
+@api.route('/remove-product', methods=['POST'])
 def remove_product():
     try:
         data = request.get_json()
@@ -458,62 +444,21 @@ def remove_product():
         if not product_id and not product_name:
             return jsonify({'error': 'Either product_id or name must be provided'}), 400
             
+        # Find documents to remove through the metadata index; names are
+        # indexed from the metadata or, failing that, the product content
         try:
-            # Load existing vector store
-            product_vectorstore = FAISS.load_local(
-                "vectors/product_info_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
+            if product_id:
+                ids_to_remove = vector_store_service.find_ids("product_info_index", "doc_id", product_id)
+            else:
+                ids_to_remove = vector_store_service.find_ids("product_info_index", "name", product_name)
         except Exception as e:
             return jsonify({'error': f'Failed to load product vector store: {str(e)}'}), 500
         
-        # Access the document store directly
-        docstore = product_vectorstore.docstore
-        ids_to_remove = []
-        
-        # Find documents to remove
-        for doc_id, doc in docstore._dict.items():
-            # Skip initialization document
-            if doc.metadata.get("type") == "init":
-                continue
-                
-            # Match by product_id if provided
-            if product_id and doc.metadata.get("product_id") == product_id:
-                ids_to_remove.append(doc_id)
-            
-            # Match by name if provided and no product_id match yet
-            elif product_name and not product_id:
-                if doc.metadata.get("name") == product_name:
-                    ids_to_remove.append(doc_id)
-                else:
-                    # Try to match by parsing the content
-                    try:
-                        import ast
-                        product_dict = ast.literal_eval(doc.page_content)
-                        if product_dict.get("name") == product_name:
-                            ids_to_remove.append(doc_id)
-                    except Exception:
-                        # If parsing fails, continue to next document
-                        continue
-        
         if not ids_to_remove:
             return jsonify({'error': 'No matching product found'}), 404
         
-        # Create a new FAISS index without the documents to remove
-        new_docs = []
-        for doc_id, doc in docstore._dict.items():
-            if doc_id not in ids_to_remove:
-                new_docs.append(doc)
-        
-        # Create a new vector store with the remaining documents
-        new_vectorstore = FAISS.from_documents(
-            documents=new_docs,
-            embedding=embeddings
-        )
-        
-        # Save the new vector store
-        new_vectorstore.save_local("vectors/product_info_index")
+        # Drop the matching vectors from the existing index and save it
+        vector_store_service.remove_documents_by_ids(ids_to_remove, "product_info_index")
         
         return jsonify({
             'message': f'Successfully removed {len(ids_to_remove)} product(s)',
@@ -529,7 +474,7 @@ def serialize_url_classify(url_classify: UrlClassify) -> dict:
         'product_service_urls': [str(url) for url in url_classify.product_service_urls]
     }
 
-# @app.route('/update-product', methods=['POST'])
+# @api.route('/update-product', methods=['POST'])
 # def update_product():
 #     try:
 #         data = request.get_json()
@@ -563,7 +508,7 @@ def serialize_url_classify(url_classify: UrlClassify) -> dict:
 #     except Exception as e:
 #         return jsonify({'error': str(e)}), 500
 
-@app.route('/extract-urls', methods=['POST'])
+@api.route('/extract-urls', methods=['POST'])
 def extract_urls():
     try:
         data = request.get_json()
@@ -571,8 +516,11 @@ def extract_urls():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
             
+        if wants_job():
+            return job_accepted('extract-urls', {'url': url})
+            
         nav_urls = extract_nav_urls(url)
-        classified_urls = web_classifier.invoke(str(nav_urls))
+        classified_urls = main_service.llm_service.classify_urls(nav_urls)
         
         response_data = serialize_url_classify(classified_urls)
         return jsonify(response_data)
@@ -581,7 +529,7 @@ def extract_urls():
 
 
 
-# @app.route('/update-product', methods=['POST'])
+# @api.route('/update-product', methods=['POST'])
 # def update_product():
 #     try:
 #         data = request.get_json()
@@ -625,7 +573,7 @@ def extract_urls():
 
 
 # API for updating, adding, or removing description documents
-# @app.route('/manage-description', methods=['POST'])
+# @api.route('/manage-description', methods=['POST'])
 # def manage_description():
 #     try:
 #         data = request.get_json()
@@ -778,25 +726,21 @@ def extract_urls():
 #         return jsonify({'error': str(e)}), 500
     
     # New API for viewing all description documents
-@app.route('/view-all-descriptions', methods=['GET'])
+@api.route('/view-all-descriptions', methods=['GET'])
 def view_all_descriptions():
     try:
-        # Load the description vector store
+        cursor, limit, filters = get_page_args()
+        
+        # Walk the description docstore directly, one page at a time
         try:
-            desc_vectorstore = FAISS.load_local(
-                "vectors/description_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
+            all_docs, next_cursor = vector_store_service.list_documents(
+                "description_index", cursor=cursor, limit=limit, filters=filters
             )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Failed to load description vector store: {str(e)}'}), 500
         
-        # Use a general query to match most descriptions
-        all_docs = desc_vectorstore.similarity_search(
-            "company information", 
-            k=100  # Adjust based on expected number of documents
-        )
-        
         descriptions = []
         for doc in all_docs:
             # Skip the initialization document
@@ -812,14 +756,15 @@ def view_all_descriptions():
         
         return jsonify({
             'message': f'Successfully retrieved {len(descriptions)} description documents',
-            'descriptions': descriptions
+            'descriptions': descriptions,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 # API for adding a description document
-@app.route('/add-description', methods=['POST'])
+@api.route('/add-description', methods=['POST'])
 def add_description():
     try:
         data = request.get_json()
@@ -833,24 +778,6 @@ def add_description():
         # Create a unique ID for the document
         doc_id = data.get('doc_id', str(time.time()))
         
-        # Load existing vector store
-        try:
-            desc_vectorstore = FAISS.load_local(
-                "vectors/description_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-        except Exception:
-            # If loading fails, initialize new vector store
-            empty_doc = Document(
-                page_content="Initialization document",
-                metadata={"type": "init"}
-            )
-            desc_vectorstore = FAISS.from_documents(
-                documents=[empty_doc],
-                embedding=embeddings
-            )
-        
         # Create a Document from the text
         doc = Document(
             page_content=text,
@@ -864,8 +791,7 @@ def add_description():
         )
         
         # Add document to vector store
-        desc_vectorstore.add_documents([doc])
-        desc_vectorstore.save_local("vectors/description_index")
+        vector_store_service.add_documents([doc], "description_index")
         
         return jsonify({
             'message': 'Description document added successfully',
@@ -876,7 +802,7 @@ def add_description():
 
 
 # API for removing a description document
-@app.route('/remove-description', methods=['POST'])
+@api.route('/remove-description', methods=['POST'])
 def remove_description():
     try:
         data = request.get_json()
@@ -885,37 +811,17 @@ def remove_description():
         if not doc_id:
             return jsonify({'error': 'Document ID is required for removal'}), 400
         
-        # Load existing vector store
+        # Find the document to remove through the metadata index
         try:
-            desc_vectorstore = FAISS.load_local(
-                "vectors/description_index", 
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
+            ids_to_remove = vector_store_service.find_ids("description_index", "doc_id", doc_id)
         except Exception:
             return jsonify({'error': 'Vector store not found'}), 404
         
-        # Find the document to remove
-        docstore = desc_vectorstore.docstore
-        found = False
-        
-        # Create a new list of documents excluding the one to remove
-        new_docs = []
-        for curr_id, doc in docstore._dict.items():
-            if doc.metadata.get("doc_id") == doc_id:
-                found = True
-                continue
-            new_docs.append(doc)
-        
-        if not found:
+        if not ids_to_remove:
             return jsonify({'error': f'Document with ID {doc_id} not found'}), 404
         
-        # Create a new vector store and save it
-        new_vectorstore = FAISS.from_documents(
-            documents=new_docs,
-            embedding=embeddings
-        )
-        new_vectorstore.save_local("vectors/description_index")
+        # Drop the matching vectors from the existing index and save it
+        vector_store_service.remove_documents_by_ids(ids_to_remove, "description_index")
         
         return jsonify({
             'message': f'Document {doc_id} removed successfully'
@@ -934,7 +840,7 @@ def remove_description():
 #     except Exception as e:
 #         print(f"Warning: Could not initialize vector stores: {e}")
 
-@app.route('/chatbot', methods=['POST'])
+@api.route('/chatbot', methods=['POST'])
 def chatbot():
     try:
         data = request.get_json()
@@ -943,50 +849,121 @@ def chatbot():
         if not query:
             return jsonify({'error': 'Query is required'}), 400
             
-        # Get ratio for retriever selection
-        ratio = retriever_selector.invoke(query).ratio
+        # Route the query and search both stores concurrently, then answer
+        result = main_service.get_chatbot_response_with_timings(query)
         
-        # Load vector stores
-        prod_vector = FAISS.load_local(
-            "vectors/product_info_index", 
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-        desc_vector = FAISS.load_local(
-            "vectors/description_index", 
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-        
-        # Calculate number of documents to retrieve from each store
-        num_desc_docs = int((1 - ratio) * 10)
-        num_prod_docs = 10 - num_desc_docs
-        
-        # Retrieve documents
-        desc_docs = desc_vector.as_retriever().get_relevant_documents(query)[:num_desc_docs]
-        prod_docs = prod_vector.as_retriever().get_relevant_documents(query)[:num_prod_docs]
-        
-        documents = desc_docs + prod_docs
-        
-        # Create prompt and get response
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "Act as Customer Support Manager"),
-            ("user", "Your task is to respond to the following customer query: {query}\n"
-                    "Provide the most relevant information based on the query and keep the message on point short and well formated.\n"
-                    "You have access to the following documents: {documents}")
-        ])
-        
-        chain = prompt_template | llm
-        response = chain.invoke({"query": query, "documents": documents})
-        
-        return jsonify({'response': response.content})
+        return jsonify({
+            'response': result['response'],
+            'timings': result['timings'],
+            'cache': result['cache'],
+            'context': result['context']
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    """Format a server-sent event with a JSON payload"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@api.route('/chatbot/stream', methods=['GET', 'POST'])
+def chatbot_stream():
+    """Stream the chatbot answer as server-sent events
+
+    Each chunk is sent as a default event {"token": ...}; the stream ends with
+    a "done" event carrying the timings, cache status and context report, or
+    an "error" event.
+    """
+    if request.method == 'POST':
+        query = (request.get_json(silent=True) or {}).get('query')
+    else:
+        query = request.args.get('query')
+        
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+        
+    def generate():
+        result = {}
+        try:
+            for token in main_service.stream_chatbot_response(query, result):
+                yield sse_event({'token': token})
+            yield sse_event(
+                {'timings': result['timings'], 'cache': result['cache'], 'context': result['context']},
+                event='done'
+            )
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/chatbot/batch', methods=['POST'])
+def chatbot_batch():
+    """Answer a list of queries, streaming one JSON line per answer as it completes
+
+    Lines carry the position of their query in "index", so they may arrive
+    in any order; a failed query gets an "error" line instead.
+    """
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q for q in queries):
+        return jsonify({'error': 'Queries must be a non-empty list of strings'}), 400
+    if len(queries) > Config.CHAT_BATCH_MAX_QUERIES:
+        return jsonify({'error': f'At most {Config.CHAT_BATCH_MAX_QUERIES} queries per batch'}), 400
+        
+    def generate():
+        try:
+            for result in main_service.batch_chatbot_responses(queries):
+                yield json.dumps(result) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+            
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List background jobs, newest first, optionally filtered by ?status="""
+    status = request.args.get('status')
+    limit = request.args.get('limit', default=Config.LIST_PAGE_SIZE, type=int)
+    
+    if status is not None and status not in main_service.jobs.STATUSES:
+        return jsonify({'error': f'Status must be one of {", ".join(main_service.jobs.STATUSES)}'}), 400
+    if limit < 1 or limit > Config.MAX_PAGE_SIZE:
+        return jsonify({'error': f'Limit must be between 1 and {Config.MAX_PAGE_SIZE}'}), 400
+        
+    return jsonify({'jobs': main_service.jobs.list_jobs(status, limit)})
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report the status, progress counters and, once finished, the result of a job"""
+    job = main_service.jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@api.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = main_service.jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 if __name__ == '__main__':
+    app = create_app()
+    service = app.extensions['main_service']
+    
     # Create vectors directory if it doesn't exist
-
     os.makedirs('vectors', exist_ok=True)
-    initialize_vector_stores()
+    initialize_vector_stores(service.vector_store.embeddings)
+    
+    # The debug reloader runs this block in the process watching for code
+    # changes as well; only the process serving requests runs background jobs
+    if is_running_from_reloader():
+        # Resume background jobs left queued or interrupted by an earlier run
+        service.jobs.start()
 
     app.run(debug=True)
\ No newline at end of file
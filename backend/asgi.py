@@ -0,0 +1,116 @@
+"""ASGI entry point serving the chat routes on an event loop
+
+The chat routes are served natively with the async MainService methods, so
+a request waiting on the embedding or LLM API holds no thread and one worker
+can keep hundreds of chats in flight. Every other route is forwarded to the
+Flask app in app.py, so the API is the same as under `python app.py`.
+
+Usage (from the backend directory):
+
+    uvicorn asgi:create_app --factory --host 0.0.0.0 --port 5000
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from app import create_app as create_flask_app, sse_event
+from src.services.main_service import MainService
+
+
+def create_app(main_service: Optional[MainService] = None, wsgi_app=None) -> Starlette:
+    """Build the ASGI app
+
+    The background jobs of main_service are started when the server starts
+    the app and stopped when it shuts down.
+
+    Args:
+        main_service: Service answering chat queries; defaults to the one
+            app.create_app builds
+        wsgi_app: WSGI app serving the remaining routes; defaults to the
+            Flask app built by app.create_app for main_service, pass False
+            to serve the chat routes only
+    """
+    if wsgi_app is None:
+        wsgi_app = create_flask_app(main_service)
+        main_service = wsgi_app.extensions['main_service']
+    elif main_service is None:
+        main_service = create_flask_app().extensions['main_service']
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        # Resume background jobs left queued or interrupted by an earlier run
+        main_service.jobs.start()
+        try:
+            yield
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, main_service.jobs.close)
+
+    async def chatbot(request: Request) -> JSONResponse:
+        try:
+            query = (await request.json() or {}).get('query')
+        except ValueError:
+            query = None
+
+        if not query:
+            return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+        try:
+            result = await main_service.aget_chatbot_response_with_timings(query)
+
+            return JSONResponse({
+                'response': result['response'],
+                'timings': result['timings'],
+                'cache': result['cache'],
+                'context': result['context']
+            })
+        except Exception as e:
+            return JSONResponse({'error': str(e)}, status_code=500)
+
+    async def chatbot_stream(request: Request):
+        """Stream the chatbot answer as server-sent events, like /chatbot/stream in app.py"""
+        if request.method == 'POST':
+            try:
+                query = (await request.json() or {}).get('query')
+            except ValueError:
+                query = None
+        else:
+            query = request.query_params.get('query')
+
+        if not query:
+            return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+        async def generate():
+            result = {}
+            try:
+                async for token in main_service.astream_chatbot_response(query, result):
+                    yield sse_event({'token': token})
+                yield sse_event(
+                    {'timings': result['timings'], 'cache': result['cache'], 'context': result['context']},
+                    event='done'
+                )
+            except Exception as e:
+                yield sse_event({'error': str(e)}, event='error')
+
+        return StreamingResponse(
+            generate(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    routes = [
+        Route('/chatbot', chatbot, methods=['POST']),
+        Route('/chatbot/stream', chatbot_stream, methods=['GET', 'POST']),
+    ]
+    if wsgi_app:
+        routes.append(Mount('/', app=WSGIMiddleware(wsgi_app)))
+    return Starlette(
+        routes=routes,
+        lifespan=lifespan,
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+    )
@@ -0,0 +1,98 @@
+"""Compare the recall and latency of the configurable FAISS index types
+
+Builds each index type over synthetic clustered vectors and measures
+recall@k against the exact flat index together with single-query latency.
+
+Usage (from the backend directory):
+
+    python -m scripts.ann_benchmark
+    python -m scripts.ann_benchmark --sizes 10000 100000 --dim 768 --nprobe 32 --ef-search 128
+"""
+import argparse
+import math
+import time
+from typing import Dict
+import faiss
+import numpy as np
+from src.services.ann_index import IVF_TRAINING_POINTS_PER_LIST, build_index, index_kind
+
+
+def make_vectors(rng: np.random.Generator, n: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    """Sample vectors around cluster centers, like embeddings of related pages"""
+    labels = rng.integers(len(centers), size=n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * 0.5
+    return (centers[labels] + noise).astype(np.float32)
+
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int) -> Dict[str, object]:
+    """Search queries one at a time and collect results and latencies"""
+    results = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[i] = ids[0]
+    return {
+        "results": results,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99))
+    }
+
+
+def recall_at_k(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(results, truth))
+    return hits / truth.size
+
+
+def run(args: argparse.Namespace) -> None:
+    k = args.k
+    rng = np.random.default_rng(args.seed)
+    print(f"{'index':<46}{'vectors':>10}{'build s':>10}{'recall@' + str(k):>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for n in args.sizes:
+        centers = rng.standard_normal((max(16, n // 1000), args.dim), dtype=np.float32)
+        vectors = make_vectors(rng, n, args.dim, centers)
+        queries = make_vectors(rng, args.queries, args.dim, centers)
+        # IVF falls back to flat below nlist * IVF_TRAINING_POINTS_PER_LIST vectors
+        nlist = args.nlist or min(int(4 * math.sqrt(n)), n // IVF_TRAINING_POINTS_PER_LIST)
+        specs = [
+            {"type": "flat"},
+            {"type": "ivf", "nlist": nlist, "nprobe": args.nprobe},
+            {"type": "hnsw", "M": args.m, "efConstruction": args.ef_construction, "efSearch": args.ef_search},
+        ]
+        truth = None
+        for spec in specs:
+            start = time.perf_counter()
+            index = build_index(spec, vectors)
+            build_seconds = time.perf_counter() - start
+            stats = measure(index, queries, k)
+            if truth is None:
+                truth = stats["results"]
+            label = ", ".join(f"{key}={value}" for key, value in spec.items() if key != "type")
+            name = f"{index_kind(index)} ({label})" if label else index_kind(index)
+            print(
+                f"{name:<46}{n:>10}{build_seconds:>10.1f}"
+                f"{recall_at_k(stats['results'], truth):>12.3f}{stats['p50']:>10.3f}{stats['p99']:>10.3f}"
+            )
+            del index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=128,
+                        help="Vector dimension; text-embedding-004 produces 768")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: 4 * sqrt(n), capped by the training size)")
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--m", type=int, default=32, help="HNSW neighbours per node")
+    parser.add_argument("--ef-construction", type=int, default=40)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
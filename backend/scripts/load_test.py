@@ -0,0 +1,139 @@
+"""Compare chat throughput of the thread-per-request and async code paths
+
+Both paths answer the same queries against fake embedding and LLM backends
+that only sleep, so the numbers show how many chats can wait on the APIs at
+once rather than how fast the APIs are. The threaded run calls
+MainService.get_chatbot_response from a fixed pool of threads, like the
+Flask server; the async run posts every query to /chatbot on the ASGI app in
+asgi.py from a single event loop.
+
+Usage (from the backend directory):
+
+    python -m scripts.load_test
+    python -m scripts.load_test --requests 1000 --threads 32 --llm-latency 1.0
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+import httpx
+import numpy as np
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.config.config import Config
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings whose query calls take latency seconds"""
+
+    latency: float = 0.05
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class SlowChatModel(BaseChatModel):
+    """Fake chat model that answers after latency seconds"""
+
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    @staticmethod
+    def _result() -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Thanks for your question."))])
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+def report(name: str, latencies: List[float], elapsed: float) -> None:
+    print(f"{name:<10}{len(latencies):>10}{elapsed:>10.2f}{len(latencies) / elapsed:>12.1f}"
+          f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}")
+
+
+def run_threaded(main_service: Any, queries: List[str], threads: int) -> None:
+    def ask(query: str) -> float:
+        start = time.perf_counter()
+        main_service.get_chatbot_response(query)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(ask, queries))
+    report(f"threads={threads}", latencies, time.perf_counter() - start)
+
+
+async def run_async(app: Any, queries: List[str]) -> None:
+    async def ask(client: httpx.AsyncClient, query: str) -> float:
+        start = time.perf_counter()
+        response = await client.post("/chatbot", json={"query": query})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(ask(client, query) for query in queries))
+    report("asgi", latencies, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="Chat requests per run")
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads of the threaded run")
+    parser.add_argument("--documents", type=int, default=200, help="Documents per store")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per fake query embedding")
+    args = parser.parse_args()
+
+    # Throwaway stores, distinct queries and no answer cache, so every request does the full work
+    Config.VECTOR_STORE_PATH = tempfile.mkdtemp(prefix="load-test-")
+    Config.ANSWER_CACHE_ENABLED = False
+    # The fake model has no structured output, so the local router must always decide
+    Config.ROUTER_MODE = "local"
+    Config.ROUTER_MIN_MARGIN = 0.0
+
+    from asgi import create_app
+    from src.services.llm_service import LLMService
+    from src.services.main_service import MainService
+    from src.services.vector_store import VectorStoreService
+
+    vector_store = VectorStoreService(SlowEmbeddings(size=64, latency=args.embedding_latency))
+    vector_store.add_documents(
+        [Document(page_content=f"About the shop, page {i}") for i in range(args.documents)],
+        Config.DESCRIPTION_INDEX_NAME
+    )
+    vector_store.add_documents(
+        [Document(page_content=str({"name": f"Product {i}", "price": i})) for i in range(args.documents)],
+        Config.PRODUCT_INDEX_NAME
+    )
+    main_service = MainService(vector_store=vector_store, llm_service=LLMService(SlowChatModel(latency=args.llm_latency)))
+
+    print(f"{'run':<10}{'requests':>10}{'seconds':>10}{'req/s':>12}{'p50 s':>10}{'p99 s':>10}")
+    run_threaded(main_service, [f"threaded question {i}" for i in range(args.requests)], args.threads)
+    asyncio.run(run_async(create_app(main_service, wsgi_app=False),
+                          [f"async question {i}" for i in range(args.requests)]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Merge the product and description stores into the unified store
+
+Every document is copied with its stored vector, so nothing is re-embedded,
+and its metadata "type" is set to the type of the store it came from. The
+source stores are left untouched. Set Config.UNIFIED_INDEX = True afterwards
+to serve from the unified store.
+
+Usage (from the backend directory):
+
+    python -m scripts.migrate_unified_index
+    python -m scripts.migrate_unified_index --force   # replace an existing unified store
+"""
+import argparse
+import os
+from langchain_community.vectorstores import FAISS
+from src.config.config import Config
+from src.services.ann_index import reconstruct_all
+from src.services.sqlite_docstore import fetch_documents
+from src.services.vector_store import VectorStoreService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="Replace the unified store if it already exists")
+    args = parser.parse_args()
+
+    unified_path = os.path.join(Config.VECTOR_STORE_PATH, Config.UNIFIED_INDEX_NAME)
+    if os.path.exists(os.path.join(unified_path, "index.faiss")) and not args.force:
+        parser.error(f"{unified_path} already exists; pass --force to replace it")
+
+    # Read the physical source stores even if unified mode is already enabled
+    Config.UNIFIED_INDEX = False
+    service = VectorStoreService()
+
+    text_embeddings, metadatas, ids = [], [], []
+    for store_name, doc_type in Config.STORE_TYPES.items():
+        vector_store = service.get_vector_store(store_name)
+        rows = sorted(vector_store.index_to_docstore_id)
+        store_ids = [vector_store.index_to_docstore_id[row] for row in rows]
+        documents = fetch_documents(vector_store.docstore, store_ids)
+        # Removed HNSW entries leave rows without a docstore id in the index
+        vectors = reconstruct_all(vector_store.index)[rows]
+        copied = 0
+        for store_id, doc, vector in zip(store_ids, documents, vectors):
+            if doc is None or doc.metadata.get("type") == "init":
+                continue
+            text_embeddings.append((doc.page_content, vector.tolist()))
+            metadatas.append({**doc.metadata, "type": doc_type})
+            ids.append(store_id)
+            copied += 1
+        print(f"{store_name}: {copied} documents as type '{doc_type}'")
+
+    if not text_embeddings:
+        print("Nothing to migrate; the unified store is created empty on first use")
+        return
+
+    unified = FAISS.from_embeddings(text_embeddings, service.embeddings, metadatas=metadatas, ids=ids)
+    service.save_vector_store(unified, Config.UNIFIED_INDEX_NAME)
+    print(f"Wrote {len(ids)} documents to {unified_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,16 @@ class Config:
     VECTOR_STORE_PATH = "vectors"
     PRODUCT_INDEX_NAME = "product_info_index"
     DESCRIPTION_INDEX_NAME = "description_index"
+
+    # Unified mode keeps products and descriptions in one store, told apart by the
+    # "type" metadata of each document; the index names above become logical views.
+    # Merge existing stores with: python -m scripts.migrate_unified_index
+    UNIFIED_INDEX = False
+    UNIFIED_INDEX_NAME = "unified_index"
+    STORE_TYPES = {
+        PRODUCT_INDEX_NAME: "product",
+        DESCRIPTION_INDEX_NAME: "description",
+    }
     
     # Chrome options
     CHROME_OPTIONS = [
@@ -23,7 +33,114 @@ class Config:
     
     # Vector store settings
     MAX_SEARCH_RESULTS = 100
+    LIST_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 100
     PRODUCT_CHUNK_SIZE = 5000
-    PRODUCT_CHUNK_OVERLAP = 0 
\ No newline at end of file
+    PRODUCT_CHUNK_OVERLAP = 0
+    # Pasted product text (/process-product-text) is split into smaller chunks
+    PRODUCT_TEXT_CHUNK_SIZE = 2000
+    PRODUCT_TEXT_CHUNK_OVERLAP = 100
+
+    # Mutation journal: checkpoint after this many seconds or bytes of unsaved changes
+    JOURNAL_FLUSH_INTERVAL = 5.0
+    JOURNAL_MAX_BYTES = 16 * 1024 * 1024
+
+    # Docstore backend: "sqlite" keeps document content out of index.pkl, "memory" pickles it
+    DOCSTORE_BACKEND = "sqlite"
+
+    # Open saved FAISS indexes memory-mapped and read-only, so server workers share
+    # the OS page cache and start without reading index.faiss into the heap
+    INDEX_MMAP = False
+
+    # Nearest neighbour index per store. "flat" is an exact scan; "ivf" takes
+    # nlist/nprobe and stays flat until the store holds nlist * 39 vectors to
+    # train on; "hnsw" takes M/efConstruction/efSearch. A store whose index no
+    # longer matches its entry is rebuilt from its stored vectors on load.
+    DEFAULT_INDEX_TYPE = {"type": "flat"}
+    INDEX_TYPES = {
+        PRODUCT_INDEX_NAME: {"type": "flat"},
+        DESCRIPTION_INDEX_NAME: {"type": "flat"},
+        UNIFIED_INDEX_NAME: {"type": "flat"},
+    }
+    # HNSW cannot remove vectors: deleted rows stay in the graph as tombstones that
+    # searches skip, and the index is rebuilt without them once they make up this
+    # fraction of it
+    HNSW_MAX_TOMBSTONE_RATIO = 0.2
+
+    # URL ingestion: pages are downloaded over pooled keep-alive connections, at most
+    # FETCH_MAX_CONCURRENCY at once and FETCH_PER_HOST_CONCURRENCY per host, with
+    # FETCH_RETRIES retries (exponential backoff) on connection errors, 429 and 5xx;
+    # the HTML is parsed in PARSE_WORKERS processes
+    FETCH_MAX_CONCURRENCY = 16
+    FETCH_PER_HOST_CONCURRENCY = 4
+    FETCH_TIMEOUT = 20
+    FETCH_RETRIES = 3
+    FETCH_BACKOFF = 0.5
+    PARSE_WORKERS = os.cpu_count() or 2
+    # Product extraction: every chunk is sent to the LLM, EXTRACTION_CONCURRENCY at a
+    # time; a failing chunk is tried EXTRACTION_ATTEMPTS times and then skipped
+    EXTRACTION_CONCURRENCY = 8
+    EXTRACTION_ATTEMPTS = 2
+    # Description ingestion streams pages through fetch -> split -> embed -> index
+    # stages joined by queues of at most PIPELINE_QUEUE_SIZE items; chunks are
+    # embedded and committed in batches of up to PIPELINE_BATCH_SIZE
+    PIPELINE_QUEUE_SIZE = 4
+    PIPELINE_BATCH_SIZE = 64
+    # Crawl manifest: the ETag, Last-Modified and content hashes of every ingested
+    # page, so re-crawls request pages conditionally and only re-process changed ones
+    CRAWL_MANIFEST_PATH = os.path.join("data", "database", "crawl_manifest.sqlite")
+    # Background jobs: ingestion requests sent with "Prefer: respond-async" are queued
+    # in JOB_DB_PATH and run by JOB_WORKERS threads per server process. A running job
+    # whose process stopped heartbeating for JOB_LEASE seconds is queued again, up to
+    # JOB_MAX_ATTEMPTS runs in all; finished jobs are kept for JOB_RETENTION seconds
+    JOB_DB_PATH = os.path.join("data", "database", "jobs.sqlite")
+    JOB_WORKERS = 2
+    JOB_POLL_INTERVAL = 1.0
+    JOB_LEASE = 60
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETENTION = 7 * 24 * 3600
+
+    # Chat retrieval: documents passed to the answer, split between the stores by the router ratio
+    CHAT_CONTEXT_DOCS = 10
+    RETRIEVAL_WORKERS = 16
+    # "local" splits the context by comparing how well each store matches the query
+    # and asks the LLM only when the margin is too small; "llm" always asks the LLM
+    ROUTER_MODE = "local"
+    ROUTER_TOP_N = 3
+    ROUTER_TEMPERATURE = 0.05
+    ROUTER_MIN_MARGIN = 0.02
+    # Answer context: documents are deduplicated, ordered by MMR and packed into this
+    # many prompt tokens (estimated at CONTEXT_CHARS_PER_TOKEN characters each)
+    CONTEXT_TOKEN_BUDGET = 2000
+    CONTEXT_CHARS_PER_TOKEN = 4
+    CONTEXT_MMR_LAMBDA = 0.7
+    CONTEXT_DUPLICATE_SIMILARITY = 0.97
+    # Hybrid retrieval: BM25 keyword hits are fused with vector hits by reciprocal
+    # rank (1 / (RRF_K + rank)); queries made only of SKU/model-number-like terms
+    # are answered from the keyword index without embedding them
+    HYBRID_SEARCH = True
+    RRF_K = 60
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    # Batch chat: at most this many answers are generated at once, from at most
+    # CHAT_BATCH_MAX_QUERIES questions per request
+    CHAT_BATCH_CONCURRENCY = 8
+    CHAT_BATCH_MAX_QUERIES = 5000
+    # Recent query embeddings kept in memory so a repeated query skips the embedding API
+    QUERY_EMBEDDING_CACHE_SIZE = 256
+
+    # Chatbot answer cache: exact or near-identical queries (cosine similarity of
+    # their embeddings at or above the threshold) reuse an answer until it expires
+    # or either store changes
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_MAX_ENTRIES = 1000
+    ANSWER_CACHE_TTL = 3600
+    ANSWER_CACHE_SIMILARITY = 0.95
+
+    # Embedding settings
+    EMBEDDING_MODEL = "models/text-embedding-004"
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_PATH = os.path.join("data", "database", "embedding_cache.sqlite")
+    EMBEDDING_CACHE_MAX_ENTRIES = 200000 
\ No newline at end of file
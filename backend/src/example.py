@@ -17,7 +17,7 @@ def main():
             
         # Process product URLs
         if classified_urls['product_service_urls']:
-            products = service.process_product_urls(classified_urls['product_service_urls'])
+            products, _ = service.process_product_urls(classified_urls['product_service_urls'])
             print("Processed products:", products)
             
         # Example: Add a product directly
@@ -0,0 +1,135 @@
+from typing import Any, Dict, Optional
+import faiss
+import numpy as np
+
+# IVF needs about this many training vectors per list for stable centroids
+IVF_TRAINING_POINTS_PER_LIST = 39
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Get the configured index type name of a FAISS index"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def target_kind(spec: Dict[str, Any], ntotal: int) -> str:
+    """Get the index type to use for a store of ntotal vectors
+
+    An IVF store stays flat until it holds enough vectors to train on.
+    """
+    kind = spec.get("type", "flat")
+    if kind == "ivf" and ntotal < spec.get("nlist", 1024) * IVF_TRAINING_POINTS_PER_LIST:
+        return "flat"
+    if kind not in ("flat", "ivf", "hnsw"):
+        raise ValueError(f"Unknown index type: {kind}")
+    return kind
+
+
+def needs_rebuild(index: faiss.Index, spec: Dict[str, Any]) -> bool:
+    """Check whether an index differs in type or structure from its spec"""
+    kind = target_kind(spec, index.ntotal)
+    if index_kind(index) != kind:
+        return True
+    if kind == "ivf":
+        return index.nlist != spec.get("nlist", 1024)
+    if kind == "hnsw":
+        # Levels above 0 keep M neighbours per node
+        return index.hnsw.nb_neighbors(1) != spec.get("M", 32)
+    return False
+
+
+def apply_search_params(index: faiss.Index, spec: Dict[str, Any]) -> None:
+    """Set the query-time parameters of a spec on an index
+
+    IVF indexes also get a direct map, which reconstructing single rows needs.
+    """
+    kind = index_kind(index)
+    if kind == "ivf":
+        index.nprobe = spec.get("nprobe", 16)
+        if index.direct_map.type == faiss.DirectMap.NoMap:
+            index.make_direct_map()
+    elif kind == "hnsw":
+        index.hnsw.efSearch = spec.get("efSearch", 64)
+
+
+def row_limit_params(index: faiss.Index, rows: int) -> faiss.SearchParameters:
+    """Get search parameters that only consider the first rows of an index
+
+    The query-time parameters set on the index are kept.
+    """
+    selector = faiss.IDSelectorRange(0, rows)
+    kind = index_kind(index)
+    if kind == "ivf":
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """Get every stored vector in row order"""
+    if not index.ntotal:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def build_index(spec: Dict[str, Any], vectors: np.ndarray, template: Optional[faiss.Index] = None) -> faiss.Index:
+    """Build an index of the type in spec holding vectors in row order
+
+    Args:
+        spec: Index settings, e.g. {"type": "ivf", "nlist": 1024, "nprobe": 16}
+        vectors: float32 matrix of shape (n, d)
+        template: Existing index whose trained IVF centroids may be reused
+
+    Returns:
+        The populated index with its search parameters applied
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    kind = target_kind(spec, len(vectors))
+    if kind == "ivf":
+        if template is not None and index_kind(template) == "ivf" and template.nlist == spec.get("nlist", 1024):
+            index = faiss.clone_index(template)
+            index.reset()
+        else:
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, spec.get("nlist", 1024))
+            index.train(vectors)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec.get("M", 32))
+        index.hnsw.efConstruction = spec.get("efConstruction", 40)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if len(vectors):
+        index.add(vectors)
+    apply_search_params(index, spec)
+    return index
+
+
+def remove_rows(index: faiss.Index, rows: Any) -> None:
+    """Remove rows from a flat or IVF index and renumber the rest to stay contiguous
+
+    A flat index shifts later rows down itself. An IVF index keeps the kept
+    vectors in their inverted lists, so nothing is re-assigned to centroids;
+    only the ids stored in the lists are shifted down past the removed rows.
+    Either way the remaining rows keep their order.
+    """
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    if index_kind(index) == "flat":
+        index.remove_ids(rows)
+        return
+    # An array direct map cannot remove ids; it is rebuilt once the ids are renumbered
+    index.make_direct_map(False)
+    index.remove_ids(rows)
+    invlists = index.invlists
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+        shifted = np.ascontiguousarray(ids - np.searchsorted(rows, ids), dtype=np.int64)
+        codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), size * invlists.code_size).copy()
+        invlists.update_entries(list_no, 0, size, faiss.swig_ptr(shifted), faiss.swig_ptr(codes))
+    index.make_direct_map()
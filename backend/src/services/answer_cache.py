@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+class _CachedAnswer:
+    def __init__(self, vector: Optional[np.ndarray], response: str, generations: Tuple[int, ...]):
+        self.vector = vector
+        self.response = response
+        self.generations = generations
+        self.created_at = time.time()
+
+
+class AnswerCache:
+    """In-memory cache of chatbot answers keyed by query
+
+    A query hits when its normalized text matches a cached query exactly, or
+    when its embedding has cosine similarity of at least similarity_threshold
+    with a cached query's (answers cached without a vector only hit exactly).
+    Each answer remembers the generations of the stores it was retrieved
+    from and is dropped as soon as any of them changes, so answers never
+    outlive the content they were built from.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, _CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked unit vectors of the entries, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_fresh(self, entry: _CachedAnswer, generations: Tuple[int, ...]) -> bool:
+        return entry.generations == generations and time.time() - entry.created_at < self.ttl
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        self._matrix = None
+
+    def get_exact(self, query: str, generations: Tuple[int, ...]) -> Optional[str]:
+        """Get the cached answer of an identical query
+
+        Args:
+            query: User query
+            generations: Current generations of the stores answers are retrieved from
+        """
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_fresh(entry, generations):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def get_similar(self, vector: List[float], generations: Tuple[int, ...]) -> Optional[str]:
+        """Get the cached answer of the most similar query above the threshold"""
+        query_vector = self._unit(vector)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if not self._is_fresh(entry, generations)]:
+                self._drop(key)
+            if self._matrix is None:
+                self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+                if not self._matrix_keys:
+                    return None
+                self._matrix = np.stack([self._entries[key].vector for key in self._matrix_keys])
+            similarities = self._matrix @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            return self._entries[key].response
+
+    def put(self, query: str, vector: Optional[List[float]], response: str, generations: Tuple[int, ...]) -> None:
+        """Cache the answer to a query, evicting the least recently used answers"""
+        key = self.normalize(query)
+        unit = self._unit(vector) if vector is not None else None
+        with self._lock:
+            self._entries[key] = _CachedAnswer(unit, response, generations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
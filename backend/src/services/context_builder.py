@@ -0,0 +1,178 @@
+import ast
+import math
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.documents.base import Document
+
+
+class PackedContext:
+    """Context text for the answer prompt with the documents it was built from
+
+    report holds the document counts and the estimated prompt tokens before
+    packing (the repr of the documents the prompt used to receive) and after.
+    """
+
+    def __init__(self, text: str, documents: List[Document], report: Dict[str, int]):
+        self.text = text
+        self.documents = documents
+        self.report = report
+
+
+class ContextBuilder:
+    """Assemble retrieved documents into a compact context for the answer prompt
+
+    Documents are rendered without metadata, exact duplicates are dropped,
+    the overlap between neighbouring chunks is trimmed, near-duplicates are
+    dropped by vector similarity, and the rest is ordered by maximal
+    marginal relevance and packed until the token budget is spent.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        mmr_lambda: float = 0.7,
+        duplicate_similarity: float = 0.97,
+        min_overlap: int = 20,
+        max_overlap: int = 400,
+        chars_per_token: int = 4
+    ):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_similarity = duplicate_similarity
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+        self.chars_per_token = chars_per_token
+
+    def estimate_tokens(self, text: str) -> int:
+        """Estimate the prompt tokens of a text from its length"""
+        return math.ceil(len(text) / self.chars_per_token)
+
+    @staticmethod
+    def render(doc: Document) -> str:
+        """Render a document as plain text without metadata
+
+        Products stored as a dict repr are rendered as "field: value" lines
+        with empty fields left out.
+        """
+        text = doc.page_content.strip()
+        if doc.metadata.get("type") == "product" and text.startswith("{"):
+            try:
+                product = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                return text
+            if isinstance(product, dict):
+                return "\n".join(f"{key}: {value}" for key, value in product.items() if value not in (None, ""))
+        return text
+
+    def _overlap(self, head: str, tail: str) -> int:
+        """Get the length of the longest suffix of head that starts tail"""
+        limit = min(len(head), len(tail), self.max_overlap)
+        for size in range(limit, self.min_overlap - 1, -1):
+            if head.endswith(tail[:size]):
+                return size
+        return 0
+
+    @staticmethod
+    def _unit(vector: Any) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _mmr_order(self, query_vector: Any, vectors: List[np.ndarray]) -> List[int]:
+        """Order candidates by maximal marginal relevance, dropping near-duplicates"""
+        query = self._unit(query_vector)
+        matrix = np.stack([self._unit(vector) for vector in vectors])
+        relevance = matrix @ query
+        similarity = matrix @ matrix.T
+        order: List[int] = []
+        remaining = list(range(len(vectors)))
+        while remaining:
+            def score(i: int) -> float:
+                redundancy = max((similarity[i, j] for j in order), default=0.0)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+            best = max(remaining, key=score)
+            remaining.remove(best)
+            if any(similarity[best, j] >= self.duplicate_similarity for j in order):
+                continue
+            order.append(best)
+        return order
+
+    def build(
+        self,
+        documents: List[Document],
+        query_vector: Optional[List[float]] = None,
+        doc_vectors: Optional[Dict[str, Any]] = None
+    ) -> PackedContext:
+        """Pack retrieved documents into the token budget
+
+        Args:
+            documents: Retrieved documents, most relevant first
+            query_vector: Embedded query, used for MMR ordering
+            doc_vectors: Stored vectors keyed by document id, used for MMR
+                ordering and near-duplicate removal
+
+        Returns:
+            The packed context and a report of the tokens saved
+        """
+        candidates: List[Document] = []
+        texts: List[str] = []
+        seen = set()
+        for doc in documents:
+            if doc.metadata.get("type") == "init":
+                continue
+            text = self.render(doc)
+            key = " ".join(text.lower().split())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            candidates.append(doc)
+            texts.append(text)
+
+        # Trim the text adjacent chunks of one page share through the splitter overlap
+        for i in range(len(texts)):
+            for j in range(i):
+                size = self._overlap(texts[j], texts[i])
+                if size:
+                    texts[i] = texts[i][size:].lstrip()
+                    continue
+                size = self._overlap(texts[i], texts[j])
+                if size:
+                    texts[i] = texts[i][:-size].rstrip()
+
+        order = list(range(len(candidates)))
+        doc_vectors = doc_vectors or {}
+        if query_vector is not None and candidates and all(doc.id in doc_vectors for doc in candidates):
+            order = self._mmr_order(query_vector, [doc_vectors[doc.id] for doc in candidates])
+
+        parts: List[str] = []
+        used: List[Document] = []
+        remaining = self.token_budget
+        for i in order:
+            if not texts[i]:
+                continue
+            part = f"- {texts[i]}"
+            tokens = self.estimate_tokens(part) + 1
+            if tokens > remaining:
+                # Fill what is left of the budget with the start of the next document
+                chars = (remaining - 1) * self.chars_per_token
+                if chars < 200:
+                    break
+                part = part[:chars].rsplit(" ", 1)[0] + " ..."
+                tokens = remaining
+            parts.append(part)
+            used.append(candidates[i])
+            remaining -= tokens
+            if remaining <= 0:
+                break
+
+        text = "\n\n".join(parts)
+        tokens_before = self.estimate_tokens(str(documents))
+        tokens_after = self.estimate_tokens(text)
+        report = {
+            "documents_in": len(documents),
+            "documents_used": len(used),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after
+        }
+        return PackedContext(text, used, report)
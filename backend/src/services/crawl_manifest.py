@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+
+def content_hash(content: Union[bytes, str]) -> str:
+    """Hash a page body or its extracted text"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class CrawlManifest:
+    """On-disk record of what was last ingested from each URL, per store
+
+    Each entry keeps the ETag and Last-Modified validators the server sent,
+    so the page can be requested conditionally, the hash of the response
+    body and of its extracted text, so a page whose server ignores
+    conditional requests is still recognised as unchanged, and how many
+    documents the page produced.
+    """
+
+    FIELDS = ("etag", "last_modified", "content_hash", "text_hash", "documents")
+
+    # SQLite limits the number of bound parameters per statement
+    _BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "store TEXT NOT NULL, url TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+                "content_hash TEXT, text_hash TEXT, documents INTEGER NOT NULL DEFAULT 0, "
+                "crawled_at REAL NOT NULL, PRIMARY KEY (store, url))"
+            )
+
+    def get_many(self, store_name: str, urls: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+        """Look up the entries of the given URLs that were ingested into a store"""
+        found = {}
+        columns = ", ".join(self.FIELDS)
+        with self._lock:
+            for start in range(0, len(urls), self._BATCH_SIZE):
+                batch = urls[start:start + self._BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT url, {columns} FROM pages WHERE store = ? AND url IN ({placeholders})",
+                    [store_name, *batch]
+                ).fetchall()
+                for url, *values in rows:
+                    found[url] = dict(zip(self.FIELDS, values))
+        return found
+
+    def put_many(self, store_name: str, entries: Dict[str, Dict[str, Optional[str]]]) -> None:
+        """Record the entries of pages that were ingested into a store, keyed by URL"""
+        if not entries:
+            return
+        now = time.time()
+        rows = [
+            (store_name, url, *(entry.get(field) for field in self.FIELDS[:-1]), entry.get("documents") or 0, now)
+            for url, entry in entries.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (store, url, etag, last_modified, content_hash, text_hash, "
+                "documents, crawled_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def remove(self, store_name: str, urls: Optional[List[str]] = None) -> None:
+        """Forget some or all pages of a store, so they are ingested again in full"""
+        with self._lock, self._conn:
+            if urls is None:
+                self._conn.execute("DELETE FROM pages WHERE store = ?", (store_name,))
+                return
+            for start in range(0, len(urls), self._BATCH_SIZE):
+                batch = urls[start:start + self._BATCH_SIZE]
+                self._conn.execute(
+                    f"DELETE FROM pages WHERE store = ? AND url IN ({','.join('?' * len(batch))})",
+                    [store_name, *batch]
+                )
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.config.config import Config
+
+
+class EmbeddingCache:
+    """On-disk store of embedding vectors keyed by model name and content hash
+
+    Entries are evicted least-recently-used first once the cache holds more
+    than max_entries vectors.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    _BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a piece of text embedded with a given model"""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors, marking the hits as recently used"""
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            for start in range(0, len(keys), self._BATCH_SIZE):
+                batch = keys[start:start + self._BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    hit_keys = [key for key, _ in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [now, *hit_keys]
+                    )
+        return found
+
+    def set_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used entries over the cap"""
+        if not vectors:
+            return
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in vectors.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts missing from the cache to the model
+
+    Only document embeddings are cached; query embeddings use a different
+    task type and are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, reusing cached vectors for previously seen texts"""
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.set_many(computed)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model"""
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query with the underlying model's async client"""
+        return await self.embeddings.aembed_query(text)
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed many search queries with one batched embedding call
+
+    Google embeddings are asked for query (RETRIEVAL_QUERY) vectors; other
+    models are assumed to embed queries and documents alike.
+    """
+    if isinstance(embeddings, CachedEmbeddings):
+        # Query vectors are not kept in the document cache
+        embeddings = embeddings.embeddings
+    if isinstance(embeddings, GoogleGenerativeAIEmbeddings):
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return embeddings.embed_documents(texts)
+
+
+def create_embeddings() -> Embeddings:
+    """Create the embeddings used by the vector stores, wrapped in the on-disk cache"""
+    embeddings = GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL)
+    if not Config.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    cache = EmbeddingCache(Config.EMBEDDING_CACHE_PATH, Config.EMBEDDING_CACHE_MAX_ENTRIES)
+    return CachedEmbeddings(embeddings, cache, Config.EMBEDDING_MODEL)
@@ -0,0 +1,300 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.documents.base import Document
+from langchain_text_splitters import TextSplitter
+from src.config.config import Config
+from src.services.crawl_manifest import CrawlManifest, content_hash
+from src.services.page_fetcher import PageFetcher
+from src.services.vector_store import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+# Put on a queue by a stage after its last item
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """Raised by IngestionPipeline.run when its cancel event was set"""
+
+
+class _Stop(Exception):
+    """Unwinds a stage once another stage has failed or the run was cancelled"""
+
+
+class _Batch:
+    """A micro-batch of chunks on its way to the store
+
+    sources are the pages whose previously stored chunks are replaced when
+    the batch is committed, and pages the crawl manifest entries, keyed by
+    URL, of the pages whose last chunk the batch carries.
+    """
+
+    def __init__(self):
+        self.documents: List[Document] = []
+        self.sources: List[str] = []
+        self.pages: Dict[str, Dict[str, Any]] = {}
+
+    def empty(self) -> bool:
+        return not (self.documents or self.sources or self.pages)
+
+
+class _PipelineRun:
+    """State shared by the stage threads of one pipeline run"""
+
+    def __init__(self, queue_size: int, progress: Optional[Callable[[Dict[str, int]], None]],
+                 cancel: Optional[threading.Event]):
+        self.pages: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.batches: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.embedded: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.counters = {
+            "pages_fetched": 0,
+            "pages_failed": 0,
+            "pages_unchanged": 0,
+            "chunks_split": 0,
+            "chunks_embedded": 0,
+            "chunks_indexed": 0
+        }
+        self.progress = progress
+        self.cancel = cancel or threading.Event()
+        self.failed = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+    def stopped(self) -> bool:
+        return self.failed.is_set() or self.cancel.is_set()
+
+    def count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += n
+            if self.progress is not None:
+                self.progress(dict(self.counters))
+
+    def put(self, q: queue.Queue, item: Any) -> None:
+        """Put an item on a queue, waiting while it is full unless the run stops"""
+        while True:
+            if self.stopped():
+                raise _Stop()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def get(self, q: queue.Queue) -> Any:
+        """Take an item from a queue, waiting while it is empty unless the run stops"""
+        while True:
+            if self.stopped():
+                raise _Stop()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def run_stage(self, stage: Callable[[], None]) -> None:
+        try:
+            stage()
+        except _Stop:
+            pass
+        except BaseException as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = e
+            self.failed.set()
+
+
+class IngestionPipeline:
+    """Ingest pages by streaming them through fetch, split, embed and index stages
+
+    Each stage runs in its own thread and hands its output to the next one
+    through a bounded queue, so a slow stage holds back the stages before it
+    and memory stays flat however large the site is. Chunks are embedded and
+    committed to the store in micro-batches, so pages become searchable while
+    the rest of the site is still being fetched.
+
+    The chunks of a page replace those stored from the same URL before. With
+    a crawl manifest, pages are requested conditionally and a page whose
+    body or text is unchanged since it was last ingested is skipped before
+    it is parsed or embedded.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        page_fetcher: PageFetcher,
+        queue_size: int = Config.PIPELINE_QUEUE_SIZE,
+        batch_size: int = Config.PIPELINE_BATCH_SIZE,
+        manifest: Optional[CrawlManifest] = None
+    ):
+        self.vector_store = vector_store
+        self.page_fetcher = page_fetcher
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.manifest = manifest
+
+    def run(
+        self,
+        urls: List[str],
+        store_name: str,
+        splitter: TextSplitter,
+        progress: Optional[Callable[[Dict[str, int]], None]] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Dict[str, int]:
+        """Fetch, split, embed and index pages
+
+        Args:
+            urls: Pages to ingest
+            store_name: Vector store the chunks are added to
+            splitter: Splits each page into chunks
+            progress: Called with the counters pages_fetched, pages_failed,
+                pages_unchanged (fetched pages that were skipped),
+                chunks_split, chunks_embedded and chunks_indexed whenever
+                one of them changes
+            cancel: Stops the run when set; batches already indexed are kept
+
+        Returns:
+            The final counters
+
+        Raises:
+            PipelineCancelled: If cancel was set before the run finished
+        """
+        urls = list(dict.fromkeys(urls))
+        previous = self.previous_entries(urls, store_name)
+        run = _PipelineRun(self.queue_size, progress, cancel)
+        stages = {
+            "fetch": lambda: self._fetch(run, urls, store_name, previous),
+            "split": lambda: self._split(run, store_name, splitter),
+            "embed": lambda: self._embed(run),
+            "index": lambda: self._index(run, store_name),
+        }
+        threads = [
+            threading.Thread(target=run.run_stage, args=(stage,), name=f"ingest-{name}", daemon=True)
+            for name, stage in stages.items()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if run.error is not None:
+            raise run.error
+        if run.cancel.is_set():
+            raise PipelineCancelled()
+        return dict(run.counters)
+
+    def previous_entries(self, urls: List[str], store_name: str) -> Dict[str, Dict[str, Any]]:
+        """Get the manifest entries of the pages whose chunks are still in the store
+
+        A page whose chunks were removed since, for example because the
+        store was rebuilt, is ingested again even if it did not change.
+        """
+        if self.manifest is None:
+            return {}
+        return {
+            url: entry
+            for url, entry in self.manifest.get_many(store_name, urls).items()
+            if not entry["documents"] or self.vector_store.find_ids(store_name, "source", url)
+        }
+
+    def _fetch(self, run: _PipelineRun, urls: List[str], store_name: str,
+               previous: Dict[str, Dict[str, Any]]) -> None:
+        """Download changed pages and queue their parse futures"""
+        for page in self.page_fetcher.fetch_all(urls, previous):
+            if run.stopped():
+                raise _Stop()
+            if page.error is not None:
+                logger.error(f"Error fetching {page.url}, exception: {page.error}")
+                run.count("pages_failed")
+                continue
+            run.count("pages_fetched")
+            old = previous.get(page.url)
+            entry = {
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                # A 304 only answers a conditional request, which needs a previous entry
+                "content_hash": old["content_hash"] if page.not_modified else content_hash(page.content)
+            }
+            if old and entry["content_hash"] == old["content_hash"]:
+                # Not modified, or served again byte for byte; only the validators may have changed
+                self.manifest.put_many(store_name, {page.url: {**old, **entry}})
+                run.count("pages_unchanged")
+                continue
+            # Parsing runs in the fetcher's process pool while the next pages download
+            run.put(run.pages, (page.url, entry, old, self.page_fetcher.parse(page)))
+        run.put(run.pages, _DONE)
+
+    def _split(self, run: _PipelineRun, store_name: str, splitter: TextSplitter) -> None:
+        """Split parsed pages and group the chunks into micro-batches
+
+        A partial batch is passed on whenever no parsed page is waiting, so
+        chunks are not held back by a slow crawl.
+        """
+        batch = _Batch()
+        while True:
+            try:
+                item = run.pages.get_nowait()
+            except queue.Empty:
+                if not batch.empty():
+                    run.put(run.batches, batch)
+                    batch = _Batch()
+                item = run.get(run.pages)
+            if item is _DONE:
+                break
+            url, entry, old, parsed = item
+            try:
+                text = parsed.result()
+            except Exception as e:
+                logger.error(f"Error processing {url}, exception: {e}")
+                run.count("pages_failed")
+                continue
+            entry["text_hash"] = content_hash(text)
+            if old and entry["text_hash"] == old["text_hash"]:
+                # Only markup around the text changed
+                self.manifest.put_many(store_name, {url: {**old, **entry}})
+                run.count("pages_unchanged")
+                continue
+            chunks = splitter.split_documents([Document(page_content=text, metadata={"source": url})])
+            entry["documents"] = len(chunks)
+            run.count("chunks_split", len(chunks))
+            # The page's old chunks go in the same commit as its first new chunk
+            batch.sources.append(url)
+            for chunk in chunks:
+                batch.documents.append(chunk)
+                if len(batch.documents) >= self.batch_size:
+                    run.put(run.batches, batch)
+                    batch = _Batch()
+            # Recorded only once the last chunk is committed, so an interrupted page is redone
+            batch.pages[url] = entry
+        if not batch.empty():
+            run.put(run.batches, batch)
+        run.put(run.batches, _DONE)
+
+    def _embed(self, run: _PipelineRun) -> None:
+        """Embed each micro-batch of chunks with one embedding call"""
+        while True:
+            batch = run.get(run.batches)
+            if batch is _DONE:
+                break
+            vectors = []
+            if batch.documents:
+                vectors = self.vector_store.embeddings.embed_documents(
+                    [chunk.page_content for chunk in batch.documents]
+                )
+            run.put(run.embedded, (batch, vectors))
+            run.count("chunks_embedded", len(batch.documents))
+        run.put(run.embedded, _DONE)
+
+    def _index(self, run: _PipelineRun, store_name: str) -> None:
+        """Commit each embedded micro-batch to the store, making it searchable"""
+        while True:
+            item = run.get(run.embedded)
+            if item is _DONE:
+                break
+            batch, vectors = item
+            if batch.sources:
+                self.vector_store.replace_sources(batch.sources, batch.documents, store_name, vectors)
+            else:
+                self.vector_store.add_embedded_documents(batch.documents, vectors, store_name)
+            if self.manifest is not None:
+                self.manifest.put_many(store_name, batch.pages)
+            run.count("chunks_indexed", len(batch.documents))
@@ -0,0 +1,321 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from src.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Runs a job: (params, progress callback, cancel event) -> JSON-serializable result
+JobHandler = Callable[[Dict[str, Any], Callable[[Dict[str, int]], None], threading.Event], Any]
+
+
+class _RunningJob:
+    """In-memory state of a job executing in this process"""
+
+    def __init__(self):
+        self.cancel = threading.Event()
+        self.progress: Dict[str, int] = {}
+        # Set when the job is interrupted by close() rather than cancelled
+        self.interrupted = False
+
+
+class JobService:
+    """Run long ingestion tasks in a worker pool, tracking them in SQLite
+
+    Submitting only records a queued job. A dispatcher thread claims queued
+    jobs for the worker pool, saves the progress of running jobs and passes
+    on cancellation requests once per poll interval. Claims are atomic, so
+    every server process sharing the database can run jobs; a running job
+    whose process stops heartbeating for lease seconds, for example because
+    the server was restarted, is queued again, up to max_attempts runs in all.
+    """
+
+    STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+    FINISHED = ("succeeded", "failed", "cancelled")
+    _COLUMNS = (
+        "id", "type", "status", "params", "progress", "result", "error", "attempts",
+        "cancel_requested", "created_at", "started_at", "finished_at"
+    )
+
+    def __init__(
+        self,
+        path: str,
+        handlers: Dict[str, JobHandler],
+        workers: int = Config.JOB_WORKERS,
+        poll_interval: float = Config.JOB_POLL_INTERVAL,
+        lease: float = Config.JOB_LEASE,
+        max_attempts: int = Config.JOB_MAX_ATTEMPTS,
+        retention: float = Config.JOB_RETENTION
+    ):
+        self.path = path
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retention = retention
+        # Identifies the jobs claimed by this process
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit, so claims can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+                "progress TEXT NOT NULL DEFAULT '{}', result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "owner TEXT, heartbeat REAL, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._running: Dict[str, _RunningJob] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        """Start the worker pool and dispatcher, resuming jobs left queued by earlier runs"""
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+            self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return it without waiting for it to run
+
+        Raises:
+            ValueError: If there is no handler for job_type
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, status, params, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, job_type, json.dumps(params), time.time())
+            )
+        self.start()
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job, or None if there is no job with that id"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = Config.LIST_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """List jobs, newest first, optionally only those with the given status"""
+        query = f"SELECT {', '.join(self._COLUMNS)} FROM jobs"
+        args: List[Any] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a job
+
+        A queued job is cancelled at once. A running job is asked to stop and
+        is marked cancelled when its handler returns; work it already
+        committed, such as indexed chunks, is kept.
+
+        Returns:
+            The job, or None if there is no job with that id
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+            )
+            running = self._running.get(job_id)
+        if running is not None:
+            running.cancel.set()
+        return self.get(job_id)
+
+    def close(self) -> None:
+        """Stop the dispatcher and interrupt the running jobs
+
+        Interrupted jobs are queued again, so they resume when a server
+        starts next.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        with self._lock:
+            dispatcher, executor = self._dispatcher, self._executor
+            running = list(self._running.values())
+        for job in running:
+            job.interrupted = True
+            job.cancel.set()
+        if dispatcher is not None:
+            dispatcher.join()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _to_job(self, row: tuple) -> Dict[str, Any]:
+        job = dict(zip(self._COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _dispatch(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+                self._purge()
+                while len(self._running) < self.workers and not self._stopped.is_set():
+                    job = self._claim()
+                    if job is None:
+                        break
+                    self._executor.submit(self._run, job)
+            except Exception:
+                logger.exception("Job dispatcher failed")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _heartbeat(self) -> None:
+        """Save the progress of this process's running jobs and pick up their cancellations"""
+        now = time.time()
+        with self._lock:
+            running = dict(self._running)
+            for job_id, job in running.items():
+                self._conn.execute(
+                    "UPDATE jobs SET heartbeat = ?, progress = ? WHERE id = ? AND owner = ?",
+                    (now, json.dumps(job.progress), job_id, self.owner)
+                )
+            cancelled = self._conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status = 'running' AND cancel_requested = 1",
+                (self.owner,)
+            ).fetchall()
+        for (job_id,) in cancelled:
+            if job_id in running:
+                running[job_id].cancel.set()
+
+    def _requeue_stale(self) -> None:
+        """Queue again the running jobs of processes that stopped heartbeating"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = self._conn.execute(
+                    "SELECT id, attempts, cancel_requested FROM jobs WHERE status = 'running' AND heartbeat < ?",
+                    (now - self.lease,)
+                ).fetchall()
+                for job_id, attempts, cancel_requested in stale:
+                    if cancel_requested:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'cancelled', owner = NULL, finished_at = ? WHERE id = ?",
+                            (now, job_id)
+                        )
+                    elif attempts >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'failed', error = ?, owner = NULL, finished_at = ? WHERE id = ?",
+                            (f"Worker stopped after {attempts} attempts", now, job_id)
+                        )
+                    else:
+                        logger.warning(f"Requeueing job {job_id} whose worker stopped responding")
+                        self._conn.execute("UPDATE jobs SET status = 'queued', owner = NULL WHERE id = ?", (job_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _purge(self) -> None:
+        """Delete finished jobs older than the retention period, at most once a minute"""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(self.FINISHED))}) AND finished_at < ?",
+                (*self.FINISHED, now - self.retention)
+            )
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for this process, or None if there is none"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, started_at = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (self.owner, now, now, row[0])
+                    )
+                    self._running[row[0]] = _RunningJob()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        running = self._running[job["id"]]
+
+        def progress(counters: Dict[str, int]) -> None:
+            running.progress = dict(counters)
+
+        result, error = None, None
+        try:
+            result = self.handlers[job["type"]](job["params"], progress, running.cancel)
+            status = "succeeded"
+        except Exception as e:
+            logger.exception(f"Job {job['id']} ({job['type']}) failed")
+            status, error = "failed", str(e)
+        if running.cancel.is_set():
+            status = "cancelled"
+        with self._lock:
+            if running.interrupted:
+                # An interruption does not count as an attempt, unless the job was also cancelled
+                status = "cancelled" if self._cancel_requested(job["id"]) else "queued"
+                if status == "queued":
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', progress = ?, owner = NULL, attempts = attempts - 1 "
+                        "WHERE id = ? AND owner = ?",
+                        (json.dumps(running.progress), job["id"], self.owner)
+                    )
+                    self._running.pop(job["id"], None)
+                    return
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = ?, owner = NULL, finished_at = ? "
+                "WHERE id = ? AND owner = ?",
+                (status, json.dumps(result, default=str), error, json.dumps(running.progress), time.time(),
+                 job["id"], self.owner)
+            )
+            self._running.pop(job["id"], None)
+        self._wakeup.set()
@@ -0,0 +1,197 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from langchain_core.documents.base import Document
+from src.services.sqlite_docstore import fetch_documents
+
+KEYWORD_INDEX_FILE = "keyword_index.json"
+
+# Words joined by "-", "_", "." or "/" stay one token (SKUs, model numbers,
+# versions); their parts are indexed as well
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms for the keyword index"""
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def is_identifier(token: str) -> bool:
+    """Check whether a token looks like a SKU or model number rather than a word"""
+    return any(char.isdigit() for char in token) or any(char in "-_./" for char in token)
+
+
+def is_keyword_query(query: str) -> bool:
+    """Check whether a query asks for exact terms rather than a meaning
+
+    That is a quoted phrase, such as an exact product name, or a query made
+    only of SKU or model-number-like tokens.
+    """
+    query = query.strip()
+    if len(query) > 2 and query[0] == query[-1] == '"':
+        return bool(tokenize(query))
+    tokens = _TOKEN_PATTERN.findall(query.lower())
+    return bool(tokens) and all(is_identifier(token) for token in tokens)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], rrf_k: int = 60) -> List[Document]:
+    """Merge ranked document lists by summing 1 / (rrf_k + rank) per document
+
+    Documents are matched by id, or by content when they have none.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class KeywordIndex:
+    """BM25 inverted index over the documents of one vector store
+
+    Kept up to date by VectorStoreService alongside the FAISS index and the
+    metadata index, and persisted next to them at every checkpoint.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts: Dict[str, Dict[str, int]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # Terms whose posting this index may change; None when it owns them all
+        self._owned: Optional[Set[str]] = None
+
+    @classmethod
+    def build(cls, index_to_docstore_id: Dict[int, str], docstore: Any, **params: float) -> "KeywordIndex":
+        """Build the index by walking every document in a store"""
+        keyword_index = cls(**params)
+        store_ids = list(index_to_docstore_id.values())
+        for start in range(0, len(store_ids), 1000):
+            batch = store_ids[start:start + 1000]
+            for store_id, doc in zip(batch, fetch_documents(docstore, batch)):
+                if doc is not None:
+                    keyword_index.add(store_id, doc.page_content)
+        return keyword_index
+
+    def add(self, store_id: str, text: str) -> None:
+        """Index the text of a document"""
+        self._add_counts(store_id, dict(Counter(tokenize(text))))
+
+    def _add_counts(self, store_id: str, counts: Dict[str, int]) -> None:
+        self.remove([store_id])
+        self.term_counts[store_id] = counts
+        self.lengths[store_id] = sum(counts.values())
+        self.total_length += self.lengths[store_id]
+        for term, count in counts.items():
+            posting = self._own_posting(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                if self._owned is not None:
+                    self._owned.add(term)
+            posting[store_id] = count
+
+    def _own_posting(self, term: str) -> Optional[Dict[str, int]]:
+        """Get the posting of a term for changing it, copying it if it is shared"""
+        posting = self.postings.get(term)
+        if posting is not None and self._owned is not None and term not in self._owned:
+            posting = self.postings[term] = dict(posting)
+            self._owned.add(term)
+        return posting
+
+    def remove(self, store_ids: Iterable[str]) -> None:
+        """Drop documents from the index"""
+        for store_id in store_ids:
+            counts = self.term_counts.pop(store_id, None)
+            if counts is None:
+                continue
+            self.total_length -= self.lengths.pop(store_id)
+            for term in counts:
+                posting = self._own_posting(term)
+                if posting is not None:
+                    posting.pop(store_id, None)
+                    if not posting:
+                        del self.postings[term]
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Rank documents against a query with BM25
+
+        Returns:
+            (docstore id, score) pairs for every matching document, best
+            first, limited to k when given
+        """
+        n_docs = len(self.term_counts)
+        if not n_docs:
+            return []
+        average_length = self.total_length / n_docs or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            # A copy, as documents may be added to the posting while it is read
+            for store_id, count in list(posting.items()):
+                norm = count + self.k1 * (1 - self.b + self.b * self.lengths[store_id] / average_length)
+                scores[store_id] = scores.get(store_id, 0.0) + idf * count * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k] if k is not None else ranked
+
+    def is_consistent_with(self, index_to_docstore_id: Dict[int, str]) -> bool:
+        """Check that the index covers exactly the documents of a loaded store"""
+        return set(self.term_counts) == set(index_to_docstore_id.values())
+
+    def copy(self) -> "KeywordIndex":
+        """Copy the index so the copy can be changed while readers keep using the original
+
+        Postings are shared with the original until the copy first changes
+        them, and term counts are never changed in place, so copying costs
+        one dictionary copy per attribute.
+        """
+        keyword_index = KeywordIndex(self.k1, self.b)
+        keyword_index.term_counts = dict(self.term_counts)
+        keyword_index.postings = dict(self.postings)
+        keyword_index.lengths = dict(self.lengths)
+        keyword_index.total_length = self.total_length
+        keyword_index._owned = set()
+        return keyword_index
+
+    def save(self, store_path: str) -> None:
+        """Persist the index next to the FAISS files"""
+        path = os.path.join(store_path, KEYWORD_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        documents = list(self.term_counts.items())
+        with open(tmp_path, "w") as f:
+            # Encoded a slice at a time, for the reason given in MetadataIndex.save
+            f.write('{"documents": {')
+            for start in range(0, len(documents), 1000):
+                f.write((", " if start else "") + json.dumps(dict(documents[start:start + 1000]))[1:-1])
+            f.write("}}")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, store_path: str, **params: float) -> Optional["KeywordIndex"]:
+        """Load a persisted index, or None if it is missing or unreadable"""
+        try:
+            with open(os.path.join(store_path, KEYWORD_INDEX_FILE)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        keyword_index = cls(**params)
+        for store_id, counts in data.get("documents", {}).items():
+            keyword_index._add_counts(store_id, counts)
+        return keyword_index
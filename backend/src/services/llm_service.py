@@ -1,16 +1,29 @@
+from functools import cached_property
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents.base import Document
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple, Union
+from langchain_core.language_models.chat_models import BaseChatModel
 from src.config.config import Config
 from src.models.data_models import UrlClassify, ListProduct, SelectRetrieverRatio
 
 class LLMService:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(model=Config.MODEL)
-        self.web_classifier = self.llm.with_structured_output(UrlClassify)
-        self.retriever_selector = self.llm.with_structured_output(SelectRetrieverRatio)
-        self.prod_format_llm = self.llm.with_structured_output(ListProduct)
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or ChatGoogleGenerativeAI(model=Config.MODEL)
+
+    # Structured-output runnables are built on first use, so an LLM without
+    # structured output support (such as a fake model in tests) can still stream answers
+    @cached_property
+    def web_classifier(self):
+        return self.llm.with_structured_output(UrlClassify)
+
+    @cached_property
+    def retriever_selector(self):
+        return self.llm.with_structured_output(SelectRetrieverRatio)
+
+    @cached_property
+    def prod_format_llm(self):
+        return self.llm.with_structured_output(ListProduct)
         
     def classify_urls(self, urls: List[str]) -> UrlClassify:
         """Classify URLs into description and product service URLs"""
@@ -20,19 +33,95 @@ class LLMService:
         """Get the ratio for retriever selection"""
         return self.retriever_selector.invoke(query).ratio
         
+    def get_retriever_ratios(self, queries: List[str], max_concurrency: int) -> List[float]:
+        """Get the retriever ratios of many queries with one batched call"""
+        results = self.retriever_selector.batch(queries, config={"max_concurrency": max_concurrency})
+        return [result.ratio for result in results]
+        
+    async def aget_retriever_ratio(self, query: str) -> float:
+        """Get the ratio for retriever selection without blocking the event loop"""
+        return (await self.retriever_selector.ainvoke(query)).ratio
+        
     def format_product_info(self, content: str) -> ListProduct:
         """Format raw content into product information"""
         return self.prod_format_llm.invoke(content)
+
+    def format_product_infos(self, contents: List[str],
+                             max_concurrency: int) -> Iterator[Tuple[int, Union[ListProduct, Exception, None]]]:
+        """Format many chunks concurrently, yielding each result as it completes
+
+        Chunks that fail or return nothing are retried in another round, up
+        to Config.EXTRACTION_ATTEMPTS tries in all.
+
+        Yields:
+            (position in contents, product information, or the exception or
+            None of the last try)
+        """
+        pending = list(range(len(contents)))
+        for attempt in range(1, Config.EXTRACTION_ATTEMPTS + 1):
+            failed = []
+            results = self.prod_format_llm.batch_as_completed(
+                [contents[i] for i in pending], config={"max_concurrency": max_concurrency}, return_exceptions=True
+            )
+            for position, result in results:
+                i = pending[position]
+                if (result is None or isinstance(result, Exception)) and attempt < Config.EXTRACTION_ATTEMPTS:
+                    failed.append(i)
+                else:
+                    yield i, result
+            if not failed:
+                return
+            pending = failed
         
-    def get_chatbot_response(self, query: str, documents: List[Document]) -> str:
-        """Get chatbot response based on query and relevant documents"""
+    def _chatbot_chain(self):
+        """Build the prompt and LLM chain that answers customer queries"""
         prompt_template = ChatPromptTemplate.from_messages([
             ("system", "Act as Customer Support Manager"),
             ("user", "Your task is to respond to the following customer query: {query}\n"
                     "Provide the most relevant information based on the query and keep the message on point short and well formated.\n"
                     "You have access to the following documents: {documents}")
         ])
-        
-        chain = prompt_template | self.llm
-        response = chain.invoke({"query": query, "documents": documents})
-        return response.content 
\ No newline at end of file
+        return prompt_template | self.llm
+
+    def get_chatbot_response(self, query: str, documents: Union[str, List[Document]]) -> str:
+        """Get chatbot response based on query and relevant documents
+
+        documents may be the packed context text built by ContextBuilder.
+        """
+        response = self._chatbot_chain().invoke({"query": query, "documents": documents})
+        return response.content
+
+    def stream_chatbot_response(self, query: str, documents: Union[str, List[Document]]) -> Iterator[str]:
+        """Stream the chatbot response as the model produces it
+
+        Yields:
+            Text chunks of the response, in order
+        """
+        for chunk in self._chatbot_chain().stream({"query": query, "documents": documents}):
+            if chunk.content:
+                yield chunk.content
+
+    async def aget_chatbot_response(self, query: str, documents: Union[str, List[Document]]) -> str:
+        """Async counterpart of get_chatbot_response"""
+        response = await self._chatbot_chain().ainvoke({"query": query, "documents": documents})
+        return response.content
+
+    async def astream_chatbot_response(self, query: str, documents: Union[str, List[Document]]) -> AsyncIterator[str]:
+        """Async counterpart of stream_chatbot_response"""
+        async for chunk in self._chatbot_chain().astream({"query": query, "documents": documents}):
+            if chunk.content:
+                yield chunk.content
+
+    def batch_chatbot_responses(self, requests: List[Tuple[str, str]],
+                                max_concurrency: int) -> Iterator[Tuple[int, Union[str, Exception]]]:
+        """Answer many (query, context) pairs, yielding each answer as it completes
+
+        Yields:
+            (position in requests, response text or the exception it raised)
+        """
+        inputs = [{"query": query, "documents": documents} for query, documents in requests]
+        results = self._chatbot_chain().batch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        )
+        for i, result in results:
+            yield i, result if isinstance(result, Exception) else result.content
@@ -1,19 +1,72 @@
+import asyncio
+import logging
+import threading
 import time
-from typing import List, Dict, Any, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple
 from langchain_core.documents.base import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import UnstructuredURLLoader
 from src.config.config import Config
+from src.services.answer_cache import AnswerCache
+from src.services.context_builder import ContextBuilder, PackedContext
+from src.services.crawl_manifest import CrawlManifest
+from src.services.keyword_index import is_keyword_query, reciprocal_rank_fusion
+from src.services.ingestion_pipeline import IngestionPipeline
+from src.services.job_service import JobHandler, JobService
+from src.services.page_fetcher import PageFetcher
+from src.services.query_router import QueryRouter
 from src.services.vector_store import VectorStoreService
 from src.services.web_scraper import WebScraperService
 from src.services.llm_service import LLMService
 from src.models.data_models import ProductService
 
+logger = logging.getLogger(__name__)
+
 class MainService:
-    def __init__(self):
-        self.vector_store = VectorStoreService()
-        self.web_scraper = WebScraperService()
-        self.llm_service = LLMService()
+    def __init__(
+        self,
+        vector_store: Optional[VectorStoreService] = None,
+        web_scraper: Optional[WebScraperService] = None,
+        llm_service: Optional[LLMService] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        query_router: Optional[QueryRouter] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        page_fetcher: Optional[PageFetcher] = None,
+        crawl_manifest: Optional[CrawlManifest] = None
+    ):
+        self.vector_store = vector_store or VectorStoreService()
+        self.web_scraper = web_scraper or WebScraperService()
+        self.llm_service = llm_service or LLMService()
+        self.page_fetcher = page_fetcher or PageFetcher()
+        self.crawl_manifest = crawl_manifest or CrawlManifest(Config.CRAWL_MANIFEST_PATH)
+        self.ingestion_pipeline = IngestionPipeline(
+            self.vector_store, self.page_fetcher, manifest=self.crawl_manifest
+        )
+        if answer_cache is None and Config.ANSWER_CACHE_ENABLED:
+            answer_cache = AnswerCache(
+                max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl=Config.ANSWER_CACHE_TTL,
+                similarity_threshold=Config.ANSWER_CACHE_SIMILARITY
+            )
+        self.answer_cache = answer_cache
+        self.query_router = query_router or QueryRouter(
+            top_n=Config.ROUTER_TOP_N,
+            temperature=Config.ROUTER_TEMPERATURE,
+            min_margin=Config.ROUTER_MIN_MARGIN
+        )
+        self.context_builder = context_builder or ContextBuilder(
+            token_budget=Config.CONTEXT_TOKEN_BUDGET,
+            mmr_lambda=Config.CONTEXT_MMR_LAMBDA,
+            duplicate_similarity=Config.CONTEXT_DUPLICATE_SIMILARITY,
+            chars_per_token=Config.CONTEXT_CHARS_PER_TOKEN
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.RETRIEVAL_WORKERS,
+            thread_name_prefix="chat-retrieval"
+        )
+        # Long-running ingestion requests run here in the background, see _job_handlers
+        self.jobs = JobService(Config.JOB_DB_PATH, self._job_handlers())
         
     def extract_and_classify_urls(self, url: str) -> Dict[str, List[str]]:
         """Extract and classify URLs from a webpage"""
@@ -24,46 +77,176 @@ class MainService:
             'product_service_urls': [str(url) for url in classified_urls.product_service_urls]
         }
         
-    def process_description_urls(self, urls: List[str]) -> None:
-        """Process and store description URLs"""
-        desc_loader = UnstructuredURLLoader(urls=urls)
-        desc_data = desc_loader.load()
+    def _job_handlers(self) -> Dict[str, JobHandler]:
+        """Background job types, named after the endpoints they run for"""
+        def process_product_urls(params, progress, cancel):
+            products, failed_chunks = self.process_product_urls(params["urls"], progress, cancel)
+            return {"products": products, "failed_chunks": failed_chunks}
+
+        return {
+            "extract-urls": lambda params, progress, cancel: self.extract_and_classify_urls(params["url"]),
+            "process-desc-urls": lambda params, progress, cancel: self.process_description_urls(
+                params["urls"], progress, cancel
+            ),
+            "process-product-urls": process_product_urls,
+        }
         
+    def process_description_urls(self, urls: List[str], progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                                 cancel: Optional[threading.Event] = None) -> Dict[str, int]:
+        """Process and store description URLs
+        
+        Pages stream through the ingestion pipeline and are committed in
+        micro-batches, so they become searchable while the rest is fetched.
+        Pages unchanged since they were last processed are skipped, and the
+        chunks of a changed page replace its old ones.
+        
+        Args:
+            urls: Description page URLs
+            progress: Receives the pipeline counters, see IngestionPipeline.run
+            cancel: Stops ingestion when set
+            
+        Returns:
+            The final pipeline counters
+        """
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=Config.CHUNK_SIZE,
             chunk_overlap=Config.CHUNK_OVERLAP
         )
-        final_desc_data = splitter.split_documents(desc_data)
+        return self.ingestion_pipeline.run(urls, Config.DESCRIPTION_INDEX_NAME, splitter, progress, cancel)
         
-        self.vector_store.add_documents(final_desc_data, Config.DESCRIPTION_INDEX_NAME)
+    def process_product_urls(self, urls: List[str], progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                             cancel: Optional[threading.Event] = None) -> Tuple[List[Dict], int]:
+        """Process and store product URLs
         
-    def process_product_urls(self, urls: List[str]) -> List[Dict]:
-        """Process and store product URLs"""
-        prod_loader = UnstructuredURLLoader(urls=urls)
-        prod_data = prod_loader.load()
+        Only pages that changed since they were last processed are sent to
+        the LLM, and the products of a changed page replace those extracted
+        from it before. A page with a failed or unextracted chunk keeps its
+        old products and is processed again on the next run.
+        
+        Args:
+            urls: Product page URLs
+            progress: Receives pages_fetched, pages_changed and pages_failed
+                once the pages are loaded, then those together with the
+                extraction counters, see extract_products
+            cancel: Stops extraction when set; pages not fully extracted are
+                processed again on the next run
+            
+        Returns:
+            The products of the changed pages that were stored and the
+            number of chunks whose extraction failed
+        """
+        store_name = Config.PRODUCT_INDEX_NAME
+        unique_urls = list(dict.fromkeys(urls))
+        previous = self.ingestion_pipeline.previous_entries(unique_urls, store_name)
+        pages, entries = self.page_fetcher.load_changed(unique_urls, previous)
+        changed = [page.metadata["source"] for page in pages]
+        # Unchanged pages only refresh their validators
+        self.crawl_manifest.put_many(store_name, {
+            url: entry for url, entry in entries.items() if "documents" in entry
+        })
+        page_counters = {
+            "pages_fetched": len(entries),
+            "pages_changed": len(pages),
+            "pages_failed": len(unique_urls) - len(entries)
+        }
+        report = None
+        if progress is not None:
+            progress(dict(page_counters))
+            report = lambda counters: progress({**page_counters, **counters})
+        if not pages:
+            return [], 0
         
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=Config.PRODUCT_CHUNK_SIZE,
             chunk_overlap=Config.PRODUCT_CHUNK_OVERLAP
         )
-        final_prod_data = splitter.split_documents(prod_data)
+        chunks = splitter.split_documents(pages)
+        extracted, failed_chunks = self._extract_chunks(chunks, report, cancel)
+        page_products: Dict[str, List[Dict]] = {url: [] for url in changed}
+        for i in sorted(extracted):
+            page_products[chunks[i].metadata["source"]].extend(extracted[i])
+        failed = {chunk.metadata["source"] for i, chunk in enumerate(chunks) if i not in extracted}
+        complete = {url: products for url, products in page_products.items() if url not in failed}
+        if not complete:
+            return [], failed_chunks
         
-        products = []
-        for docs in final_prod_data[:10]:  # Limit to first 10 chunks
-            product_info = self.llm_service.format_product_info(docs.page_content)
-            products.extend([dict(prod) for prod in product_info.products])
-            
-        # Store products in vector store
         product_docs = [
-            Document(
-                page_content=str(prod),
-                metadata={"type": "product", "doc_id": str(time.time())}
-            )
-            for prod in products
+            doc for url, products in complete.items() for doc in self._product_documents(products, url)
         ]
-        self.vector_store.add_documents(product_docs, Config.PRODUCT_INDEX_NAME)
+        self.vector_store.replace_sources(list(complete), product_docs, store_name)
+        self.crawl_manifest.put_many(store_name, {
+            url: {**entries[url], "documents": len(products)} for url, products in complete.items()
+        })
+        return [product for products in complete.values() for product in products], failed_chunks
+
+    def extract_products(self, chunks: List[Document], progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                         cancel: Optional[threading.Event] = None) -> Tuple[List[Dict], int]:
+        """Extract products from every chunk, Config.EXTRACTION_CONCURRENCY chunks at a time
         
-        return products
+        A chunk whose extraction still fails after Config.EXTRACTION_ATTEMPTS
+        tries is logged and skipped; the products of the other chunks are kept.
+        
+        Args:
+            chunks: Product page chunks
+            progress: Called after each chunk with the counters chunks_total,
+                chunks_extracted, chunks_failed and products_extracted
+            cancel: Stops extraction when set; chunks still waiting for the
+                LLM are dropped
+                
+        Returns:
+            The products in chunk order and the number of chunks whose extraction failed
+        """
+        extracted, failed = self._extract_chunks(chunks, progress, cancel)
+        products = [product for i in sorted(extracted) for product in extracted[i]]
+        return products, failed
+
+    def _extract_chunks(self, chunks: List[Document], progress: Optional[Callable[[Dict[str, int]], None]],
+                        cancel: Optional[threading.Event] = None) -> Tuple[Dict[int, List[Dict]], int]:
+        """Extract products from every chunk, keyed by the index of the chunk they came from"""
+        counters = {"chunks_total": len(chunks), "chunks_extracted": 0, "chunks_failed": 0, "products_extracted": 0}
+        extracted: Dict[int, List[Dict]] = {}
+        results = self.llm_service.format_product_infos(
+            [chunk.page_content for chunk in chunks], Config.EXTRACTION_CONCURRENCY
+        )
+        for i, product_info in results:
+            if product_info is None or isinstance(product_info, Exception):
+                source = chunks[i].metadata.get("source")
+                logger.error(f"Product extraction failed for chunk {i} of {source}: {product_info}")
+                counters["chunks_failed"] += 1
+            else:
+                extracted[i] = [dict(prod) for prod in product_info.products]
+                counters["chunks_extracted"] += 1
+                counters["products_extracted"] += len(extracted[i])
+            if progress is not None:
+                progress(dict(counters))
+            if cancel is not None and cancel.is_set():
+                # Closing the generator cancels the LLM calls that have not started
+                results.close()
+                break
+        return extracted, counters["chunks_failed"]
+
+    def _store_products(self, products: List[Dict]) -> None:
+        """Store extracted products in the product vector store"""
+        self.vector_store.add_documents(self._product_documents(products), Config.PRODUCT_INDEX_NAME)
+
+    @staticmethod
+    def _product_documents(products: List[Dict], source: Optional[str] = None) -> List[Document]:
+        """Build the documents of extracted products, optionally tagged with the page they came from
+
+        A product's doc_id is derived from its page and name, so it stays the
+        same when the page is processed again.
+        """
+        metadata = {"type": "product"} if source is None else {"type": "product", "source": source}
+        return [
+            Document(page_content=str(prod), metadata={**metadata, "doc_id": MainService._product_id(prod, source)})
+            for prod in products
+        ]
+
+    @staticmethod
+    def _product_id(product: Dict, source: Optional[str]) -> str:
+        """Derive a stable doc_id from the page and name of an extracted product"""
+        name = product.get("name") or str(product)
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source or 'direct_input'}#{name}"))
         
     def process_description_text(self, text: str) -> None:
         """Process and store description text"""
@@ -80,60 +263,520 @@ class MainService:
         
         self.vector_store.add_documents(split_docs, Config.DESCRIPTION_INDEX_NAME)
         
-    def process_product_text(self, text: str) -> List[Dict]:
+    def process_product_text(self, text: str,
+                             progress: Optional[Callable[[Dict[str, int]], None]] = None) -> List[Dict]:
         """Process and store product text"""
+        products, _ = self.extract_product_text(text, progress)
+        self._store_products(products)
+        return products
+
+    def extract_product_text(self, text: str, progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                             chunk_size: int = Config.PRODUCT_CHUNK_SIZE,
+                             chunk_overlap: int = Config.PRODUCT_CHUNK_OVERLAP) -> Tuple[List[Dict], int]:
+        """Extract the products of a text without storing them"""
         doc = Document(
             page_content=text,
             metadata={"type": "product", "source": "direct_input"}
         )
         
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Config.PRODUCT_CHUNK_SIZE,
-            chunk_overlap=Config.PRODUCT_CHUNK_OVERLAP
-        )
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         split_docs = splitter.split_documents([doc])
-        
-        products = []
-        for doc in split_docs[:3]:  # Limit to first 3 chunks
-            product_info = self.llm_service.format_product_info(doc.page_content)
-            products.extend([dict(prod) for prod in product_info.products])
-            
-        # Store products in vector store
-        product_docs = [
-            Document(
-                page_content=str(prod),
-                metadata={"type": "product", "doc_id": str(time.time())}
-            )
-            for prod in products
-        ]
-        self.vector_store.add_documents(product_docs, Config.PRODUCT_INDEX_NAME)
-        
-        return products
+        return self.extract_products(split_docs, progress)
         
     def get_chatbot_response(self, query: str) -> str:
         """Get chatbot response based on query"""
-        ratio = self.llm_service.get_retriever_ratio(query)
-        
-        num_desc_docs = int((1 - ratio) * 10)
-        num_prod_docs = 10 - num_desc_docs
-        
-        desc_docs = self.vector_store.search_documents(
-            query,
-            Config.DESCRIPTION_INDEX_NAME,
-            k=num_desc_docs
+        return self.get_chatbot_response_with_timings(query)["response"]
+
+    def get_chatbot_response_with_timings(self, query: str) -> Dict[str, Any]:
+        """Get chatbot response together with the time spent in each stage
+
+        Answers are served from the answer cache when an identical or
+        near-identical query was answered since the stores last changed.
+
+        Returns:
+            Dictionary with the response, a timings dictionary in seconds, how
+            the answer cache was used ("exact", "similar", "miss" or None when
+            disabled) and the context packing report (None for cached answers)
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        context_report = None
+        response, cache_status, generations = self._lookup_answer(query, timings)
+        if response is None:
+            documents = self.retrieve_documents(query, timings)
+            context = self._timed(timings, "context", self.build_context, query, documents)
+            context_report = context.report
+
+            answer_start = time.perf_counter()
+            response = self.llm_service.get_chatbot_response(query, context.text)
+            timings["answer"] = time.perf_counter() - answer_start
+            self._store_answer(query, response, generations)
+        timings["total"] = time.perf_counter() - start
+        return {"response": response, "timings": timings, "cache": cache_status, "context": context_report}
+
+    def stream_chatbot_response(self, query: str, result: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Stream the chatbot response as the model produces it
+
+        A cached answer is yielded as a single chunk.
+
+        Args:
+            query: User query
+            result: Dictionary that receives the timings and cache status, as
+                returned by get_chatbot_response_with_timings, once the
+                stream is exhausted
+
+        Yields:
+            Text chunks of the response, in order
+        """
+        result = {} if result is None else result
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        context_report = None
+        response, cache_status, generations = self._lookup_answer(query, timings)
+        if response is not None:
+            timings["first_token"] = time.perf_counter() - start
+            yield response
+        else:
+            documents = self.retrieve_documents(query, timings)
+            context = self._timed(timings, "context", self.build_context, query, documents)
+            context_report = context.report
+
+            answer_start = time.perf_counter()
+            chunks = []
+            for chunk in self.llm_service.stream_chatbot_response(query, context.text):
+                if not chunks:
+                    timings["first_token"] = time.perf_counter() - start
+                chunks.append(chunk)
+                yield chunk
+            timings["answer"] = time.perf_counter() - answer_start
+            response = "".join(chunks)
+            self._store_answer(query, response, generations)
+        timings["total"] = time.perf_counter() - start
+        result.update({"response": response, "timings": timings, "cache": cache_status, "context": context_report})
+
+    async def aget_chatbot_response(self, query: str) -> str:
+        """Async counterpart of get_chatbot_response"""
+        return (await self.aget_chatbot_response_with_timings(query))["response"]
+
+    async def aget_chatbot_response_with_timings(self, query: str) -> Dict[str, Any]:
+        """Async counterpart of get_chatbot_response_with_timings
+
+        The embedding and LLM calls are awaited rather than holding a thread,
+        so one event loop can serve many chats while they wait on the APIs.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        context_report = None
+        response, cache_status, generations = await self._alookup_answer(query, timings)
+        if response is None:
+            documents = await self.aretrieve_documents(query, timings)
+            context = await self._atimed(timings, "context", self._offload(self.build_context, query, documents))
+            context_report = context.report
+
+            response = await self._atimed(
+                timings, "answer", self.llm_service.aget_chatbot_response(query, context.text)
+            )
+            await self._offload(self._store_answer, query, response, generations)
+        timings["total"] = time.perf_counter() - start
+        return {"response": response, "timings": timings, "cache": cache_status, "context": context_report}
+
+    async def astream_chatbot_response(self, query: str,
+                                       result: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Async counterpart of stream_chatbot_response"""
+        result = {} if result is None else result
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        context_report = None
+        response, cache_status, generations = await self._alookup_answer(query, timings)
+        if response is not None:
+            timings["first_token"] = time.perf_counter() - start
+            yield response
+        else:
+            documents = await self.aretrieve_documents(query, timings)
+            context = await self._atimed(timings, "context", self._offload(self.build_context, query, documents))
+            context_report = context.report
+
+            answer_start = time.perf_counter()
+            chunks = []
+            async for chunk in self.llm_service.astream_chatbot_response(query, context.text):
+                if not chunks:
+                    timings["first_token"] = time.perf_counter() - start
+                chunks.append(chunk)
+                yield chunk
+            timings["answer"] = time.perf_counter() - answer_start
+            response = "".join(chunks)
+            await self._offload(self._store_answer, query, response, generations)
+        timings["total"] = time.perf_counter() - start
+        result.update({"response": response, "timings": timings, "cache": cache_status, "context": context_report})
+
+    def batch_chatbot_responses(self, queries: List[str]) -> Iterator[Dict[str, Any]]:
+        """Answer many queries, yielding each result as soon as it is ready
+
+        Cached answers come first. The remaining queries that need vectors are
+        embedded with one batched call and searched with one FAISS call per
+        store, and the answers are generated with a batched LLM call running
+        at most Config.CHAT_BATCH_CONCURRENCY requests at a time.
+
+        A query asked more than once is answered once, and the result is
+        yielded for each of its positions.
+
+        Yields:
+            Dictionaries with the position and text of a query and either its
+            response, cache status and context report, or an error
+        """
+        positions: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            positions.setdefault(query, []).append(i)
+        for result in self._batch_unique_responses(list(positions)):
+            for i in positions[result["query"]]:
+                yield {**result, "index": i}
+
+    def _batch_unique_responses(self, queries: List[str]) -> Iterator[Dict[str, Any]]:
+        """Answer distinct queries for batch_chatbot_responses, indexing results by position in queries"""
+        cache = self.answer_cache
+        generations = self._store_generations() if cache is not None else None
+        cache_status = "miss" if cache is not None else None
+        pending = []
+        for i, query in enumerate(queries):
+            response = cache.get_exact(query, generations) if cache is not None else None
+            if response is not None:
+                yield {"index": i, "query": query, "response": response, "cache": "exact", "context": None}
+            else:
+                pending.append(i)
+
+        keyword_hits = {i: self._keyword_hits(queries[i], {}) for i in pending}
+        from_keywords = [i for i in pending if self._answers_from_keywords(queries[i], keyword_hits[i])]
+        keyword_answered = set(from_keywords)
+        to_embed = [i for i in pending if i not in keyword_answered]
+        vectors = dict(zip(to_embed, self.vector_store.embed_queries([queries[i] for i in to_embed])))
+        to_search = []
+        for i in to_embed:
+            response = None
+            if cache is not None and not self._keyword_only(queries[i]):
+                response = cache.get_similar(vectors[i], generations)
+            if response is not None:
+                yield {"index": i, "query": queries[i], "response": response, "cache": "similar", "context": None}
+            else:
+                to_search.append(i)
+
+        documents = {
+            i: self._merge_hits(self.query_router.route_keywords(*keyword_hits[i]), ([], []), keyword_hits[i])
+            for i in from_keywords
+        }
+        vector_hits = dict(zip(to_search, self._vector_hits_many([vectors[i] for i in to_search])))
+        if Config.ROUTER_MODE == "llm":
+            ratios = dict(zip(to_search, self._retriever_ratios([queries[i] for i in to_search])))
+        else:
+            ratios = {i: self.query_router.route(*vector_hits[i]) for i in to_search}
+            undecided = [i for i in to_search if ratios[i] is None]
+            ratios.update(zip(undecided, self._retriever_ratios([queries[i] for i in undecided])))
+        for i in to_search:
+            documents[i] = self._merge_hits(ratios[i], vector_hits[i], keyword_hits[i])
+
+        answer_ids = from_keywords + to_search
+        # The batch vectors are passed on, as a batch larger than the query
+        # embedding cache would otherwise embed each query again
+        contexts = {i: self.build_context(queries[i], documents[i], vectors.get(i)) for i in answer_ids}
+        answers = self.llm_service.batch_chatbot_responses(
+            [(queries[i], contexts[i].text) for i in answer_ids], Config.CHAT_BATCH_CONCURRENCY
         )
-        prod_docs = self.vector_store.search_documents(
-            query,
-            Config.PRODUCT_INDEX_NAME,
-            k=num_prod_docs
+        for position, response in answers:
+            i = answer_ids[position]
+            if isinstance(response, Exception):
+                yield {"index": i, "query": queries[i], "error": str(response)}
+                continue
+            self._store_answer(queries[i], response, generations, vectors.get(i))
+            yield {
+                "index": i,
+                "query": queries[i],
+                "response": response,
+                "cache": cache_status,
+                "context": contexts[i].report
+            }
+
+    def _retriever_ratios(self, queries: List[str]) -> List[float]:
+        """Get the LLM router ratios of many queries"""
+        if not queries:
+            return []
+        return self.llm_service.get_retriever_ratios(queries, Config.CHAT_BATCH_CONCURRENCY)
+
+    def build_context(self, query: str, documents: List[Document],
+                      vector: Optional[List[float]] = None) -> PackedContext:
+        """Pack retrieved documents into the answer prompt's token budget
+
+        The query vector is the one given, or comes from the query embedding
+        cache, and the document vectors are read back from the stores, so
+        nothing is embedded here. Keyword-only queries are never embedded and
+        keep their retrieval order.
+        """
+        if self._keyword_only(query):
+            return self.context_builder.build(documents)
+        ids = [doc.id for doc in documents if doc.id]
+        doc_vectors = self.vector_store.get_vectors(Config.DESCRIPTION_INDEX_NAME, ids)
+        missing = [store_id for store_id in ids if store_id not in doc_vectors]
+        if missing:
+            doc_vectors.update(self.vector_store.get_vectors(Config.PRODUCT_INDEX_NAME, missing))
+        if vector is None:
+            vector = self.vector_store.embed_query(query)
+        return self.context_builder.build(documents, vector, doc_vectors)
+
+    def _lookup_answer(self, query: str, timings: Dict[str, float]) -> Tuple[Optional[str], Optional[str], Any]:
+        """Look a query up in the answer cache
+
+        Returns:
+            The cached response or None, the cache status and the store
+            generations to cache a new answer under
+        """
+        if self.answer_cache is None:
+            return None, None, None
+        start = time.perf_counter()
+        generations = self._store_generations()
+        response = self.answer_cache.get_exact(query, generations)
+        cache_status = "exact"
+        if response is None and not self._keyword_only(query):
+            # The vector stays in the query embedding cache for retrieval
+            vector = self.vector_store.embed_query(query)
+            response = self.answer_cache.get_similar(vector, generations)
+            cache_status = "similar"
+        timings["cache_lookup"] = time.perf_counter() - start
+        if response is None:
+            cache_status = "miss"
+        return response, cache_status, generations
+
+    async def _alookup_answer(self, query: str,
+                              timings: Dict[str, float]) -> Tuple[Optional[str], Optional[str], Any]:
+        """Async counterpart of _lookup_answer"""
+        if self.answer_cache is None:
+            return None, None, None
+        start = time.perf_counter()
+        generations = await self._offload(self._store_generations)
+        response = self.answer_cache.get_exact(query, generations)
+        cache_status = "exact"
+        if response is None and not self._keyword_only(query):
+            vector = await self.vector_store.aembed_query(query)
+            response = self.answer_cache.get_similar(vector, generations)
+            cache_status = "similar"
+        timings["cache_lookup"] = time.perf_counter() - start
+        if response is None:
+            cache_status = "miss"
+        return response, cache_status, generations
+
+    def _store_answer(self, query: str, response: str, generations: Any,
+                      vector: Optional[List[float]] = None) -> None:
+        """Cache a generated answer under the store generations it was retrieved at"""
+        if self.answer_cache is not None:
+            if self._keyword_only(query):
+                vector = None
+            elif vector is None:
+                vector = self.vector_store.embed_query(query)
+            self.answer_cache.put(query, vector, response, generations)
+
+    @staticmethod
+    def _keyword_only(query: str) -> bool:
+        """Check whether a query is answered from the keyword indexes without embedding it"""
+        return Config.HYBRID_SEARCH and is_keyword_query(query)
+
+    def _store_generations(self) -> Tuple[int, int]:
+        """Get the generations of the stores chat answers are retrieved from"""
+        return (
+            self.vector_store.get_generation(Config.DESCRIPTION_INDEX_NAME),
+            self.vector_store.get_generation(Config.PRODUCT_INDEX_NAME)
         )
-        
-        documents = desc_docs + prod_docs
-        return self.llm_service.get_chatbot_response(query, documents)
+
+    def retrieve_documents(self, query: str, timings: Optional[Dict[str, float]] = None) -> List[Document]:
+        """Retrieve the context documents for a chat query
+
+        The query is embedded once and reused for both stores. Each store
+        returns its top CHAT_CONTEXT_DOCS hits, which are sliced by the router
+        ratio. In unified mode both come from a single search. With
+        Config.ROUTER_MODE "local" the ratio comes from the scores of those
+        hits and the LLM router is only called when they are too close to
+        call; in "llm" mode the LLM router call runs concurrently with the
+        searches.
+
+        With Config.HYBRID_SEARCH the BM25 hits of each store are fused with
+        its vector hits by reciprocal rank. Keyword-only queries that have
+        keyword hits skip the embedding, the vector search and the LLM router.
+
+        Args:
+            query: User query
+            timings: Dictionary that receives the duration of each stage
+        """
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        keyword_hits = self._keyword_hits(query, timings)
+        if self._answers_from_keywords(query, keyword_hits):
+            timings["retrieval"] = time.perf_counter() - start
+            return self._merge_hits(self.query_router.route_keywords(*keyword_hits), ([], []), keyword_hits)
+
+        ratio_future = None
+        if Config.ROUTER_MODE == "llm":
+            ratio_future = self._executor.submit(
+                self._timed, timings, "router", self.llm_service.get_retriever_ratio, query
+            )
+        vector = self._timed(timings, "embedding", self.vector_store.embed_query, query)
+        vector_hits = self._vector_hits(vector, timings)
+        if ratio_future is not None:
+            ratio = ratio_future.result()
+        else:
+            ratio = self._timed(timings, "router", self.query_router.route, *vector_hits)
+            if ratio is None:
+                ratio = self._timed(timings, "router_llm", self.llm_service.get_retriever_ratio, query)
+        timings["retrieval"] = time.perf_counter() - start
+        return self._merge_hits(ratio, vector_hits, keyword_hits)
+
+    async def aretrieve_documents(self, query: str, timings: Optional[Dict[str, float]] = None) -> List[Document]:
+        """Async counterpart of retrieve_documents
+
+        The query is embedded and the LLM router called with the async
+        clients; the index searches run on the retrieval thread pool.
+        """
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        keyword_hits = await self._offload(self._keyword_hits, query, timings)
+        if self._answers_from_keywords(query, keyword_hits):
+            timings["retrieval"] = time.perf_counter() - start
+            return self._merge_hits(self.query_router.route_keywords(*keyword_hits), ([], []), keyword_hits)
+
+        ratio_task = None
+        if Config.ROUTER_MODE == "llm":
+            ratio_task = asyncio.ensure_future(
+                self._atimed(timings, "router", self.llm_service.aget_retriever_ratio(query))
+            )
+        vector = await self._atimed(timings, "embedding", self.vector_store.aembed_query(query))
+        vector_hits = await self._offload(self._vector_hits, vector, timings)
+        if ratio_task is not None:
+            ratio = await ratio_task
+        else:
+            ratio = self._timed(timings, "router", self.query_router.route, *vector_hits)
+            if ratio is None:
+                ratio = await self._atimed(timings, "router_llm", self.llm_service.aget_retriever_ratio(query))
+        timings["retrieval"] = time.perf_counter() - start
+        return self._merge_hits(ratio, vector_hits, keyword_hits)
+
+    def _keyword_hits(self, query: str, timings: Dict[str, float]) -> Tuple[List, List]:
+        """Get the BM25 hits of the description and product stores, or none without hybrid search"""
+        if not Config.HYBRID_SEARCH:
+            return [], []
+        k = Config.CHAT_CONTEXT_DOCS
+        desc_hits = self._timed(
+            timings, "description_keyword_search",
+            self.vector_store.keyword_search, query, Config.DESCRIPTION_INDEX_NAME, k
+        )
+        prod_hits = self._timed(
+            timings, "product_keyword_search",
+            self.vector_store.keyword_search, query, Config.PRODUCT_INDEX_NAME, k
+        )
+        return desc_hits, prod_hits
+
+    @staticmethod
+    def _answers_from_keywords(query: str, keyword_hits: Tuple[List, List]) -> bool:
+        """Check whether a keyword-only query can be answered from its keyword hits alone"""
+        return bool(keyword_hits[0] or keyword_hits[1]) and is_keyword_query(query)
+
+    def _vector_hits(self, vector: List[float], timings: Dict[str, float]) -> Tuple[List, List]:
+        """Get the (document, distance) hits of the description and product stores"""
+        k = Config.CHAT_CONTEXT_DOCS
+        desc_type = Config.STORE_TYPES[Config.DESCRIPTION_INDEX_NAME]
+        prod_type = Config.STORE_TYPES[Config.PRODUCT_INDEX_NAME]
+        if Config.UNIFIED_INDEX:
+            # One pass over the unified store collects the top k of each type
+            hits = self._timed(
+                timings, "search",
+                self.vector_store.search_by_types, vector, Config.UNIFIED_INDEX_NAME,
+                {desc_type: k, prod_type: k}
+            )
+            return hits[desc_type], hits[prod_type]
+        desc_hits = self._timed(
+            timings, "description_search",
+            self.vector_store.search_by_vector_with_scores, vector, Config.DESCRIPTION_INDEX_NAME, k
+        )
+        prod_hits = self._timed(
+            timings, "product_search",
+            self.vector_store.search_by_vector_with_scores, vector, Config.PRODUCT_INDEX_NAME, k
+        )
+        return desc_hits, prod_hits
+
+    def _vector_hits_many(self, vectors: List[List[float]]) -> List[Tuple[List, List]]:
+        """Batch form of _vector_hits: one FAISS search per store for all vectors"""
+        if not vectors:
+            return []
+        k = Config.CHAT_CONTEXT_DOCS
+        desc_type = Config.STORE_TYPES[Config.DESCRIPTION_INDEX_NAME]
+        prod_type = Config.STORE_TYPES[Config.PRODUCT_INDEX_NAME]
+        if Config.UNIFIED_INDEX:
+            hits = self.vector_store.search_by_types_many(
+                vectors, Config.UNIFIED_INDEX_NAME, {desc_type: k, prod_type: k}
+            )
+            return [(query_hits[desc_type], query_hits[prod_type]) for query_hits in hits]
+        desc_hits = self.vector_store.search_by_vectors_with_scores(vectors, Config.DESCRIPTION_INDEX_NAME, k)
+        prod_hits = self.vector_store.search_by_vectors_with_scores(vectors, Config.PRODUCT_INDEX_NAME, k)
+        return list(zip(desc_hits, prod_hits))
+
+    def _merge_hits(self, ratio: float, vector_hits: Tuple[List, List],
+                    keyword_hits: Tuple[List, List]) -> List[Document]:
+        """Fuse the vector and keyword hits of each store and slice them by the router ratio"""
+        merged = []
+        for hits, keyword in zip(vector_hits, keyword_hits):
+            docs = [doc for doc, _ in hits]
+            if keyword:
+                docs = reciprocal_rank_fusion([docs, [doc for doc, _ in keyword]], Config.RRF_K)
+            merged.append(docs)
+        desc_docs, prod_docs = merged
+        num_desc_docs, num_prod_docs = self._split_context(ratio, Config.CHAT_CONTEXT_DOCS)
+        return desc_docs[:num_desc_docs] + prod_docs[:num_prod_docs]
+
+    @staticmethod
+    def _split_context(ratio: float, k: int) -> Tuple[int, int]:
+        """Split k context documents between descriptions and products by the router ratio"""
+        ratio = min(max(ratio, 0.0), 1.0)
+        num_desc_docs = int((1 - ratio) * k)
+        return num_desc_docs, k - num_desc_docs
+
+    @staticmethod
+    def _timed(timings: Dict[str, float], stage: str, func, *args):
+        """Call func and record how long it took under stage"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = time.perf_counter() - start
+
+    @staticmethod
+    async def _atimed(timings: Dict[str, float], stage: str, awaitable: Awaitable):
+        """Await awaitable and record how long it took under stage"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = time.perf_counter() - start
+
+    async def _offload(self, func, *args):
+        """Run a blocking call, such as an index search, on the retrieval thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
         
     def get_all_products(self) -> List[Dict]:
         """Get all products from the vector store"""
         docs = self.vector_store.get_all_documents(Config.PRODUCT_INDEX_NAME)
+        return self._docs_to_products(docs)
+
+    def list_products(self, cursor: Optional[str] = None, limit: int = Config.LIST_PAGE_SIZE,
+                      filters: Optional[Dict[str, Any]] = None) -> Dict:
+        """Get one page of products from the vector store
+
+        Returns:
+            Dictionary with the products and the cursor for the next page
+        """
+        docs, next_cursor = self.vector_store.list_documents(
+            Config.PRODUCT_INDEX_NAME, cursor=cursor, limit=limit, filters=filters
+        )
+        return {
+            "products": self._docs_to_products(docs),
+            "next_cursor": next_cursor
+        }
+
+    def _docs_to_products(self, docs: List[Document]) -> List[Dict]:
+        """Parse stored product documents back into product dictionaries"""
         products = []
         
         for doc in docs:
@@ -194,33 +837,14 @@ class MainService:
         if not product_id and not product_name:
             raise ValueError("Either product_id or product_name must be provided")
             
-        # Create list of IDs to remove
-        ids_to_remove = []
-        
-        # Get all documents
-        docs = self.vector_store.get_all_documents(Config.PRODUCT_INDEX_NAME)
-        
-        for doc in docs:
-            if doc.metadata.get("type") == "init":
-                continue
-                
-            # Match by ID
-            if product_id and doc.metadata.get("doc_id") == product_id:
-                ids_to_remove.append(doc.metadata.get("doc_id"))
-                break
-                
-            # Match by name
-            if product_name and not product_id:
-                try:
-                    import ast
-                    product_dict = ast.literal_eval(doc.page_content)
-                    if product_dict.get("name") == product_name:
-                        ids_to_remove.append(doc.metadata.get("doc_id"))
-                except Exception:
-                    continue
+        # Look up matching documents in the metadata index
+        if product_id:
+            ids_to_remove = self.vector_store.find_ids(Config.PRODUCT_INDEX_NAME, "doc_id", product_id)
+        else:
+            ids_to_remove = self.vector_store.find_ids(Config.PRODUCT_INDEX_NAME, "name", product_name)
                     
         if ids_to_remove:
-            self.vector_store.remove_documents(ids_to_remove, Config.PRODUCT_INDEX_NAME)
+            self.vector_store.remove_documents_by_ids(ids_to_remove, Config.PRODUCT_INDEX_NAME)
             return True
             
         return False
@@ -270,20 +894,30 @@ class MainService:
         Returns:
             Boolean indicating if document was removed successfully
         """
-        # Get all documents
-        docs = self.vector_store.get_all_documents(Config.DESCRIPTION_INDEX_NAME)
-        
-        # Find document to remove
-        for doc in docs:
-            if doc.metadata.get("doc_id") == doc_id:
-                self.vector_store.remove_documents([doc_id], Config.DESCRIPTION_INDEX_NAME)
-                return True
-                
-        return False
+        return self.vector_store.remove_documents([doc_id], Config.DESCRIPTION_INDEX_NAME) > 0
         
     def get_all_descriptions(self) -> List[Dict]:
         """Get all descriptions from the vector store"""
         docs = self.vector_store.get_all_documents(Config.DESCRIPTION_INDEX_NAME)
+        return self._docs_to_descriptions(docs)
+
+    def list_descriptions(self, cursor: Optional[str] = None, limit: int = Config.LIST_PAGE_SIZE,
+                          filters: Optional[Dict[str, Any]] = None) -> Dict:
+        """Get one page of descriptions from the vector store
+
+        Returns:
+            Dictionary with the descriptions and the cursor for the next page
+        """
+        docs, next_cursor = self.vector_store.list_documents(
+            Config.DESCRIPTION_INDEX_NAME, cursor=cursor, limit=limit, filters=filters
+        )
+        return {
+            "descriptions": self._docs_to_descriptions(docs),
+            "next_cursor": next_cursor
+        }
+
+    def _docs_to_descriptions(self, docs: List[Document]) -> List[Dict]:
+        """Convert stored description documents into response dictionaries"""
         descriptions = []
         
         for doc in docs:
@@ -300,16 +934,15 @@ class MainService:
         
     def get_description_by_id(self, doc_id: str) -> Optional[Dict]:
         """Get a single description by its ID"""
-        docs = self.vector_store.get_all_documents(Config.DESCRIPTION_INDEX_NAME)
-        
-        for doc in docs:
-            if doc.metadata.get("doc_id") == doc_id:
-                return {
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "doc_id": doc_id
-                }
-        return None
+        docs = self.vector_store.find_documents(Config.DESCRIPTION_INDEX_NAME, "doc_id", doc_id)
+        if not docs:
+            return None
+            
+        return {
+            "content": docs[0].page_content,
+            "metadata": docs[0].metadata,
+            "doc_id": doc_id
+        }
         
     def update_description(self, doc_id: str, text: str, title: str = None) -> bool:
         """Update an existing description document
@@ -322,29 +955,20 @@ class MainService:
         Returns:
             Boolean indicating if update was successful
         """
-        docs = self.vector_store.get_all_documents(Config.DESCRIPTION_INDEX_NAME)
-        old_doc = None
-        new_docs = []
-        
-        for doc in docs:
-            if doc.metadata.get("doc_id") == doc_id:
-                old_doc = doc
-                # Create updated document
-                new_doc = Document(
-                    page_content=text,
-                    metadata={
-                        **old_doc.metadata,
-                        "title": title if title else old_doc.metadata.get("title", "Untitled"),
-                        "updated_at": time.time()
-                    }
-                )
-                new_docs.append(new_doc)
-            else:
-                new_docs.append(doc)
-                
-        if not old_doc:
+        docs = self.vector_store.find_documents(Config.DESCRIPTION_INDEX_NAME, "doc_id", doc_id)
+        if not docs:
             return False
             
-        # Update vector store with new documents
-        self.vector_store.update_documents(new_docs, Config.DESCRIPTION_INDEX_NAME)
-        return True 
\ No newline at end of file
+        old_doc = docs[0]
+        new_doc = Document(
+            page_content=text,
+            metadata={
+                **old_doc.metadata,
+                "title": title if title else old_doc.metadata.get("title", "Untitled"),
+                "updated_at": time.time()
+            }
+        )
+        
+        # Replace the stored document that has the same doc_id
+        self.vector_store.update_documents([new_doc], Config.DESCRIPTION_INDEX_NAME)
+        return True
\ No newline at end of file
@@ -0,0 +1,188 @@
+import ast
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from langchain_core.documents.base import Document
+from src.services.sqlite_docstore import fetch_documents
+
+METADATA_INDEX_FILE = "metadata_index.json"
+
+
+class MetadataIndex:
+    """Secondary index from metadata values to docstore ids and FAISS row ids
+
+    The index is kept up to date by VectorStoreService on every add and
+    remove and persisted next to the FAISS files, so point lookups by
+    doc_id, product name, source or type never scan the docstore.
+
+    Each document also gets a sequence number that only grows as documents
+    are added. Removing documents compacts the FAISS rows but keeps their
+    order, so sequence numbers increase with the row and list cursors built
+    from them stay valid across deletes.
+    """
+
+    FIELDS = ("doc_id", "name", "source", "type")
+
+    def __init__(self):
+        self.values: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.FIELDS}
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self.rows: Dict[str, int] = {}
+        self.seqs: Dict[str, int] = {}
+        self.next_seq = 0
+        # (field, value) pairs whose id set this index may change; None when it owns them all
+        self._owned: Optional[Set[Tuple[str, str]]] = None
+
+    @classmethod
+    def build(cls, index_to_docstore_id: Dict[int, str], docstore: Any) -> "MetadataIndex":
+        """Build the index by walking every document in a store"""
+        metadata_index = cls()
+        rows = sorted(index_to_docstore_id.items())
+        for start in range(0, len(rows), 1000):
+            batch = rows[start:start + 1000]
+            documents = fetch_documents(docstore, [store_id for _, store_id in batch])
+            for (row, store_id), doc in zip(batch, documents):
+                if doc is not None:
+                    metadata_index.add(store_id, row, doc)
+        return metadata_index
+
+    @staticmethod
+    def _extract_fields(doc: Document) -> Dict[str, str]:
+        """Pick the indexed values out of a document"""
+        fields = {
+            field: str(doc.metadata[field])
+            for field in MetadataIndex.FIELDS
+            if doc.metadata.get(field) is not None
+        }
+        # Products added before ids were unified carry their id as product_id
+        if "doc_id" not in fields and doc.metadata.get("product_id") is not None:
+            fields["doc_id"] = str(doc.metadata["product_id"])
+        # Products extracted by the LLM only carry their name in the content
+        if "name" not in fields and doc.metadata.get("type") == "product":
+            try:
+                product = ast.literal_eval(doc.page_content)
+                if isinstance(product, dict) and product.get("name"):
+                    fields["name"] = str(product["name"])
+            except Exception:
+                pass
+        return fields
+
+    def add(self, store_id: str, row: int, doc: Document) -> None:
+        """Index a document stored under store_id at the given FAISS row"""
+        self._add_fields(store_id, row, self._extract_fields(doc))
+
+    def _add_fields(self, store_id: str, row: int, fields: Dict[str, str], seq: Optional[int] = None) -> None:
+        if seq is None:
+            seq = self.next_seq
+        self.next_seq = max(self.next_seq, seq + 1)
+        self.entries[store_id] = fields
+        self.rows[store_id] = row
+        self.seqs[store_id] = seq
+        for field, value in fields.items():
+            ids = self._own_ids(field, value)
+            if ids is None:
+                ids = self.values[field][value] = set()
+                if self._owned is not None:
+                    self._owned.add((field, value))
+            ids.add(store_id)
+
+    def _own_ids(self, field: str, value: str) -> Optional[Set[str]]:
+        """Get the id set of a field value for changing it, copying it if it is shared"""
+        ids = self.values[field].get(value)
+        if ids is not None and self._owned is not None and (field, value) not in self._owned:
+            ids = self.values[field][value] = set(ids)
+            self._owned.add((field, value))
+        return ids
+
+    def remove(self, store_ids: Iterable[str]) -> None:
+        """Drop documents from the index"""
+        for store_id in store_ids:
+            fields = self.entries.pop(store_id, {})
+            self.rows.pop(store_id, None)
+            self.seqs.pop(store_id, None)
+            for field, value in fields.items():
+                ids = self._own_ids(field, value)
+                if ids is not None:
+                    ids.discard(store_id)
+                    if not ids:
+                        del self.values[field][value]
+
+    def reindex_rows(self, index_to_docstore_id: Dict[int, str]) -> None:
+        """Refresh the row ids after FAISS has compacted the index"""
+        self.rows = {store_id: row for row, store_id in index_to_docstore_id.items()}
+
+    def lookup(self, field: str, value: Any) -> List[str]:
+        """Get the docstore ids of documents whose field equals value"""
+        if field not in self.values:
+            raise ValueError(f"Field {field} is not indexed")
+        return list(self.values[field].get(str(value), ()))
+
+    def field_value(self, store_id: str, field: str) -> Optional[str]:
+        """Get the indexed value of a field for a document"""
+        return self.entries.get(store_id, {}).get(field)
+
+    def row(self, store_id: str) -> Optional[int]:
+        """Get the FAISS row id of a document"""
+        return self.rows.get(store_id)
+
+    def seq(self, store_id: str) -> Optional[int]:
+        """Get the sequence number of a document"""
+        return self.seqs.get(store_id)
+
+    def is_consistent_with(self, index_to_docstore_id: Dict[int, str]) -> bool:
+        """Check that the index covers exactly the rows of a loaded store"""
+        if len(self.rows) != len(index_to_docstore_id):
+            return False
+        return all(self.rows.get(store_id) == row for row, store_id in index_to_docstore_id.items())
+
+    def copy(self) -> "MetadataIndex":
+        """Copy the index so the copy can be changed while readers keep using the original
+
+        Id sets are shared with the original until the copy first changes
+        them, and the fields of an entry are never changed in place.
+        """
+        metadata_index = MetadataIndex()
+        metadata_index.values = {field: dict(by_value) for field, by_value in self.values.items()}
+        metadata_index.entries = dict(self.entries)
+        metadata_index.rows = dict(self.rows)
+        metadata_index.seqs = dict(self.seqs)
+        metadata_index.next_seq = self.next_seq
+        metadata_index._owned = set()
+        return metadata_index
+
+    def save(self, store_path: str) -> None:
+        """Persist the index next to the FAISS files
+
+        Entries are encoded a slice at a time: the C JSON encoder holds the
+        GIL, so encoding a large index in one call would stall searches on
+        other threads, and json.dump's pure Python encoder is many times
+        slower.
+        """
+        entries = list(self.entries.items())
+        path = os.path.join(store_path, METADATA_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f'{{"fields": {json.dumps(list(self.FIELDS))}, "next_seq": {self.next_seq}, "entries": {{')
+            for start in range(0, len(entries), 1000):
+                chunk = {
+                    store_id: [self.rows[store_id], fields, self.seqs[store_id]]
+                    for store_id, fields in entries[start:start + 1000]
+                }
+                f.write((", " if start else "") + json.dumps(chunk)[1:-1])
+            f.write("}}")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, store_path: str) -> Optional["MetadataIndex"]:
+        """Load a persisted index, or None if it is missing or unreadable"""
+        try:
+            with open(os.path.join(store_path, METADATA_INDEX_FILE)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("fields") != list(cls.FIELDS) or "next_seq" not in data:
+            return None
+        metadata_index = cls()
+        for store_id, (row, fields, seq) in data["entries"].items():
+            metadata_index._add_fields(store_id, row, fields, seq)
+        metadata_index.next_seq = data["next_seq"]
+        return metadata_index
@@ -0,0 +1,122 @@
+import base64
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from langchain_core.documents.base import Document
+
+JOURNAL_FILE = "journal.jsonl"
+
+
+def encode_vectors(vectors: List[List[float]]) -> Dict[str, Any]:
+    """Pack embedding vectors into a compact JSON-serializable form"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return {
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "data": base64.b64encode(matrix.tobytes()).decode("ascii")
+    }
+
+
+def decode_vectors(packed: Dict[str, Any]) -> np.ndarray:
+    """Unpack vectors written by encode_vectors"""
+    matrix = np.frombuffer(base64.b64decode(packed["data"]), dtype=np.float32)
+    return matrix.reshape(-1, packed["dim"]) if packed["dim"] else matrix.reshape(0, 0)
+
+
+def encode_documents(documents: List[Document]) -> List[Dict[str, Any]]:
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+
+
+def decode_documents(records: List[Dict[str, Any]]) -> List[Document]:
+    return [Document(page_content=r["page_content"], metadata=r["metadata"]) for r in records]
+
+
+class MutationJournal:
+    """Append-only log of the mutations applied to a vector store since its last checkpoint
+
+    Each line is one JSON record:
+
+        {"op": "add", "ids": [...], "documents": [...], "vectors": {...}}
+        {"op": "delete", "ids": [...]}
+        {"op": "update", "delete_ids": [...], "ids": [...], "documents": [...], "vectors": {...}}
+
+    Add records carry the embedding vectors so replaying the journal never
+    calls the embedding API. Records are fsynced before they are applied.
+    """
+
+    def __init__(self, store_path: str):
+        self.path = os.path.join(store_path, JOURNAL_FILE)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, record: Dict[str, Any], offset: int) -> int:
+        """Durably append a record after the given offset
+
+        Anything past offset (a torn write left by a crash) is discarded first.
+
+        Returns:
+            The offset just past the appended record
+        """
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            if f.tell() != offset:
+                f.truncate(offset)
+                f.seek(offset)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        return offset + len(line)
+
+    def read_from(self, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Yield (record, end offset) for every complete record after offset"""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Incomplete tail from an interrupted write
+                    return
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return
+                offset += len(line)
+                yield record, offset
+
+    def truncate(self, offset: int) -> None:
+        """Discard an incomplete record left past offset by an interrupted write"""
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, offset: int) -> None:
+        """Drop the records before offset once they are part of a checkpoint
+
+        Records appended after offset are kept. The new journal is swapped in
+        with an atomic rename.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    shutil.copyfileobj(f, out)
+            except OSError:
+                pass
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        """Start an empty journal after the store has been replaced wholesale"""
+        self.compact(self.size())
@@ -0,0 +1,272 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from langchain_core.documents.base import Document
+from src.config.config import Config
+from src.services.crawl_manifest import content_hash
+from src.services.parse_worker import parse_page, start_parse_pool
+
+logger = logging.getLogger(__name__)
+
+
+class FetchedPage:
+    """A downloaded page, or the error that prevented downloading it
+
+    not_modified is set when the server answered a conditional request with
+    304, in which case there is no content.
+    """
+
+    def __init__(self, url: str, content: bytes = b"", content_type: str = "",
+                 error: Optional[Exception] = None, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, not_modified: bool = False):
+        self.url = url
+        self.content = content
+        self.content_type = content_type
+        self.error = error
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+
+class PageFetcher:
+    """Download pages concurrently and parse them in a process pool
+
+    Replaces UnstructuredURLLoader.load(), which downloads and parses one page
+    at a time. Downloads share one pooled keep-alive session and are capped
+    globally and per host; failed pages are logged and skipped, as the
+    loader does by default.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = Config.FETCH_MAX_CONCURRENCY,
+        per_host_concurrency: int = Config.FETCH_PER_HOST_CONCURRENCY,
+        timeout: float = Config.FETCH_TIMEOUT,
+        retries: int = Config.FETCH_RETRIES,
+        parse_workers: int = Config.PARSE_WORKERS
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.parse_workers = parse_workers
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=Config.FETCH_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _host_slot(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            return self._host_slots.setdefault(host, threading.Semaphore(self.per_host_concurrency))
+
+    def fetch(self, url: str, previous: Optional[Dict[str, Any]] = None) -> FetchedPage:
+        """Download one page, waiting for a free slot of its host
+
+        Args:
+            url: Page to download
+            previous: Crawl manifest entry of the page; its ETag and
+                Last-Modified validators make the request conditional
+        """
+        with self._host_slot(self._host(url)):
+            return self._download(url, previous)
+
+    def _download(self, url: str, previous: Optional[Dict[str, Any]]) -> FetchedPage:
+        """Download one page; the caller holds a slot of its host"""
+        previous = previous or {}
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            return FetchedPage(url, error=e)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304:
+            # A 304 may omit the validators, which then stay as they were
+            return FetchedPage(
+                url,
+                etag=etag or previous.get("etag"),
+                last_modified=last_modified or previous.get("last_modified"),
+                not_modified=True
+            )
+        return FetchedPage(url, response.content, response.headers.get("Content-Type", ""),
+                           etag=etag, last_modified=last_modified)
+
+    def fetch_all(self, urls: List[str],
+                  previous: Optional[Dict[str, Dict[str, Any]]] = None) -> Iterator[FetchedPage]:
+        """Download pages concurrently, yielding each one as it completes
+
+        At most max_concurrency downloads are in flight and a new one starts
+        only when a finished page has been taken, so a slow consumer holds
+        back the downloads instead of letting pages pile up in memory. A
+        download is only handed to a worker once a slot of its host is free,
+        so pages of a slow host wait in a queue of that host rather than
+        occupying workers that could download other hosts' pages.
+
+        Args:
+            urls: Pages to download
+            previous: Crawl manifest entries by URL, see fetch
+        """
+        previous = previous or {}
+        url_iter = iter(urls)
+        # Pages whose host has no free slot, by host, in the order they came
+        waiting: Dict[str, Deque[str]] = {}
+        running: Dict["Future[FetchedPage]", threading.Semaphore] = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="page-fetch") as executor:
+
+            def start(url: str, slot: threading.Semaphore) -> None:
+                running[executor.submit(self._download, url, previous.get(url))] = slot
+
+            def start_ready() -> None:
+                """Start downloads until max_concurrency are in flight or no page can start"""
+                for host in list(waiting):
+                    queue = waiting[host]
+                    slot = self._host_slot(host)
+                    while queue and len(running) < self.max_concurrency and slot.acquire(blocking=False):
+                        start(queue.popleft(), slot)
+                    if not queue:
+                        del waiting[host]
+                while len(running) < self.max_concurrency:
+                    url = next(url_iter, None)
+                    if url is None:
+                        return
+                    host = self._host(url)
+                    slot = self._host_slot(host)
+                    if host not in waiting and slot.acquire(blocking=False):
+                        start(url, slot)
+                    else:
+                        waiting.setdefault(host, deque()).append(url)
+
+            try:
+                start_ready()
+                while running or waiting:
+                    if not running:
+                        # Every free slot is held by another caller; wait for one
+                        host, queue = next(iter(waiting.items()))
+                        slot = self._host_slot(host)
+                        slot.acquire()
+                        start(queue.popleft(), slot)
+                        if not queue:
+                            del waiting[host]
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        running.pop(future).release()
+                    for future in done:
+                        yield future.result()
+                        start_ready()
+            finally:
+                for future in running:
+                    future.cancel()
+                wait(running)
+                for slot in running.values():
+                    slot.release()
+
+    @property
+    def parse_pool(self) -> ProcessPoolExecutor:
+        """Process pool parsing pages, started on first use"""
+        with self._lock:
+            if self._parse_pool is None:
+                # Spawned workers do not inherit the locks of the server's threads
+                self._parse_pool = start_parse_pool(self.parse_workers)
+            return self._parse_pool
+
+    def parse(self, page: FetchedPage) -> "Future[str]":
+        """Parse a downloaded page in the process pool"""
+        return self.parse_pool.submit(parse_page, page.content, page.content_type)
+
+    def load(self, urls: List[str]) -> List[Document]:
+        """Download and parse pages
+
+        Returns:
+            One Document per distinct page that could be loaded, in the order
+            of urls, with the page text and {"source": url} metadata
+        """
+        return self.load_changed(urls)[0]
+
+    def load_changed(self, urls: List[str], previous: Optional[Dict[str, Dict[str, Any]]] = None
+                     ) -> Tuple[List[Document], Dict[str, Dict[str, Any]]]:
+        """Download and parse the pages that changed since they were last crawled
+
+        A page is unchanged when the server answers its conditional request
+        with 304, or when its body or extracted text hashes the same as in
+        its previous entry.
+
+        Args:
+            urls: Pages to load
+            previous: Crawl manifest entries by URL
+
+        Returns:
+            One Document per changed page, as load returns them, and the new
+            manifest entries by URL of every page that could be loaded;
+            changed pages still have to record their documents count
+        """
+        previous = previous or {}
+        urls = list(dict.fromkeys(urls))
+        entries: Dict[str, Dict[str, Any]] = {}
+        parsed: Dict[str, "Future[str]"] = {}
+        for page in self.fetch_all(urls, previous):
+            if page.error is not None:
+                logger.error(f"Error fetching {page.url}, exception: {page.error}")
+                continue
+            old = previous.get(page.url) or {}
+            entry = {
+                "etag": page.etag,
+                "last_modified": page.last_modified,
+                "content_hash": old.get("content_hash") if page.not_modified else content_hash(page.content)
+            }
+            if old and entry["content_hash"] == old["content_hash"]:
+                entries[page.url] = {**old, **entry}
+            else:
+                entries[page.url] = entry
+                # Parsing starts while the remaining pages are still downloading
+                parsed[page.url] = self.parse(page)
+
+        documents = []
+        for url in urls:
+            if url not in parsed:
+                continue
+            try:
+                text = parsed[url].result()
+            except Exception as e:
+                logger.error(f"Error processing {url}, exception: {e}")
+                del entries[url]
+                continue
+            old = previous.get(url) or {}
+            entries[url]["text_hash"] = content_hash(text)
+            if old and entries[url]["text_hash"] == old["text_hash"]:
+                entries[url] = {**old, **entries[url]}
+                continue
+            documents.append(Document(page_content=text, metadata={"source": url}))
+        return documents, entries
+
+    def close(self) -> None:
+        """Stop the parse workers and close pooled connections"""
+        with self._lock:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+        self.session.close()
@@ -0,0 +1,55 @@
+"""Page parsing worker processes
+
+The workers are spawned with this module as their main module. A spawned
+process otherwise re-runs the main module of its parent, which for the
+development server is app.py with its routes, clients and services; this
+module only imports what parsing needs.
+"""
+import io
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+
+# Serializes pool starts, which swap the main module while they spawn workers
+_start_lock = threading.Lock()
+
+
+def parse_page(content: bytes, content_type: str) -> str:
+    """Extract the text of a page the way UnstructuredURLLoader does in "single" mode
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    if "html" in content_type or not content_type:
+        from unstructured.partition.html import partition_html
+        elements = partition_html(text=content.decode("utf-8", errors="replace"))
+    else:
+        from unstructured.partition.auto import partition
+        elements = partition(file=io.BytesIO(content), content_type=content_type.split(";")[0].strip())
+    return "\n\n".join(str(element) for element in elements)
+
+
+def _started() -> None:
+    """Task that makes the pool spawn a worker"""
+
+
+def start_parse_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Start a pool of max_workers spawned processes running this module as their main module
+
+    Every worker is spawned up front while this module stands in as the
+    main module. Each worker waits in its initializer until all of them are
+    spawned, so none goes idle and gets reused for a later spawning task.
+    """
+    context = multiprocessing.get_context("spawn")
+    spawned = context.Event()
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=spawned.wait)
+    with _start_lock:
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            futures = [pool.submit(_started) for _ in range(max_workers)]
+        finally:
+            sys.modules["__main__"] = main_module
+            spawned.set()
+    wait(futures)
+    return pool
@@ -0,0 +1,74 @@
+import math
+from typing import List, Optional, Tuple
+from langchain_core.documents.base import Document
+
+
+class QueryRouter:
+    """Choose the product/description split of a chat query without an LLM call
+
+    The router compares how well each store matches the query: the mean
+    cosine similarity of the top hits of the description store against that
+    of the product store. The ratio (share of product documents) follows a
+    logistic curve of the difference. When the difference is below
+    min_margin the stores match about equally well and route returns None,
+    so the caller can fall back to the LLM router.
+    """
+
+    def __init__(self, top_n: int = 3, temperature: float = 0.05, min_margin: float = 0.02):
+        self.top_n = top_n
+        self.temperature = temperature
+        self.min_margin = min_margin
+
+    @staticmethod
+    def similarity(distance: float) -> float:
+        """Convert a FAISS squared L2 distance between unit vectors to cosine similarity"""
+        return 1.0 - distance / 2.0
+
+    def _store_score(self, hits: List[Tuple[Document, float]]) -> Optional[float]:
+        """Mean similarity of the top hits of a store, or None if it has no content"""
+        similarities = [
+            self.similarity(distance)
+            for doc, distance in hits
+            if doc.metadata.get("type") != "init"
+        ][:self.top_n]
+        if not similarities:
+            return None
+        return sum(similarities) / len(similarities)
+
+    def route(self, desc_hits: List[Tuple[Document, float]],
+              prod_hits: List[Tuple[Document, float]]) -> Optional[float]:
+        """Compute the retriever ratio from the scored hits of both stores
+
+        Args:
+            desc_hits: (document, distance) pairs from the description store, best first
+            prod_hits: (document, distance) pairs from the product store, best first
+
+        Returns:
+            The share of context documents to take from the product store, or
+            None when the scores are too close to decide
+        """
+        desc_score = self._store_score(desc_hits)
+        prod_score = self._store_score(prod_hits)
+        if desc_score is None and prod_score is None:
+            return 0.5
+        if desc_score is None:
+            return 1.0
+        if prod_score is None:
+            return 0.0
+        margin = prod_score - desc_score
+        if abs(margin) < self.min_margin:
+            return None
+        return 1.0 / (1.0 + math.exp(-margin / self.temperature))
+
+    @staticmethod
+    def route_keywords(desc_hits: List[Tuple[Document, float]],
+                       prod_hits: List[Tuple[Document, float]]) -> float:
+        """Compute the retriever ratio from the BM25 hits of a keyword-only query
+
+        The ratio is the product store's share of the two best BM25 scores.
+        """
+        desc_score = max((score for _, score in desc_hits), default=0.0)
+        prod_score = max((score for _, score in prod_hits), default=0.0)
+        if desc_score + prod_score <= 0:
+            return 0.5
+        return prod_score / (desc_score + prod_score)
@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, Optional, Union
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents.base import Document
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """Docstore that keeps document content in a SQLite file next to the index
+
+    Only the database file name is pickled into index.pkl, so loading a
+    store reads the id mapping and nothing else; content is fetched for the
+    documents a query actually returns.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    _BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @classmethod
+    def create(cls, store_path: str) -> "SQLiteDocstore":
+        """Create an empty docstore database in a store directory"""
+        os.makedirs(store_path, exist_ok=True)
+        file_name = f"docstore-{uuid.uuid4().hex[:12]}.sqlite"
+        return cls(os.path.join(store_path, file_name))
+
+    def bind(self, store_path: str) -> None:
+        """Point an unpickled docstore at its database in store_path"""
+        self.path = os.path.join(store_path, os.path.basename(self.path))
+        self._local = threading.local()
+        self._initialized = False
+
+    def __getstate__(self) -> Dict[str, str]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: Dict[str, str]) -> None:
+        self.__init__(state["path"])
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    with conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS documents ("
+                            "id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+                        )
+                    self._initialized = True
+        return conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Fetch a document by id"""
+        row = self._connection().execute(
+            "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def search_many(self, ids: List[str]) -> Dict[str, Document]:
+        """Fetch several documents with one query per batch of ids"""
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(ids), self._BATCH_SIZE):
+            batch = ids[start:start + self._BATCH_SIZE]
+            rows = conn.execute(
+                f"SELECT id, page_content, metadata FROM documents WHERE id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for doc_id, page_content, metadata in rows:
+                found[doc_id] = Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+        return found
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Store documents, replacing any already stored under the same id"""
+        rows = [
+            (doc_id, doc.page_content, json.dumps(doc.metadata, default=str))
+            for doc_id, doc in texts.items()
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, page_content, metadata) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def delete(self, ids: List) -> None:
+        """Delete documents by id"""
+        conn = self._connection()
+        with conn:
+            for start in range(0, len(ids), self._BATCH_SIZE):
+                batch = list(ids[start:start + self._BATCH_SIZE])
+                conn.execute(
+                    f"DELETE FROM documents WHERE id IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+
+    def copy_from(self, docstore: Docstore, ids: List[str]) -> None:
+        """Fill this docstore with the given documents of another docstore"""
+        batch: Dict[str, Document] = {}
+        for doc_id in ids:
+            doc = docstore.search(doc_id)
+            if isinstance(doc, Document):
+                batch[doc_id] = doc
+            if len(batch) >= self._BATCH_SIZE:
+                self.add(batch)
+                batch = {}
+        if batch:
+            self.add(batch)
+
+
+def fetch_documents(docstore: Docstore, ids: List[str]) -> List[Optional[Document]]:
+    """Fetch documents by id from any docstore, in one round trip when supported"""
+    if isinstance(docstore, SQLiteDocstore):
+        found = docstore.search_many(ids)
+        return [found.get(doc_id) for doc_id in ids]
+    documents = []
+    for doc_id in ids:
+        doc = docstore.search(doc_id)
+        documents.append(doc if isinstance(doc, Document) else None)
+    return documents
@@ -1,70 +1,1323 @@
+import atexit
 import os
-from typing import List, Optional
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents.base import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from src.config.config import Config
+from src.services.ann_index import (
+    apply_search_params, build_index, index_kind, needs_rebuild, reconstruct_all, remove_rows,
+    row_limit_params, target_kind
+)
+from src.services.embedding_cache import create_embeddings, embed_queries
+from src.services.keyword_index import (
+    KEYWORD_INDEX_FILE, KeywordIndex, is_keyword_query, reciprocal_rank_fusion
+)
+from src.services.metadata_index import METADATA_INDEX_FILE, MetadataIndex
+from src.services.mutation_journal import (
+    MutationJournal, decode_documents, decode_vectors, encode_documents, encode_vectors
+)
+from src.services.sqlite_docstore import SQLiteDocstore, fetch_documents
+from src.services.store_locks import ReadWriteLock, file_lock
+
+INDEX_FILES = ("index.faiss", "index.pkl")
+
+
+class _CachedStore:
+    """A loaded vector store together with the on-disk state it was loaded from
+
+    An entry shows readers only the first `rows` rows of its index. Adding
+    documents appends rows to the store and indexes of the published entry
+    and publishes a new entry over them with a larger `rows`, so readers of
+    the older entry keep seeing the store as it was without holding any
+    lock. Removing rows or rebuilding the index is applied to a copy
+    instead. FAISS cannot search an index while rows are added to it, so
+    index_lock is held shared for searches and exclusively for adds.
+
+    journal_offset is the position in the mutation journal up to which
+    records have been applied, and dirty_since is the time of the oldest
+    mutation that is not yet part of a checkpoint. mapped is set while the
+    FAISS index is a read-only memory map of index.faiss, and index_spec is
+    the store's entry in Config.INDEX_TYPES.
+    """
+
+    def __init__(self, vector_store: FAISS, signature: Optional[Tuple], metadata_index: MetadataIndex,
+                 keyword_index: KeywordIndex, journal: MutationJournal, index_spec: Dict[str, Any],
+                 mapped: bool = False):
+        self.vector_store = vector_store
+        self.signature = signature
+        self.metadata_index = metadata_index
+        self.keyword_index = keyword_index
+        self.journal = journal
+        self.journal_offset = 0
+        self.dirty_since: Optional[float] = None
+        self.index_spec = index_spec
+        self.mapped = mapped
+        self.rows = vector_store.index.ntotal
+        self.index_lock = ReadWriteLock()
+
+
+# Process-wide cache of loaded stores keyed by store path, shared by every
+# VectorStoreService instance so readers get hot indexes instead of
+# unpickling them from disk on every call.
+#
+# Searches and listings take no store lock: they use whichever entry is
+# published when they start. Each store has a writer lock that orders the
+# threads replacing its entry. Loads, journal appends and checkpoint swaps
+# additionally hold an exclusive lock on <store>.lock, so processes sharing
+# the vectors directory never lose each other's writes or load a
+# half-swapped checkpoint; the indexing of a mutation happens after that
+# lock is released.
+_store_cache: Dict[str, _CachedStore] = {}
+_generations: Dict[str, int] = {}
+_writer_locks: Dict[str, threading.Lock] = {}
+_checkpoint_locks: Dict[str, threading.Lock] = {}
+_cache_lock = threading.Lock()
+
+
+def _store_signature(store_path: str) -> Optional[Tuple]:
+    """Return the (mtime, size) of the saved index files, or None if missing"""
+    signature = []
+    for file_name in INDEX_FILES:
+        try:
+            stat = os.stat(os.path.join(store_path, file_name))
+        except OSError:
+            return None
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _writer_lock(store_path: str) -> threading.Lock:
+    """Get the in-process lock serializing the writers of a store"""
+    with _cache_lock:
+        return _writer_locks.setdefault(store_path, threading.Lock())
+
+
+def _process_lock(store_path: str, exclusive: bool):
+    """Get the cross-process lock of a store"""
+    return file_lock(store_path + ".lock", exclusive)
+
+
+def _bump_generation(store_path: str) -> None:
+    with _cache_lock:
+        _generations[store_path] = _generations.get(store_path, 0) + 1
+
+
+def _publish(store_path: str, entry: _CachedStore) -> None:
+    """Make an entry the one readers of a store get"""
+    with _cache_lock:
+        _store_cache[store_path] = entry
+    _bump_generation(store_path)
+
+
+def _write_snapshot(store_path: str, vector_store: FAISS, metadata_index: MetadataIndex,
+                    keyword_index: KeywordIndex) -> str:
+    """Write a complete checkpoint into a scratch directory next to the store"""
+    tmp_path = f"{store_path}.checkpoint-{uuid.uuid4().hex}"
+    vector_store.save_local(tmp_path)
+    metadata_index.save(tmp_path)
+    keyword_index.save(tmp_path)
+    return tmp_path
+
+
+def _install_snapshot(store_path: str, tmp_path: str) -> None:
+    """Rename a written checkpoint over the live files
+
+    Must be called with the store's exclusive process lock held, so that no
+    reader can load index.faiss and index.pkl from different checkpoints.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    for file_name in INDEX_FILES + (METADATA_INDEX_FILE, KEYWORD_INDEX_FILE):
+        os.replace(os.path.join(tmp_path, file_name), os.path.join(store_path, file_name))
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _index_spec(store_path: str) -> Dict[str, Any]:
+    """Get the configured index type and parameters of a store"""
+    return Config.INDEX_TYPES.get(os.path.basename(store_path), Config.DEFAULT_INDEX_TYPE)
+
+
+def _tombstones(vector_store: FAISS) -> int:
+    """Count the rows of removed entries still in an HNSW index
+
+    These rows have no docstore mapping, so the mapping has gaps.
+    """
+    return vector_store.index.ntotal - len(vector_store.index_to_docstore_id)
+
+
+def _compact(vector_store: FAISS, index_spec: Dict[str, Any]) -> None:
+    """Rebuild a store's index from the stored vectors of its live rows
+
+    Rows keep their order but are renumbered to be contiguous again, so the
+    metadata index must be reindexed afterwards.
+    """
+    rows = sorted(vector_store.index_to_docstore_id)
+    vectors = reconstruct_all(vector_store.index)[np.asarray(rows, dtype=np.int64)]
+    vector_store.index = build_index(index_spec, vectors, template=vector_store.index)
+    vector_store.index_to_docstore_id = {
+        new_row: vector_store.index_to_docstore_id[row] for new_row, row in enumerate(rows)
+    }
+
+
+def _conform_index(vector_store: FAISS, index_spec: Dict[str, Any]) -> bool:
+    """Rebuild a store's index from its stored vectors if it does not match its spec
+
+    Tombstoned HNSW rows are dropped on the way, which renumbers the rows.
+
+    Returns:
+        True if the index was rebuilt
+    """
+    index = vector_store.index
+    if not needs_rebuild(index, index_spec):
+        apply_search_params(index, index_spec)
+        return False
+    _compact(vector_store, index_spec)
+    return True
+
+
+def _mmap_flags() -> int:
+    """FAISS read flags that map the index file instead of reading it into the heap"""
+    # IO_FLAG_MMAP_IFC also maps flat code arrays; older FAISS builds only map IVF lists
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _ensure_writable(entry: _CachedStore) -> None:
+    """Replace a memory-mapped index by an in-memory copy before it is mutated
+
+    Mapped indexes view the file read-only; FAISS aborts the process on any
+    attempt to grow them, and clone_index cannot copy them either.
+    """
+    if entry.mapped:
+        index = entry.vector_store.index
+        entry.vector_store.index = faiss.deserialize_index(faiss.serialize_index(index))
+        entry.mapped = False
+
+
+def _extend_entry(entry: _CachedStore) -> _CachedStore:
+    """Get a new entry over the store and indexes of a published one, for appending rows to
+
+    Readers of the published entry keep stopping at its rows.
+    """
+    extended = _CachedStore(entry.vector_store, entry.signature, entry.metadata_index, entry.keyword_index,
+                            entry.journal, entry.index_spec, entry.mapped)
+    extended.rows = entry.rows
+    extended.index_lock = entry.index_lock
+    extended.journal_offset = entry.journal_offset
+    extended.dirty_since = entry.dirty_since
+    return extended
+
+
+def _appends_only(entry: _CachedStore, records: List[Dict[str, Any]]) -> bool:
+    """Check that journal records only add rows, which the entry's index takes without a rebuild"""
+    if entry.mapped or any(record["op"] != "add" for record in records):
+        return False
+    index = entry.vector_store.index
+    added = sum(len(record["ids"]) for record in records)
+    return target_kind(entry.index_spec, index.ntotal + added) == index_kind(index)
+
+
+def _copy_entry(entry: _CachedStore) -> _CachedStore:
+    """Copy a published entry so a mutation can be applied while readers use the original
+
+    A SQLite docstore is shared rather than copied: the copy only adds rows
+    under new ids and removes rows of documents that are being deleted, so
+    readers of the original at worst miss a document that is going away.
+    """
+    vector_store = entry.vector_store
+    docstore = vector_store.docstore
+    if not isinstance(docstore, SQLiteDocstore):
+        docstore = InMemoryDocstore(dict(docstore._dict))
+    if entry.mapped:
+        # clone_index cannot copy a memory-mapped index
+        index = faiss.deserialize_index(faiss.serialize_index(vector_store.index))
+    else:
+        index = faiss.clone_index(vector_store.index)
+    apply_search_params(index, entry.index_spec)
+    copy = _CachedStore(
+        FAISS(
+            vector_store.embedding_function,
+            index,
+            docstore,
+            dict(vector_store.index_to_docstore_id),
+            normalize_L2=vector_store._normalize_L2,
+            distance_strategy=vector_store.distance_strategy
+        ),
+        entry.signature,
+        entry.metadata_index.copy(),
+        entry.keyword_index.copy(),
+        entry.journal,
+        entry.index_spec
+    )
+    copy.journal_offset = entry.journal_offset
+    copy.dirty_since = entry.dirty_since
+    return copy
+
+
+def _new_docstore(store_path: str):
+    """Create an empty docstore of the configured backend"""
+    if Config.DOCSTORE_BACKEND == "sqlite":
+        return SQLiteDocstore.create(store_path)
+    return InMemoryDocstore()
+
+
+def _convert_docstore(vector_store: FAISS, store_path: str, force: bool = False) -> bool:
+    """Move a store's documents into a new docstore of the configured backend
+
+    Args:
+        vector_store: Store whose docstore is replaced
+        store_path: Directory the new docstore database is created in
+        force: Copy the documents even if the docstore already has the configured backend
+
+    Returns:
+        True if the docstore was replaced
+    """
+    docstore = vector_store.docstore
+    if not force and isinstance(docstore, SQLiteDocstore) == (Config.DOCSTORE_BACKEND == "sqlite"):
+        return False
+    ids = list(vector_store.index_to_docstore_id.values())
+    new_docstore = _new_docstore(store_path)
+    if isinstance(new_docstore, SQLiteDocstore):
+        new_docstore.copy_from(docstore, ids)
+    else:
+        new_docstore.add({
+            store_id: doc
+            for store_id, doc in zip(ids, fetch_documents(docstore, ids))
+            if doc is not None
+        })
+    vector_store.docstore = new_docstore
+    return True
+
+
+def _remove_stale_docstores(store_path: str, vector_store: FAISS) -> None:
+    """Delete docstore databases no longer referenced by the installed checkpoint
+
+    Processes still reading a deleted database keep their open handle until
+    they reload the store.
+    """
+    docstore = vector_store.docstore
+    current = os.path.basename(docstore.path) if isinstance(docstore, SQLiteDocstore) else None
+    try:
+        file_names = os.listdir(store_path)
+    except OSError:
+        return
+    for file_name in file_names:
+        if file_name.startswith("docstore-") and not file_name.startswith(str(current)):
+            try:
+                os.remove(os.path.join(store_path, file_name))
+            except OSError:
+                pass
+
+
+def _checkpoint(store_path: str) -> None:
+    """Fold the journaled mutations of a store into its index files
+
+    Writers are first handed a copy of the published entry to append to, so
+    the entry is written to disk as it was without holding any lock, and
+    the new files are renamed in under the writer lock and exclusive
+    process lock. Only the journal records included in the written entry
+    are dropped, so writes that land during the checkpoint are kept.
+    """
+    with _cache_lock:
+        checkpoint_lock = _checkpoint_locks.setdefault(store_path, threading.Lock())
+    with checkpoint_lock:
+        writer_lock = _writer_lock(store_path)
+        with writer_lock:
+            with _cache_lock:
+                entry = _store_cache.get(store_path)
+            if entry is None or entry.dirty_since is None:
+                return
+            dirty_since = entry.dirty_since
+            offset = entry.journal_offset
+            live = _copy_entry(entry)
+            live.dirty_since = None
+            with _cache_lock:
+                _store_cache[store_path] = live
+
+        try:
+            tmp_path = _write_snapshot(store_path, entry.vector_store, entry.metadata_index, entry.keyword_index)
+            with writer_lock, _process_lock(store_path, exclusive=True):
+                with _cache_lock:
+                    latest = _store_cache.get(store_path)
+                if (latest is None or latest.journal is not entry.journal
+                        or _store_signature(store_path) != entry.signature):
+                    # The store was replaced or checkpointed elsewhere meanwhile;
+                    # the next read reloads it, so this snapshot is obsolete
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                    return
+                _install_snapshot(store_path, tmp_path)
+                entry.journal.compact(offset)
+                latest.journal_offset -= offset
+                latest.signature = _store_signature(store_path)
+        except Exception:
+            with writer_lock:
+                with _cache_lock:
+                    latest = _store_cache.get(store_path)
+                if latest is not None:
+                    latest.dirty_since = min(dirty_since, latest.dirty_since or dirty_since)
+            raise
+
+
+def _flush_all() -> None:
+    """Checkpoint every store with mutations that are only in its journal"""
+    with _cache_lock:
+        entries = list(_store_cache.items())
+    for store_path, entry in entries:
+        if entry.dirty_since is not None:
+            _checkpoint(store_path)
+
+
+class _JournalFlusher(threading.Thread):
+    """Background thread that coalesces journaled mutations into checkpoints
+
+    A store is checkpointed once its oldest unsaved mutation is older than
+    Config.JOURNAL_FLUSH_INTERVAL or its journal grows past
+    Config.JOURNAL_MAX_BYTES, whichever comes first.
+    """
 
-class VectorStoreService:
     def __init__(self):
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+        super().__init__(name="vector-store-flusher", daemon=True)
+        self._wake = threading.Event()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def run(self) -> None:
+        while True:
+            self._wake.wait(timeout=Config.JOURNAL_FLUSH_INTERVAL)
+            self._wake.clear()
+            now = time.time()
+            with _cache_lock:
+                entries = list(_store_cache.items())
+            for store_path, entry in entries:
+                if entry.dirty_since is None:
+                    continue
+                if (entry.journal_offset >= Config.JOURNAL_MAX_BYTES
+                        or now - entry.dirty_since >= Config.JOURNAL_FLUSH_INTERVAL):
+                    try:
+                        _checkpoint(store_path)
+                    except Exception:
+                        # The journal still holds the mutations; retry next round
+                        pass
+
+
+_flusher: Optional[_JournalFlusher] = None
+
+
+def _get_flusher() -> _JournalFlusher:
+    global _flusher
+    with _cache_lock:
+        if _flusher is None:
+            _flusher = _JournalFlusher()
+            _flusher.start()
+            atexit.register(_flush_all)
+        return _flusher
+
+
+def _reset_flusher_after_fork() -> None:
+    # Threads do not survive fork; let each worker process start its own flusher
+    global _flusher
+    _flusher = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_flusher_after_fork)
+
+
+def _keyword_params() -> Dict[str, float]:
+    return {"k1": Config.BM25_K1, "b": Config.BM25_B}
+
+
+def _build_keyword_index(vector_store: FAISS) -> KeywordIndex:
+    """Build the BM25 index of a store from its docstore"""
+    return KeywordIndex.build(vector_store.index_to_docstore_id, vector_store.docstore, **_keyword_params())
+
+
+def _matches_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Check that a document's metadata has every key/value pair in filters"""
+    if not filters:
+        return True
+    return all(metadata.get(key) == value for key, value in filters.items())
+
+
+class VectorStoreService:
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        self.embeddings = embeddings or create_embeddings()
+        self._query_vectors: OrderedDict = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
         os.makedirs(Config.VECTOR_STORE_PATH, exist_ok=True)
-        
-    def _initialize_store(self, store_path: str) -> FAISS:
-        """Initialize a new vector store if it doesn't exist"""
+
+    def _store_path(self, store_name: str) -> str:
+        if Config.UNIFIED_INDEX and store_name in Config.STORE_TYPES:
+            store_name = Config.UNIFIED_INDEX_NAME
+        return os.path.join(Config.VECTOR_STORE_PATH, store_name)
+
+    @staticmethod
+    def _store_type(store_name: str) -> Optional[str]:
+        """Get the document type a logical store is limited to in unified mode"""
+        if Config.UNIFIED_INDEX:
+            return Config.STORE_TYPES.get(store_name)
+        return None
+
+    @staticmethod
+    def _with_type(documents: List[Document], doc_type: Optional[str]) -> List[Document]:
+        """Stamp documents with the type of the logical store they are added to"""
+        if doc_type is None:
+            return documents
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, "type": doc_type})
+            for doc in documents
+        ]
+
+    def _initialize_store(self, store_path: str) -> None:
+        """Initialize a new vector store if it doesn't exist
+
+        Must be called with the store's exclusive process lock held.
+        """
+        if _store_signature(store_path) is not None:
+            return
         empty_doc = Document(
             page_content="Initialization document",
             metadata={"type": "init"}
         )
         vector_store = FAISS.from_documents(
             documents=[empty_doc],
-            embedding=self.embeddings
+            embedding=self.embeddings,
+            docstore=_new_docstore(store_path)
         )
-        vector_store.save_local(store_path)
-        return vector_store
-        
+        metadata_index = MetadataIndex.build(vector_store.index_to_docstore_id, vector_store.docstore)
+        keyword_index = _build_keyword_index(vector_store)
+        _install_snapshot(store_path, _write_snapshot(store_path, vector_store, metadata_index, keyword_index))
+
     def get_vector_store(self, store_name: str) -> FAISS:
-        """Get or create a vector store"""
-        store_path = os.path.join(Config.VECTOR_STORE_PATH, store_name)
+        """Get or create a vector store
+
+        Loaded stores are served from the process-wide cache as long as the
+        files on disk have not changed since they were loaded. Mutations
+        journaled by other processes are replayed onto the cached copy.
+
+        The returned store is shared with the cache: it must not be mutated
+        (with Config.INDEX_MMAP its index is a read-only memory map), and
+        documents added later may be appended to it in place, so it must not
+        be searched while other threads add documents to the store.
+        """
+        return self._get_entry(store_name).vector_store
+
+    @contextmanager
+    def _read_entry(self, store_name: str) -> Iterator[_CachedStore]:
+        """Use an up-to-date snapshot of a store
+
+        No store lock is held while the snapshot is used, so readers never
+        wait for a mutation to be journaled or indexed; FAISS calls only
+        share the entry's index lock with writers adding rows.
+        """
+        yield self._get_entry(store_name)
+
+    def _get_entry(self, store_name: str) -> _CachedStore:
+        """Get the cached entry for a store, catching up with changes on disk"""
+        store_path = self._store_path(store_name)
+        with _cache_lock:
+            cached = _store_cache.get(store_path)
+        if (cached is not None and cached.signature == _store_signature(store_path)
+                and cached.journal_offset == cached.journal.size()):
+            return cached
+
+        writer_lock = _writer_lock(store_path)
+        if not writer_lock.acquire(blocking=cached is None):
+            # A writer of this process is about to publish a newer entry;
+            # rather than wait for it, keep reading the current snapshot
+            return cached
         try:
-            return FAISS.load_local(store_path, self.embeddings, allow_dangerous_deserialization=True)
-        except Exception:
-            return self._initialize_store(store_path)
-            
-    def add_documents(self, documents: List[Document], store_name: str) -> None:
-        """Add documents to a vector store"""
-        vector_store = self.get_vector_store(store_name)
-        vector_store.add_documents(documents)
-        store_path = os.path.join(Config.VECTOR_STORE_PATH, store_name)
-        vector_store.save_local(store_path)
-        
+            with _process_lock(store_path, exclusive=True):
+                return self._refresh_entry(store_path)
+        finally:
+            writer_lock.release()
+
+    def _refresh_entry(self, store_path: str) -> _CachedStore:
+        """Apply new journal records to the cached store and publish the result, or reload the store
+
+        Must be called with the store's writer lock and exclusive process
+        lock held.
+        """
+        with _cache_lock:
+            cached = _store_cache.get(store_path)
+        signature = _store_signature(store_path)
+        if cached is not None and signature is not None and cached.signature == signature:
+            size = cached.journal.size()
+            if size == cached.journal_offset:
+                return cached
+            if size > cached.journal_offset:
+                records = list(cached.journal.read_from(cached.journal_offset))
+                if records:
+                    cached = self._publish_records(store_path, cached, records)
+                if cached.journal.size() > cached.journal_offset:
+                    # A torn write from a crashed process; drop it so reads take the fast path
+                    cached.journal.truncate(cached.journal_offset)
+                return cached
+        return self._load_entry(store_path)
+
+    def _load_entry(self, store_path: str) -> _CachedStore:
+        """Load a store from its last checkpoint and replay its journal"""
+        self._initialize_store(store_path)
+        journal = MutationJournal(store_path)
+        # Journaled mutations would force an in-memory copy right away
+        mapped = Config.INDEX_MMAP and journal.size() == 0
+        vector_store = FAISS.load_local(
+            store_path,
+            self.embeddings,
+            allow_dangerous_deserialization=True,
+            io_flags=_mmap_flags() if mapped else 0
+        )
+        if isinstance(vector_store.docstore, SQLiteDocstore):
+            vector_store.docstore.bind(store_path)
+        metadata_index = MetadataIndex.load(store_path)
+        if metadata_index is None or not metadata_index.is_consistent_with(vector_store.index_to_docstore_id):
+            metadata_index = MetadataIndex.build(vector_store.index_to_docstore_id, vector_store.docstore)
+        keyword_index = KeywordIndex.load(store_path, **_keyword_params())
+        # Stores saved before the keyword index existed get one built on first load
+        missing_keywords = keyword_index is None or not keyword_index.is_consistent_with(
+            vector_store.index_to_docstore_id)
+        if missing_keywords:
+            keyword_index = _build_keyword_index(vector_store)
+        index_spec = _index_spec(store_path)
+        converted = _convert_docstore(vector_store, store_path)
+        rebuilt = _conform_index(vector_store, index_spec)
+        if rebuilt:
+            metadata_index.reindex_rows(vector_store.index_to_docstore_id)
+        if converted or rebuilt or missing_keywords:
+            # Rewrite the checkpoint right away so the migration happens only once
+            _install_snapshot(store_path, _write_snapshot(store_path, vector_store, metadata_index, keyword_index))
+            _remove_stale_docstores(store_path, vector_store)
+
+        entry = _CachedStore(vector_store, _store_signature(store_path), metadata_index, keyword_index,
+                             journal, index_spec, mapped and not rebuilt)
+        self._replay(store_path, entry)
+        _publish(store_path, entry)
+        return entry
+
+    def _replay(self, store_path: str, entry: _CachedStore) -> None:
+        """Apply journal records written after entry.journal_offset
+
+        Must be called with the store's exclusive process lock held, so an
+        incomplete record at the end can only be a torn write; it is dropped.
+        """
+        replayed = False
+        for record, offset in entry.journal.read_from(entry.journal_offset):
+            self._apply(entry, record)
+            entry.journal_offset = offset
+            replayed = True
+        if entry.journal.size() > entry.journal_offset:
+            entry.journal.truncate(entry.journal_offset)
+        if replayed:
+            self._mark_dirty(store_path, entry)
+
+    def save_vector_store(self, vector_store: FAISS, store_name: str) -> None:
+        """Replace a store wholesale and make it the cached copy for readers
+
+        The checkpoint is written right away and the journal is reset.
+        Readers keep using the previous store until the new one is swapped in.
+        In unified mode, replacing a logical store only replaces the documents
+        of its type.
+        """
+        doc_type = self._store_type(store_name)
+        if doc_type is not None:
+            self._replace_type(vector_store, store_name, doc_type)
+            return
+        store_path = self._store_path(store_name)
+        index_spec = _index_spec(store_path)
+        _conform_index(vector_store, index_spec)
+        metadata_index = MetadataIndex.build(vector_store.index_to_docstore_id, vector_store.docstore)
+        keyword_index = _build_keyword_index(vector_store)
+        # The replacement gets its own database so readers of the old store are unaffected
+        _convert_docstore(vector_store, store_path, force=True)
+        tmp_path = _write_snapshot(store_path, vector_store, metadata_index, keyword_index)
+        with _writer_lock(store_path), _process_lock(store_path, exclusive=True):
+            _install_snapshot(store_path, tmp_path)
+            _remove_stale_docstores(store_path, vector_store)
+            journal = MutationJournal(store_path)
+            journal.reset()
+            _publish(store_path, _CachedStore(vector_store, _store_signature(store_path), metadata_index,
+                                              keyword_index, journal, index_spec))
+
+    def _replace_type(self, vector_store: FAISS, store_name: str, doc_type: str) -> None:
+        """Replace the documents of one type in the unified store, keeping their vectors"""
+        rows = sorted(vector_store.index_to_docstore_id)
+        ids = [vector_store.index_to_docstore_id[row] for row in rows]
+        vectors = reconstruct_all(vector_store.index)[np.asarray(rows, dtype=np.int64)]
+        pairs = [
+            (doc, vector)
+            for doc, vector in zip(fetch_documents(vector_store.docstore, ids), vectors)
+            if doc is not None
+        ]
+        documents = self._with_type([doc for doc, _ in pairs], doc_type)
+        fields = {
+            "ids": [str(uuid.uuid4()) for _ in documents],
+            "documents": encode_documents(documents),
+            "vectors": encode_vectors([vector for _, vector in pairs])
+        }
+        self._commit(store_name, lambda entry: {
+            "op": "update",
+            "delete_ids": sorted(entry.metadata_index.lookup("type", doc_type)),
+            **fields
+        })
+
+    def flush(self, store_name: Optional[str] = None) -> None:
+        """Checkpoint journaled mutations now instead of waiting for the flusher"""
+        if store_name is None:
+            _flush_all()
+            return
+        store_path = self._store_path(store_name)
+        with _cache_lock:
+            entry = _store_cache.get(store_path)
+        if entry is not None and entry.dirty_since is not None:
+            _checkpoint(store_path)
+
+    def invalidate(self, store_name: Optional[str] = None) -> None:
+        """Drop cached stores so the next read reloads them from disk"""
+        with _cache_lock:
+            if store_name is None:
+                paths = list(_store_cache)
+            else:
+                paths = [self._store_path(store_name)]
+        for store_path in paths:
+            # Unsaved mutations are still in the journal and replayed on reload
+            with _writer_lock(store_path):
+                with _cache_lock:
+                    _store_cache.pop(store_path, None)
+            _bump_generation(store_path)
+
+    def get_generation(self, store_name: str) -> int:
+        """Get a counter that changes whenever the content of a store changes"""
+        self._get_entry(store_name)
+        with _cache_lock:
+            return _generations.get(self._store_path(store_name), 0)
+
+    def _mark_dirty(self, store_path: str, entry: _CachedStore) -> None:
+        """Record an unsaved mutation and wake the flusher if the journal is large"""
+        if entry.dirty_since is None:
+            entry.dirty_since = time.time()
+        _bump_generation(store_path)
+        flusher = _get_flusher()
+        if entry.journal_offset >= Config.JOURNAL_MAX_BYTES:
+            flusher.notify()
+
+    def _apply(self, entry: _CachedStore, record: Dict[str, Any]) -> None:
+        """Apply a journal record to a loaded store and its indexes
+
+        Replaying a record that is already applied is a no-op. The entry
+        shows every row of its index afterwards.
+        """
+        op = record["op"]
+        if op == "delete":
+            self._remove_from_entry(entry, record["ids"])
+        elif op in ("add", "update"):
+            if op == "update":
+                self._remove_from_entry(entry, record["delete_ids"])
+            self._add_to_entry(
+                entry,
+                record["ids"],
+                decode_documents(record["documents"]),
+                decode_vectors(record["vectors"])
+            )
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+        entry.rows = entry.vector_store.index.ntotal
+
+    def _add_to_entry(self, entry: _CachedStore, ids: List[str], documents: List[Document],
+                      vectors: Any) -> None:
+        """Add embedded documents to a loaded store and its metadata and keyword indexes"""
+        new = [
+            (store_id, doc, vector)
+            for store_id, doc, vector in zip(ids, documents, vectors)
+            if entry.metadata_index.row(store_id) is None
+        ]
+        if not new:
+            return
+        _ensure_writable(entry)
+        vector_store = entry.vector_store
+        # FAISS.add_embeddings numbers new rows from the mapping size, which
+        # HNSW tombstones make smaller than the index
+        start_row = vector_store.index.ntotal
+        matrix = np.asarray([vector for _, _, vector in new], dtype=np.float32)
+        if vector_store._normalize_L2:
+            faiss.normalize_L2(matrix)
+        with entry.index_lock.write():
+            vector_store.index.add(matrix)
+        vector_store.docstore.add({
+            store_id: Document(id=store_id, page_content=doc.page_content, metadata=doc.metadata)
+            for store_id, doc, _ in new
+        })
+        for offset, (store_id, doc, _) in enumerate(new):
+            vector_store.index_to_docstore_id[start_row + offset] = store_id
+            entry.metadata_index.add(store_id, start_row + offset, doc)
+            entry.keyword_index.add(store_id, doc.page_content)
+        # An IVF store is trained once it has grown enough
+        if _conform_index(vector_store, entry.index_spec):
+            entry.metadata_index.reindex_rows(vector_store.index_to_docstore_id)
+
+    def _remove_from_entry(self, entry: _CachedStore, ids: List[str]) -> None:
+        """Remove entries from a loaded store and its metadata and keyword indexes
+
+        Flat and IVF indexes drop the vectors and shift later rows down. HNSW
+        cannot remove vectors, so their rows are left in the graph as
+        tombstones without a docstore mapping, and the index is rebuilt
+        without them once they pass Config.HNSW_MAX_TOMBSTONE_RATIO.
+        """
+        ids = [store_id for store_id in ids if entry.metadata_index.row(store_id) is not None]
+        if not ids:
+            return
+        _ensure_writable(entry)
+        vector_store = entry.vector_store
+        kind = index_kind(vector_store.index)
+        rows = [entry.metadata_index.row(store_id) for store_id in ids]
+        vector_store.docstore.delete(ids)
+        for row in rows:
+            del vector_store.index_to_docstore_id[row]
+        if kind != "hnsw":
+            remove_rows(vector_store.index, rows)
+            vector_store.index_to_docstore_id = dict(enumerate(
+                vector_store.index_to_docstore_id[row] for row in sorted(vector_store.index_to_docstore_id)
+            ))
+        entry.metadata_index.remove(ids)
+        entry.keyword_index.remove(ids)
+        if kind == "hnsw":
+            if _tombstones(vector_store) <= Config.HNSW_MAX_TOMBSTONE_RATIO * vector_store.index.ntotal:
+                return
+            _compact(vector_store, entry.index_spec)
+        entry.metadata_index.reindex_rows(vector_store.index_to_docstore_id)
+
+    def _publish_records(self, store_path: str, current: _CachedStore,
+                         records: List[Tuple[Dict[str, Any], int]]) -> _CachedStore:
+        """Apply journal records to the published entry of a store and publish the result
+
+        Records that only add documents are appended to the store and
+        indexes of the published entry, so a small add costs time in the
+        size of the add rather than of the store. Other records are applied
+        to a copy. Must be called with the store's writer lock held.
+
+        Args:
+            store_path: Directory of the store
+            current: The published entry, up to date with the journal before records
+            records: (record, journal offset after it) pairs
+        """
+        if _appends_only(current, [record for record, _ in records]):
+            entry = _extend_entry(current)
+        else:
+            entry = _copy_entry(current)
+        for record, offset in records:
+            self._apply(entry, record)
+            entry.journal_offset = offset
+        _publish(store_path, entry)
+        self._mark_dirty(store_path, entry)
+        return entry
+
+    def _commit(self, store_name: str, build_record) -> Dict[str, Any]:
+        """Journal a mutation, then apply it and publish the result
+
+        The store is first brought up to date with records written by other
+        processes and the record is appended to the journal, both under the
+        writer lock and exclusive process lock, so concurrent writers never
+        lose each other's changes. The process lock is released before the
+        record is applied (see _publish_records), and readers keep using the
+        published entry until the result replaces it. build_record receives
+        the up-to-date entry and returns the record to write, or None when
+        there is nothing to change.
+        """
+        store_path = self._store_path(store_name)
+        with _writer_lock(store_path):
+            with _process_lock(store_path, exclusive=True):
+                current = self._refresh_entry(store_path)
+                record = build_record(current)
+                if record is None:
+                    return {}
+                offset = current.journal.append(record, current.journal_offset)
+            self._publish_records(store_path, current, [(record, offset)])
+            return record
+
+    def _embed_documents(self, documents: List[Document]) -> Dict[str, Any]:
+        """Embed documents and build the add fields of a journal record"""
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        return self._record_fields(documents, vectors)
+
+    @staticmethod
+    def _record_fields(documents: List[Document], vectors: Any) -> Dict[str, Any]:
+        """Build the add fields of a journal record from embedded documents"""
+        return {
+            "ids": [str(uuid.uuid4()) for _ in documents],
+            "documents": encode_documents(documents),
+            "vectors": encode_vectors(vectors)
+        }
+
+    def add_documents(self, documents: List[Document], store_name: str) -> List[str]:
+        """Add documents to a vector store
+
+        The documents are embedded before any lock is taken. The mutation is
+        durable once this returns; it is written to the journal and folded
+        into the index files by the background flusher.
+
+        Returns:
+            The docstore ids of the added documents
+        """
+        if not documents:
+            return []
+        fields = self._embed_documents(self._with_type(documents, self._store_type(store_name)))
+        self._commit(store_name, lambda entry: {"op": "add", **fields})
+        return fields["ids"]
+
+    def add_embedded_documents(self, documents: List[Document], vectors: Any, store_name: str) -> List[str]:
+        """Add documents that were already embedded, such as by the ingestion pipeline
+
+        Returns:
+            The docstore ids of the added documents
+        """
+        if not documents:
+            return []
+        fields = self._record_fields(self._with_type(documents, self._store_type(store_name)), vectors)
+        self._commit(store_name, lambda entry: {"op": "add", **fields})
+        return fields["ids"]
+
+    def update_documents(self, documents: List[Document], store_name: str) -> List[str]:
+        """Replace the stored documents that share a doc_id with the given documents"""
+        if not documents:
+            return []
+        doc_type = self._store_type(store_name)
+        fields = self._embed_documents(self._with_type(documents, doc_type))
+
+        def build_record(entry: _CachedStore) -> Dict[str, Any]:
+            delete_ids = {
+                store_id
+                for doc in documents if doc.metadata.get("doc_id") is not None
+                for store_id in self._lookup(entry, doc_type, "doc_id", doc.metadata["doc_id"])
+            }
+            return {"op": "update", "delete_ids": sorted(delete_ids), **fields}
+
+        self._commit(store_name, build_record)
+        return fields["ids"]
+
+    def replace_sources(self, sources: List[str], documents: List[Document], store_name: str,
+                        vectors: Any = None) -> List[str]:
+        """Replace every stored document whose source is in sources with the given documents
+
+        The old documents are removed and the new ones added in one journal
+        record, so searches see either the old or the new version of a page.
+
+        Args:
+            sources: Source URLs whose stored documents are removed
+            documents: New documents of those sources, possibly none
+            store_name: Name of the vector store
+            vectors: Embeddings of documents; they are embedded when omitted
+
+        Returns:
+            The docstore ids of the added documents
+        """
+        doc_type = self._store_type(store_name)
+        documents = self._with_type(documents, doc_type)
+        if documents and vectors is None:
+            fields = self._embed_documents(documents)
+        else:
+            fields = self._record_fields(documents, vectors if documents else [])
+
+        def build_record(entry: _CachedStore) -> Optional[Dict[str, Any]]:
+            delete_ids = {
+                store_id
+                for source in sources
+                for store_id in self._lookup(entry, doc_type, "source", source)
+            }
+            if not delete_ids and not documents:
+                return None
+            return {"op": "update", "delete_ids": sorted(delete_ids), **fields}
+
+        self._commit(store_name, build_record)
+        return fields["ids"]
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing the vector of a recent identical query"""
+        vector = self._recent_query_vector(query)
+        if vector is None:
+            vector = self._remember_query_vector(query, self.embeddings.embed_query(query))
+        return vector
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Embed a search query without blocking the event loop
+
+        Shares the recent query vectors with embed_query.
+        """
+        vector = self._recent_query_vector(query)
+        if vector is None:
+            vector = self._remember_query_vector(query, await self.embeddings.aembed_query(query))
+        return vector
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many search queries, with one batched embedding call for those not embedded recently"""
+        vectors = {query: self._recent_query_vector(query) for query in queries}
+        missing = [query for query, vector in vectors.items() if vector is None]
+        if missing:
+            for query, vector in zip(missing, embed_queries(self.embeddings, missing)):
+                vectors[query] = self._remember_query_vector(query, vector)
+        return [vectors[query] for query in queries]
+
+    def _recent_query_vector(self, query: str) -> Optional[List[float]]:
+        with self._query_vectors_lock:
+            vector = self._query_vectors.get(query)
+            if vector is not None:
+                self._query_vectors.move_to_end(query)
+            return vector
+
+    def _remember_query_vector(self, query: str, vector: List[float]) -> List[float]:
+        with self._query_vectors_lock:
+            self._query_vectors[query] = vector
+            self._query_vectors.move_to_end(query)
+            while len(self._query_vectors) > Config.QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_vectors.popitem(last=False)
+        return vector
+
     def search_documents(self, query: str, store_name: str, k: int = 10) -> List[Document]:
         """Search for relevant documents in a vector store"""
-        vector_store = self.get_vector_store(store_name)
-        return vector_store.similarity_search(query, k=k)
-        
-    def remove_documents(self, doc_ids: List[str], store_name: str) -> None:
-        """Remove documents from a vector store"""
-        vector_store = self.get_vector_store(store_name)
-        docstore = vector_store.docstore
-        
-        new_docs = [
-            doc for doc_id, doc in docstore._dict.items()
-            if doc.metadata.get("doc_id") not in doc_ids
+        return self.search_by_vector(self.embed_query(query), store_name, k=k)
+
+    def search_by_vector(self, vector: List[float], store_name: str, k: int = 10) -> List[Document]:
+        """Search a vector store with an already embedded query"""
+        return [doc for doc, _ in self.search_by_vector_with_scores(vector, store_name, k=k)]
+
+    def search_by_vector_with_scores(self, vector: List[float], store_name: str,
+                                     k: int = 10) -> List[Tuple[Document, float]]:
+        """Search a vector store with an already embedded query
+
+        Returns:
+            (document, squared L2 distance) pairs, closest first
+        """
+        doc_type = self._store_type(store_name)
+        with self._read_entry(store_name) as entry:
+            return self._fetch_hits(entry, self._search_types(entry, vector, {doc_type: k})[doc_type])
+
+    def search_by_vectors_with_scores(self, vectors: List[List[float]], store_name: str,
+                                      k: int = 10) -> List[List[Tuple[Document, float]]]:
+        """Search a vector store with many embedded queries in one FAISS call
+
+        Returns:
+            For each query, (document, squared L2 distance) pairs, closest first
+        """
+        doc_type = self._store_type(store_name)
+        with self._read_entry(store_name) as entry:
+            hits = self._search_types_many(entry, vectors, {doc_type: k})
+            return [self._fetch_hits(entry, query_hits[doc_type]) for query_hits in hits]
+
+    def search_by_types(self, vector: List[float], store_name: str,
+                        counts: Dict[str, int]) -> Dict[str, List[Tuple[Document, float]]]:
+        """Get the nearest documents of each type from one store in a single pass
+
+        Args:
+            vector: Embedded query
+            store_name: Name of the vector store, usually Config.UNIFIED_INDEX_NAME
+            counts: Number of documents wanted per metadata type
+
+        Returns:
+            Dictionary mapping each type to its (document, distance) pairs, closest first
+        """
+        with self._read_entry(store_name) as entry:
+            hits = self._search_types(entry, vector, counts)
+            return {doc_type: self._fetch_hits(entry, type_hits) for doc_type, type_hits in hits.items()}
+
+    def search_by_types_many(self, vectors: List[List[float]], store_name: str,
+                             counts: Dict[str, int]) -> List[Dict[str, List[Tuple[Document, float]]]]:
+        """Batch form of search_by_types: one FAISS call for a matrix of queries"""
+        with self._read_entry(store_name) as entry:
+            return [
+                {doc_type: self._fetch_hits(entry, type_hits) for doc_type, type_hits in hits.items()}
+                for hits in self._search_types_many(entry, vectors, counts)
+            ]
+
+    def search_with_quotas(self, vector: List[float], store_name: str, k: int,
+                           min_counts: Dict[str, int]) -> List[Tuple[Document, float]]:
+        """Get the top k documents of a store with at least min_counts[type] of each type
+
+        For example min_counts={"product": 3} returns the 3 nearest products
+        plus the k - 3 nearest other documents of any type.
+
+        Returns:
+            (document, distance) pairs, closest first
+        """
+        with self._read_entry(store_name) as entry:
+            hits = self._search_types(entry, vector, {**min_counts, None: k})
+            chosen: Dict[str, float] = {}
+            for doc_type, count in min_counts.items():
+                for store_id, distance in hits[doc_type][:count]:
+                    chosen[store_id] = distance
+            for store_id, distance in hits[None]:
+                if len(chosen) >= k:
+                    break
+                chosen.setdefault(store_id, distance)
+            ranked = sorted(chosen.items(), key=lambda hit: hit[1])[:k]
+            return self._fetch_hits(entry, ranked)
+
+    def _search_types(self, entry: _CachedStore, vector: List[float],
+                      counts: Dict[Optional[str], int]) -> Dict[Optional[str], List[Tuple[str, float]]]:
+        """Find the nearest entries of each type by widening one result window
+
+        Types are read from the metadata index, so no document is fetched
+        while searching. The key None collects entries of any type.
+
+        Returns:
+            Dictionary mapping each type to (docstore id, distance) pairs, closest first
+        """
+        return self._search_types_many(entry, [vector], counts)[0]
+
+    def _search_types_many(self, entry: _CachedStore, vectors: List[List[float]],
+                           counts: Dict[Optional[str], int]) -> List[Dict[Optional[str], List[Tuple[str, float]]]]:
+        """Run _search_types for a matrix of queries with one FAISS search per window size
+
+        Only the queries still short of results are searched again with a wider window.
+        """
+        results: List[Dict[Optional[str], List[Tuple[str, float]]]] = [
+            {doc_type: [] for doc_type in counts} for _ in vectors
         ]
-        
-        if new_docs:
-            new_vector_store = FAISS.from_documents(
-                documents=new_docs,
-                embedding=self.embeddings
-            )
-            store_path = os.path.join(Config.VECTOR_STORE_PATH, store_name)
-            new_vector_store.save_local(store_path)
-            
-    def get_all_documents(self, store_name: str) -> List[Document]:
+        vector_store = entry.vector_store
+        index = vector_store.index
+        total = entry.rows
+        if not total or not len(vectors):
+            return results
+        queries = np.asarray(vectors, dtype=np.float32)
+        if vector_store._normalize_L2:
+            faiss.normalize_L2(queries)
+        pending = list(range(len(queries)))
+        window = max(2 * sum(counts.values()), 16)
+        seen = 0
+        while pending:
+            window = min(window, total)
+            with entry.index_lock.read():
+                # Rows appended after the entry was published are not part of it
+                params = row_limit_params(index, total) if index.ntotal > total else None
+                distances, rows = index.search(queries[pending], window, params=params)
+            for query, query_distances, query_rows in zip(pending, distances, rows):
+                query_results = results[query]
+                for distance, row in zip(query_distances[seen:], query_rows[seen:]):
+                    # Tombstoned HNSW rows have no docstore id
+                    store_id = vector_store.index_to_docstore_id.get(row)
+                    if store_id is None:
+                        continue
+                    doc_type = entry.metadata_index.field_value(store_id, "type")
+                    for key in {doc_type, None}:
+                        if key in query_results and len(query_results[key]) < counts[key]:
+                            query_results[key].append((store_id, float(distance)))
+            if window >= total:
+                return results
+            pending = [
+                query for query in pending
+                if any(len(results[query][t]) < counts[t] for t in counts)
+            ]
+            seen = window
+            window *= 4
+        return results
+
+    @staticmethod
+    def _fetch_hits(entry: _CachedStore, hits: List[Tuple[str, float]]) -> List[Tuple[Document, float]]:
+        """Fetch the documents of (docstore id, distance) search hits"""
+        documents = fetch_documents(entry.vector_store.docstore, [store_id for store_id, _ in hits])
+        return [(doc, distance) for doc, (_, distance) in zip(documents, hits) if doc is not None]
+
+    def get_vectors(self, store_name: str, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Get the stored embedding vectors of documents by docstore id"""
+        vectors = {}
+        with self._read_entry(store_name) as entry:
+            with entry.index_lock.read():
+                for store_id in ids:
+                    if self._in_entry(entry, store_id):
+                        row = entry.metadata_index.row(store_id)
+                        vectors[store_id] = entry.vector_store.index.reconstruct(row)
+        return vectors
+
+    def search_stores(self, query: str, store_names: List[str], k: int = 10) -> Dict[str, List[Document]]:
+        """Search several vector stores with one embedding of the query
+
+        Returns:
+            Dictionary mapping each store name to its top k documents
+        """
+        vector = self.embed_query(query)
+        return {store_name: self.search_by_vector(vector, store_name, k=k) for store_name in store_names}
+
+    def keyword_search(self, query: str, store_name: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """Search a store's BM25 keyword index; the query is not embedded
+
+        Returns:
+            (document, BM25 score) pairs, best first
+        """
+        doc_type = self._store_type(store_name)
+        with self._read_entry(store_name) as entry:
+            hits = []
+            for store_id, score in entry.keyword_index.search(query):
+                if not self._in_entry(entry, store_id):
+                    continue
+                if doc_type is None or entry.metadata_index.field_value(store_id, "type") == doc_type:
+                    hits.append((store_id, score))
+                    if len(hits) >= k:
+                        break
+            return self._fetch_hits(entry, hits)
+
+    def hybrid_search(self, query: str, store_name: str, k: int = 10) -> List[Document]:
+        """Search a store by keywords and by vector, fused by reciprocal rank
+
+        Keyword-only queries (see is_keyword_query) with keyword hits are
+        answered from the keyword index alone, without embedding the query.
+        """
+        keyword_docs = [doc for doc, _ in self.keyword_search(query, store_name, k=k)]
+        if keyword_docs and is_keyword_query(query):
+            return keyword_docs
+        vector_docs = self.search_documents(query, store_name, k=k)
+        return reciprocal_rank_fusion([vector_docs, keyword_docs], Config.RRF_K)[:k]
+
+    def remove_documents(self, doc_ids: List[str], store_name: str) -> int:
+        """Remove documents whose metadata doc_id is in doc_ids from a vector store"""
+        ids_to_remove = {
+            store_id
+            for doc_id in doc_ids
+            for store_id in self.find_ids(store_name, "doc_id", doc_id)
+        }
+        return self.remove_documents_by_ids(list(ids_to_remove), store_name)
+
+    def remove_documents_by_ids(self, ids: List[str], store_name: str) -> int:
+        """Remove entries by docstore id from a vector store
+
+        The vectors are dropped from the existing FAISS index and docstore, so
+        the remaining documents are never re-embedded.
+
+        Returns:
+            Number of entries removed
+        """
+        if not ids:
+            return 0
+
+        def build_record(entry: _CachedStore) -> Optional[Dict[str, Any]]:
+            existing = [store_id for store_id in ids if entry.metadata_index.row(store_id) is not None]
+            return {"op": "delete", "ids": existing} if existing else None
+
+        return len(self._commit(store_name, build_record).get("ids", []))
+
+    def find_ids(self, store_name: str, field: str, value: Any) -> List[str]:
+        """Get the docstore ids of documents whose indexed metadata field equals value
+
+        Args:
+            store_name: Name of the vector store
+            field: One of MetadataIndex.FIELDS
+            value: Value to look up
+        """
+        with self._read_entry(store_name) as entry:
+            return self._lookup(entry, self._store_type(store_name), field, value)
+
+    @staticmethod
+    def _lookup(entry: _CachedStore, doc_type: Optional[str], field: str, value: Any) -> List[str]:
+        """Look up docstore ids in the metadata index, limited to a document type"""
+        return [
+            store_id for store_id in entry.metadata_index.lookup(field, value)
+            if VectorStoreService._in_entry(entry, store_id)
+            and (doc_type is None or entry.metadata_index.field_value(store_id, "type") == doc_type)
+        ]
+
+    @staticmethod
+    def _in_entry(entry: _CachedStore, store_id: str) -> bool:
+        """Check that a document is in an entry rather than appended after it was published"""
+        row = entry.metadata_index.row(store_id)
+        return row is not None and row < entry.rows
+
+    def find_documents(self, store_name: str, field: str, value: Any) -> List[Document]:
+        """Get the documents whose indexed metadata field equals value"""
+        with self._read_entry(store_name) as entry:
+            ids = self._lookup(entry, self._store_type(store_name), field, value)
+            return [doc for doc in fetch_documents(entry.vector_store.docstore, ids) if doc is not None]
+
+    def list_documents(
+        self,
+        store_name: str,
+        cursor: Optional[str] = None,
+        limit: int = Config.LIST_PAGE_SIZE,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Document], Optional[str]]:
+        """List documents in index order by walking the docstore directly
+
+        No query is embedded and no similarity search is run, so a page costs
+        time linear in the number of entries it walks. The cursor holds the
+        sequence number of the last entry walked rather than its row, so
+        rows shifting down after a delete do not make the next page skip
+        entries.
+
+        Args:
+            store_name: Name of the vector store
+            cursor: Cursor returned by a previous call, or None for the first page
+            limit: Maximum number of documents to return
+            filters: Metadata key/value pairs a document must match to be listed
+
+        Returns:
+            The page of documents and the cursor for the next page, or None
+            when the end of the store has been reached
+        """
+        try:
+            last_seq = int(cursor) if cursor else -1
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if last_seq < -1 or limit <= 0:
+            raise ValueError("Cursor must be non-negative and limit must be positive")
+        limit = min(limit, Config.MAX_PAGE_SIZE)
+        doc_type = self._store_type(store_name)
+        if doc_type is not None:
+            filters = {**(filters or {}), "type": doc_type}
+
+        documents = []
+        with self._read_entry(store_name) as entry:
+            vector_store = entry.vector_store
+            index_to_docstore_id = vector_store.index_to_docstore_id
+            total = entry.rows
+            position = self._first_row_after(entry, last_seq)
+            last_id = None
+            while position < total and len(documents) < limit:
+                end = min(total, position + limit - len(documents))
+                ids = [index_to_docstore_id[row] for row in range(position, end) if row in index_to_docstore_id]
+                position = end
+                if ids:
+                    last_id = ids[-1]
+                for doc in fetch_documents(vector_store.docstore, ids):
+                    if doc is not None and _matches_filters(doc.metadata, filters):
+                        documents.append(doc)
+
+            next_cursor = None
+            if position < total and last_id is not None:
+                next_cursor = str(entry.metadata_index.seq(last_id))
+        return documents, next_cursor
+
+    @staticmethod
+    def _first_row_after(entry: _CachedStore, seq: int) -> int:
+        """Find the first row whose sequence number is above seq
+
+        Sequence numbers grow with the row, so this is a binary search.
+        Tombstoned HNSW rows are skipped over to the next live row.
+        """
+        index_to_docstore_id = entry.vector_store.index_to_docstore_id
+        low, high = 0, entry.rows
+        while low < high:
+            middle = (low + high) // 2
+            row = middle
+            while row < high and row not in index_to_docstore_id:
+                row += 1
+            if row < high and entry.metadata_index.seq(index_to_docstore_id[row]) <= seq:
+                low = row + 1
+            else:
+                high = middle
+        return low
+
+    def get_all_documents(self, store_name: str, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """Get all documents from a vector store"""
-        vector_store = self.get_vector_store(store_name)
-        return vector_store.similarity_search(
-            "all documents",
-            k=Config.MAX_SEARCH_RESULTS
-        ) 
\ No newline at end of file
+        documents = []
+        cursor = None
+        while True:
+            page, cursor = self.list_documents(
+                store_name, cursor=cursor, limit=Config.MAX_PAGE_SIZE, filters=filters
+            )
+            documents.extend(page)
+            if cursor is None:
+                return documents
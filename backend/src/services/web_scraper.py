@@ -12,10 +12,17 @@ from src.config.config import Config
 
 class WebScraperService:
     def __init__(self):
-        self.service = Service(ChromeDriverManager().install())
+        self._service = None
         self.chrome_options = Options()
         for option in Config.CHROME_OPTIONS:
             self.chrome_options.add_argument(option)
+
+    @property
+    def service(self) -> Service:
+        """Chrome driver service, downloading the driver on first use"""
+        if self._service is None:
+            self._service = Service(ChromeDriverManager().install())
+        return self._service
             
     def extract_nav_urls(self, homepage_url: str) -> List[str]:
         """Extract navigation URLs from a webpage"""
@@ -0,0 +1,58 @@
+"""Shared fixtures for the service and route tests."""
+import itertools
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.config.config import Config
+from src.services import vector_store
+from src.services.llm_service import LLMService
+from src.services.main_service import MainService
+from src.services.vector_store import VectorStoreService
+
+# What the fake chat model answers to every query
+FAKE_ANSWER = "Blue shoes are in stock"
+
+
+class NoDocumentEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that fail if documents are embedded, e.g. on journal replay"""
+
+    def embed_documents(self, texts):
+        raise AssertionError("documents must not be re-embedded")
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    """Point the vector stores at a temporary directory and drop cached stores afterwards"""
+    path = tmp_path / "vectors"
+    monkeypatch.setattr(Config, "VECTOR_STORE_PATH", str(path))
+    # Checkpoints only happen when a test asks for them
+    monkeypatch.setattr(Config, "JOURNAL_FLUSH_INTERVAL", 3600)
+    yield path
+    vector_store._store_cache.clear()
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def main_service(store_path, embeddings, tmp_path, monkeypatch):
+    """MainService over temporary stores and databases, with fake embeddings and a fake chat model"""
+    monkeypatch.setattr(Config, "CRAWL_MANIFEST_PATH", str(tmp_path / "crawl_manifest.sqlite"))
+    monkeypatch.setattr(Config, "JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content=FAKE_ANSWER)))
+    service = MainService(vector_store=VectorStoreService(embeddings), llm_service=LLMService(llm))
+    yield service
+    service.jobs.close()
+    service.page_fetcher.close()
+
+
+@pytest.fixture
+def flask_client(main_service):
+    """Test client of the Flask app built around main_service"""
+    from app import create_app
+    return create_app(main_service).test_client()
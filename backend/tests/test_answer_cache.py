@@ -0,0 +1,77 @@
+"""Tests for caching chatbot answers."""
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from src.services import answer_cache
+from src.services.answer_cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_exact_hits_ignore_case_and_spacing():
+    cache = AnswerCache(max_entries=10, ttl=60, similarity_threshold=0.9)
+    cache.put("Do you ship?", None, "Yes", (0, 0))
+
+    assert cache.get_exact("  do YOU   ship? ", (0, 0)) == "Yes"
+    assert cache.get_exact("do you ship abroad?", (0, 0)) is None
+
+
+def test_similar_hits_need_the_threshold():
+    cache = AnswerCache(max_entries=10, ttl=60, similarity_threshold=0.9)
+    cache.put("what are your prices", [1.0, 0.0], "Low", (0, 0))
+
+    assert cache.get_similar([0.99, 0.1], (0, 0)) == "Low"
+    assert cache.get_similar([0.7, 0.7], (0, 0)) is None
+
+
+def test_answers_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    cache = AnswerCache(max_entries=10, ttl=60, similarity_threshold=0.9)
+    cache.put("do you ship?", [1.0, 0.0], "Yes", (0, 0))
+
+    clock.now += 59
+    assert cache.get_exact("do you ship?", (0, 0)) == "Yes"
+    clock.now += 2
+    assert cache.get_similar([1.0, 0.0], (0, 0)) is None
+    assert cache.get_exact("do you ship?", (0, 0)) is None
+
+
+def test_answers_are_dropped_when_a_store_changes():
+    cache = AnswerCache(max_entries=10, ttl=60, similarity_threshold=0.9)
+    cache.put("do you ship?", [1.0, 0.0], "Yes", (3, 5))
+
+    assert cache.get_similar([1.0, 0.0], (3, 6)) is None
+    assert cache.get_exact("do you ship?", (3, 5)) is None
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = AnswerCache(max_entries=2, ttl=60, similarity_threshold=0.9)
+    cache.put("a", None, "A", (0, 0))
+    cache.put("b", None, "B", (0, 0))
+    cache.get_exact("a", (0, 0))
+
+    cache.put("c", None, "C", (0, 0))
+
+    assert [cache.get_exact(query, (0, 0)) for query in "abc"] == ["A", None, "C"]
+
+
+def test_store_mutations_invalidate_chat_answers(main_service):
+    query = "Do you have blue shoes?"
+    assert main_service.get_chatbot_response_with_timings(query)["cache"] == "miss"
+    assert main_service.get_chatbot_response_with_timings(query)["cache"] == "exact"
+
+    main_service.vector_store.add_documents(
+        [Document(page_content="Blue shoe", metadata={"doc_id": "p1"})], Config.PRODUCT_INDEX_NAME
+    )
+    assert main_service.get_chatbot_response_with_timings(query)["cache"] == "miss"
+    assert main_service.get_chatbot_response_with_timings(query)["cache"] == "exact"
+
+    assert main_service.vector_store.remove_documents(["p1"], Config.PRODUCT_INDEX_NAME) == 1
+    assert main_service.get_chatbot_response_with_timings(query)["cache"] == "miss"
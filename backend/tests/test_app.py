@@ -0,0 +1,53 @@
+"""Tests for building the apps without side effects."""
+import os
+import subprocess
+import sys
+import threading
+import textwrap
+
+from starlette.testclient import TestClient
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def job_dispatchers():
+    return [thread for thread in threading.enumerate() if thread.name == "job-dispatcher"]
+
+
+def test_building_the_flask_app_starts_no_jobs(main_service):
+    from app import create_app
+
+    app = create_app(main_service)
+
+    assert app.extensions["main_service"] is main_service
+    assert job_dispatchers() == []
+    assert app.test_client().get("/jobs").get_json() == {"jobs": []}
+
+
+def test_asgi_app_runs_jobs_while_served(main_service):
+    from asgi import create_app
+
+    app = create_app(main_service, wsgi_app=False)
+    assert job_dispatchers() == []
+    with TestClient(app):
+        assert len(job_dispatchers()) == 1
+    assert job_dispatchers() == []
+
+
+def test_parse_workers_do_not_import_the_main_module(tmp_path):
+    marker = tmp_path / "imported"
+    script = tmp_path / "server.py"
+    script.write_text(textwrap.dedent(f"""
+        import os
+        if __name__ != "__main__":
+            open({str(marker)!r}, "a").close()
+        else:
+            from src.services.page_fetcher import PageFetcher
+            fetcher = PageFetcher(parse_workers=2)
+            assert fetcher.parse_pool.submit(os.getpid).result() != os.getpid()
+            fetcher.close()
+    """))
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    subprocess.run([sys.executable, str(script)], cwd=BACKEND_DIR, env=env, check=True, timeout=120)
+
+    assert not marker.exists()
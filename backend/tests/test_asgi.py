@@ -0,0 +1,41 @@
+"""Tests for the chat routes served natively by the ASGI app."""
+import pytest
+from starlette.testclient import TestClient
+
+from tests.conftest import FAKE_ANSWER
+from tests.test_chatbot_stream import parse_events
+
+
+@pytest.fixture
+def asgi_client(main_service):
+    from asgi import create_app
+
+    with TestClient(create_app(main_service, wsgi_app=False)) as client:
+        yield client
+
+
+def test_chatbot_answers(asgi_client):
+    response = asgi_client.post("/chatbot", json={"query": "Do you have blue shoes?"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["response"] == FAKE_ANSWER
+    assert data["cache"] == "miss"
+
+
+@pytest.mark.parametrize("body", ["{not json", "null", "{}"])
+def test_chatbot_rejects_bodies_without_query(asgi_client, body):
+    response = asgi_client.post("/chatbot", content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 400
+    assert response.json() == {"error": "Query is required"}
+
+
+def test_stream_events_match_the_flask_route(asgi_client):
+    response = asgi_client.get("/chatbot/stream", params={"query": "Do you have blue shoes?"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert "".join(data["token"] for _, data in events[:-1]) == FAKE_ANSWER
+    assert events[-1][0] == "done"
+    assert set(events[-1][1]) == {"timings", "cache", "context"}
@@ -0,0 +1,37 @@
+"""Tests for the async chat path."""
+import asyncio
+
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from tests.conftest import FAKE_ANSWER
+
+
+def test_async_retrieval_matches_sync_retrieval(main_service):
+    main_service.vector_store.add_documents(
+        [Document(page_content=f"product {i}", metadata={"doc_id": f"p{i}"}) for i in range(5)],
+        Config.PRODUCT_INDEX_NAME
+    )
+
+    sync_docs = main_service.retrieve_documents("which products?")
+    async_docs = asyncio.run(main_service.aretrieve_documents("which products?"))
+
+    assert [doc.id for doc in async_docs] == [doc.id for doc in sync_docs]
+
+
+def test_concurrent_async_chats(main_service):
+    async def chat_all():
+        queries = [f"question {i}?" for i in range(50)]
+        return await asyncio.gather(*(main_service.aget_chatbot_response_with_timings(q) for q in queries))
+
+    results = asyncio.run(chat_all())
+
+    assert [result["response"] for result in results] == [FAKE_ANSWER] * 50
+    assert {result["cache"] for result in results} == {"miss"}
+
+
+def test_async_stream_yields_the_answer(main_service):
+    async def collect():
+        return [token async for token in main_service.astream_chatbot_response("question?")]
+
+    assert "".join(asyncio.run(collect())) == FAKE_ANSWER
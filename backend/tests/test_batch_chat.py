@@ -0,0 +1,111 @@
+"""Tests for answering chat queries in batches."""
+import itertools
+import json
+from collections import Counter
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.config.config import Config
+from src.services.llm_service import LLMService
+from src.services.main_service import MainService
+from src.services.vector_store import VectorStoreService
+from tests.conftest import FAKE_ANSWER
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that count how often each text is embedded"""
+
+    query_calls: int = 0
+    embedded: Counter = None
+
+    def embed_documents(self, texts):
+        self.embedded.update(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        self.embedded[text] += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def service(store_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CRAWL_MANIFEST_PATH", str(tmp_path / "crawl_manifest.sqlite"))
+    monkeypatch.setattr(Config, "JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    embeddings = CountingEmbeddings(size=16, embedded=Counter())
+    llm = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content="An answer")))
+    service = MainService(vector_store=VectorStoreService(embeddings), llm_service=LLMService(llm))
+    yield service
+    service.jobs.close()
+
+
+def test_batch_larger_than_query_cache_embeds_each_query_once(service, monkeypatch):
+    monkeypatch.setattr(Config, "QUERY_EMBEDDING_CACHE_SIZE", 8)
+    queries = [f"what does product {i} cost?" for i in range(20)]
+
+    results = list(service.batch_chatbot_responses(queries))
+
+    assert sorted(result["index"] for result in results) == list(range(20))
+    assert all(result["response"] == "An answer" for result in results)
+    embeddings = service.vector_store.embeddings
+    assert embeddings.query_calls == 0
+    assert {query: embeddings.embedded[query] for query in queries} == {query: 1 for query in queries}
+
+
+def test_batch_answers_repeated_queries_once(service):
+    results = list(service.batch_chatbot_responses(["what is in stock?", "where do you ship?", "what is in stock?"]))
+
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert service.vector_store.embeddings.embedded["what is in stock?"] == 1
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["response"] == by_index[2]["response"]
+
+
+def test_batch_serves_cached_answers_exactly(service):
+    list(service.batch_chatbot_responses(["where do you ship?"]))
+
+    results = list(service.batch_chatbot_responses(["Where do you  ship?"]))
+
+    assert [result["cache"] for result in results] == ["exact"]
+
+
+def test_batch_route_streams_one_json_line_per_query(flask_client):
+    response = flask_client.post("/chatbot/batch", json={"queries": ["do you ship?", "what is in stock?"]})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted((line["index"], line["query"]) for line in lines) == [(0, "do you ship?"), (1, "what is in stock?")]
+    assert {line["response"] for line in lines} == {FAKE_ANSWER}
+
+
+def test_batch_route_reports_failed_queries(flask_client, main_service, monkeypatch):
+    def batch_chatbot_responses(requests, max_concurrency):
+        for position, (query, _) in enumerate(requests):
+            yield position, RuntimeError("model overloaded") if query == "bad?" else "fine"
+
+    monkeypatch.setattr(main_service.llm_service, "batch_chatbot_responses", batch_chatbot_responses)
+
+    response = flask_client.post("/chatbot/batch", json={"queries": ["good?", "bad?"]})
+
+    lines = {line["query"]: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert lines["good?"]["response"] == "fine"
+    assert lines["bad?"]["error"] == "model overloaded"
+
+
+@pytest.mark.parametrize("body", [{}, {"queries": []}, {"queries": "one"}, {"queries": ["ok", ""]}])
+def test_batch_route_rejects_bad_query_lists(flask_client, body):
+    response = flask_client.post("/chatbot/batch", json=body)
+
+    assert response.status_code == 400
+
+
+def test_batch_route_limits_the_batch_size(flask_client, monkeypatch):
+    monkeypatch.setattr(Config, "CHAT_BATCH_MAX_QUERIES", 2)
+
+    response = flask_client.post("/chatbot/batch", json={"queries": ["a", "b", "c"]})
+
+    assert response.status_code == 400
@@ -0,0 +1,72 @@
+"""Tests for retrieving chat context from the description and product stores."""
+import threading
+from collections import Counter
+
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from tests.test_batch_chat import CountingEmbeddings
+
+
+def test_llm_router_runs_concurrently_with_the_searches(main_service, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_MODE", "llm")
+    # Both calls wait for each other, so running them one after the other breaks the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    search = main_service.vector_store.search_by_vector_with_scores
+
+    def get_retriever_ratio(query):
+        barrier.wait()
+        return 0.5
+
+    def search_by_vector_with_scores(vector, store_name, k):
+        if store_name == Config.DESCRIPTION_INDEX_NAME:
+            barrier.wait()
+        return search(vector, store_name, k)
+
+    monkeypatch.setattr(main_service.llm_service, "get_retriever_ratio", get_retriever_ratio)
+    monkeypatch.setattr(main_service.vector_store, "search_by_vector_with_scores", search_by_vector_with_scores)
+
+    result = main_service.get_chatbot_response_with_timings("what do you sell?")
+
+    assert not barrier.broken
+    assert {"router", "embedding", "description_search", "product_search", "retrieval", "answer", "total"} <= set(
+        result["timings"]
+    )
+
+
+def test_context_is_sliced_by_the_router_ratio(main_service, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_MODE", "llm")
+    monkeypatch.setattr(Config, "HYBRID_SEARCH", False)
+    monkeypatch.setattr(main_service.llm_service, "get_retriever_ratio", lambda query: 0.3)
+    for store_name, doc_type in ((Config.DESCRIPTION_INDEX_NAME, "description"), (Config.PRODUCT_INDEX_NAME, "product")):
+        main_service.vector_store.add_documents(
+            [Document(page_content=f"{doc_type} {i}", metadata={"type": doc_type}) for i in range(12)], store_name
+        )
+
+    documents = main_service.retrieve_documents("anything")
+
+    # Each store's placeholder document may be among its hits
+    types = [doc.metadata.get("type") for doc in documents]
+    assert len(types) == 10
+    assert set(types[:7]) <= {"description", "init"} and set(types[7:]) <= {"product", "init"}
+
+
+def test_chat_embeds_the_query_once(main_service, monkeypatch):
+    embeddings = CountingEmbeddings(size=16, embedded=Counter())
+    monkeypatch.setattr(main_service.vector_store, "embeddings", embeddings)
+
+    main_service.get_chatbot_response("what do you sell?")
+
+    assert embeddings.embedded["what do you sell?"] == 1
+
+
+def test_recent_query_vectors_are_reused(main_service, monkeypatch):
+    monkeypatch.setattr(Config, "QUERY_EMBEDDING_CACHE_SIZE", 2)
+    embeddings = CountingEmbeddings(size=16, embedded=Counter())
+    monkeypatch.setattr(main_service.vector_store, "embeddings", embeddings)
+
+    for query in ["a", "b", "a", "c", "b"]:
+        main_service.vector_store.embed_query(query)
+
+    # "b" was the least recently used query when "c" was added
+    assert embeddings.embedded == Counter({"a": 1, "b": 2, "c": 1})
@@ -0,0 +1,70 @@
+"""Tests for the /chatbot/stream server-sent events route."""
+import json
+
+import threading
+
+from tests.conftest import FAKE_ANSWER
+
+
+def parse_events(body):
+    """Split an SSE body into (event, data) pairs, event being None for default events"""
+    events = []
+    for frame in body.split("\n\n"):
+        if not frame:
+            continue
+        event = None
+        data = None
+        for line in frame.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data = json.loads(value)
+        events.append((event, data))
+    return events
+
+
+def test_stream_sends_tokens_then_done(flask_client):
+    response = flask_client.get("/chatbot/stream", query_string={"query": "Do you have blue shoes?"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = parse_events(response.get_data(as_text=True))
+    tokens = events[:-1]
+    assert len(tokens) > 1
+    assert all(event is None and set(data) == {"token"} for event, data in tokens)
+    assert "".join(data["token"] for _, data in tokens) == FAKE_ANSWER
+
+    event, data = events[-1]
+    assert event == "done"
+    assert set(data) == {"timings", "cache", "context"}
+    assert "first_token" in data["timings"]
+    assert data["cache"] == "miss"
+    # The app is built without starting the background jobs
+    assert not [thread for thread in threading.enumerate() if thread.name == "job-dispatcher"]
+
+
+def test_stream_accepts_post(flask_client):
+    response = flask_client.post("/chatbot/stream", json={"query": "Do you have blue shoes?"})
+
+    events = parse_events(response.get_data(as_text=True))
+    assert events[-1][0] == "done"
+
+
+def test_stream_ends_with_error_event(flask_client, main_service, monkeypatch):
+    def fail(query, timings=None):
+        raise RuntimeError("store unavailable")
+
+    monkeypatch.setattr(main_service, "retrieve_documents", fail)
+    response = flask_client.get("/chatbot/stream", query_string={"query": "Do you have blue shoes?"})
+
+    assert response.status_code == 200
+    assert parse_events(response.get_data(as_text=True)) == [("error", {"error": "store unavailable"})]
+
+
+def test_stream_requires_query(flask_client):
+    response = flask_client.get("/chatbot/stream")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Query is required"}
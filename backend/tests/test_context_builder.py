@@ -0,0 +1,90 @@
+"""Tests for packing retrieved documents into the answer prompt."""
+import pytest
+from langchain_core.documents import Document
+
+from src.services.context_builder import ContextBuilder
+
+
+def doc(text, doc_id=None, **metadata):
+    return Document(id=doc_id, page_content=text, metadata=metadata)
+
+
+@pytest.fixture
+def builder():
+    return ContextBuilder(token_budget=1000)
+
+
+def test_products_are_rendered_without_metadata_or_empty_fields(builder):
+    product = doc(str({"name": "Red shoe", "price": 10.0, "features": ""}), type="product", source="https://shop")
+
+    context = builder.build([product])
+
+    assert context.text == "- name: Red shoe\nprice: 10.0"
+    assert "shop" not in context.text
+
+
+def test_duplicates_and_placeholders_are_dropped(builder):
+    documents = [
+        doc("Initialization document", type="init"),
+        doc("We ship worldwide."),
+        doc("  we SHIP   worldwide. "),
+    ]
+
+    context = builder.build(documents)
+
+    assert context.text == "- We ship worldwide."
+    assert context.report["documents_in"] == 3
+    assert context.report["documents_used"] == 1
+
+
+def test_chunk_overlap_is_trimmed(builder):
+    overlap = "returns are accepted within thirty days of delivery"
+    first = doc(f"Our store opened in 2001. {overlap}")
+    second = doc(f"{overlap} and refunds take five days.")
+
+    context = builder.build([first, second])
+
+    assert context.text.count(overlap) == 1
+    assert "and refunds take five days." in context.text
+
+
+def test_near_duplicate_vectors_are_dropped():
+    builder = ContextBuilder(token_budget=1000, mmr_lambda=0.5, duplicate_similarity=0.97)
+    documents = [doc("shoes A", "a"), doc("shoes B", "b"), doc("hats", "c")]
+    vectors = {"a": [1.0, 0.0], "b": [0.999, 0.01], "c": [0.6, 0.8]}
+
+    context = builder.build(documents, [1.0, 0.0], vectors)
+
+    assert [used.id for used in context.documents] == ["a", "c"]
+
+
+def test_diverse_documents_are_moved_up():
+    builder = ContextBuilder(token_budget=1000, mmr_lambda=0.3)
+    documents = [doc("shoes", "x"), doc("more shoes", "y"), doc("hats", "z")]
+    vectors = {"x": [1.0, 0.0], "y": [0.9, 0.436], "z": [0.8, -0.6]}
+
+    context = builder.build(documents, [1.0, 0.0], vectors)
+
+    assert [used.id for used in context.documents] == ["x", "z", "y"]
+
+
+def test_packing_stops_at_the_token_budget():
+    builder = ContextBuilder(token_budget=150, chars_per_token=4)
+    documents = [doc(" ".join([f"word{i}"] * 60)) for i in range(3)]
+
+    context = builder.build(documents)
+
+    assert builder.estimate_tokens(context.text) <= 150
+    assert context.report["documents_used"] == 2
+    assert context.text.endswith(" ...")
+    assert context.report["tokens_after"] < context.report["tokens_before"]
+    assert context.report["tokens_saved"] == context.report["tokens_before"] - context.report["tokens_after"]
+
+
+def test_chat_reports_the_packed_context(main_service):
+    main_service.vector_store.add_documents([doc("We ship worldwide.", doc_id=None)], "description_index")
+
+    report = main_service.get_chatbot_response_with_timings("where do you ship?")["context"]
+
+    assert report["documents_used"] >= 1
+    assert report["tokens_saved"] > 0
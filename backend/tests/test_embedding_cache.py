@@ -0,0 +1,61 @@
+"""Tests for the on-disk embedding cache."""
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    texts: list = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+def test_only_missing_texts_are_embedded(tmp_path):
+    model = CountingEmbeddings(size=8, texts=[])
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    embeddings = CachedEmbeddings(model, cache, "fake")
+
+    first = embeddings.embed_documents(["a", "b", "a"])
+    second = embeddings.embed_documents(["b", "c"])
+
+    assert model.texts == ["a", "b", "c"]
+    assert first[0] == first[2]
+    assert np.allclose(second[0], first[1])
+    assert np.allclose(second[1], model.embed_query("c"))
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    CachedEmbeddings(DeterministicFakeEmbedding(size=8), EmbeddingCache(path, 100), "fake").embed_documents(["a"])
+    model = CountingEmbeddings(size=8, texts=[])
+
+    vectors = CachedEmbeddings(model, EmbeddingCache(path, 100), "fake").embed_documents(["a"])
+
+    assert model.texts == []
+    assert np.allclose(vectors[0], model.embed_query("a"))
+
+
+def test_keys_depend_on_the_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=100)
+    cache.set_many({EmbeddingCache.make_key("old", "a"): [1.0, 2.0]})
+
+    assert cache.get_many([EmbeddingCache.make_key("new", "a")]) == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.set_many({"a": [1.0]})
+    time.sleep(0.01)
+    cache.set_many({"b": [2.0]})
+    time.sleep(0.01)
+    cache.get_many(["a"])
+    time.sleep(0.01)
+
+    cache.set_many({"c": [3.0]})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
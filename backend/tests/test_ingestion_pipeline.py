@@ -0,0 +1,155 @@
+"""Tests for the staged fetch, split, embed and index pipeline."""
+import threading
+from concurrent.futures import Future
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.config.config import Config
+from src.services.ingestion_pipeline import IngestionPipeline, PipelineCancelled
+from src.services.page_fetcher import FetchedPage
+from src.services.vector_store import VectorStoreService
+
+STORE = Config.DESCRIPTION_INDEX_NAME
+
+
+class FakeFetcher:
+    """Yields one page per URL as the pipeline asks for it; pages after hold_after wait for release"""
+
+    def __init__(self, hold_after=None):
+        self.fetched = 0
+        self.hold_after = hold_after
+        self.release = threading.Event()
+
+    def fetch_all(self, urls, previous=None):
+        for url in urls:
+            if self.fetched == self.hold_after:
+                assert self.release.wait(10)
+            self.fetched += 1
+            yield FetchedPage(url, content=f"text of {url}".encode(), content_type="text/plain")
+
+    def parse(self, page):
+        future = Future()
+        future.set_result(page.content.decode())
+        return future
+
+
+class GatedEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings whose document calls wait for open to be set, or raise error"""
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    open: threading.Event = None
+    error: Exception = None
+
+    def embed_documents(self, texts):
+        assert self.open.wait(10)
+        if self.error is not None:
+            raise self.error
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embeddings():
+    embeddings = GatedEmbeddings(size=16, open=threading.Event())
+    embeddings.open.set()
+    return embeddings
+
+
+@pytest.fixture
+def service(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    # Create the store up front, so only the pipeline's own batches go through the gate
+    service.get_vector_store(STORE)
+    return service
+
+
+def urls(count):
+    return [f"https://shop.example/page{i}" for i in range(count)]
+
+
+def run_in_thread(pipeline, page_urls, **kwargs):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["counters"] = pipeline.run(
+                page_urls, STORE, RecursiveCharacterTextSplitter(chunk_size=1000), **kwargs
+            )
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def stored_sources(service):
+    return {doc.metadata.get("source") for doc in service.get_all_documents(STORE)} - {None}
+
+
+def test_a_blocked_stage_holds_back_fetching(service, embeddings):
+    embeddings.open.clear()
+    fetcher = FakeFetcher()
+    pipeline = IngestionPipeline(service, fetcher, queue_size=1, batch_size=1)
+
+    thread, outcome = run_in_thread(pipeline, urls(50))
+    thread.join(0.5)
+    fetched_while_blocked = fetcher.fetched
+    embeddings.open.set()
+    thread.join(10)
+
+    # One page in each queue and one in the hands of each stage at most
+    assert fetched_while_blocked <= 8
+    assert outcome["counters"]["chunks_indexed"] == 50
+    assert stored_sources(service) == set(urls(50))
+
+
+def test_batches_are_searchable_before_the_run_ends(service):
+    fetcher = FakeFetcher(hold_after=2)
+    pipeline = IngestionPipeline(service, fetcher, batch_size=1)
+    indexed = threading.Event()
+
+    def progress(counters):
+        if counters["chunks_indexed"] == 2:
+            indexed.set()
+
+    thread, outcome = run_in_thread(pipeline, urls(4), progress=progress)
+    try:
+        assert indexed.wait(10)
+        assert stored_sources(service) == set(urls(2))
+    finally:
+        fetcher.release.set()
+        thread.join(10)
+
+    assert stored_sources(service) == set(urls(4))
+
+
+def test_cancel_keeps_the_committed_batches(service):
+    fetcher = FakeFetcher(hold_after=2)
+    pipeline = IngestionPipeline(service, fetcher, batch_size=1)
+    cancel = threading.Event()
+
+    def progress(counters):
+        if counters["chunks_indexed"] == 2:
+            cancel.set()
+            fetcher.release.set()
+
+    thread, outcome = run_in_thread(pipeline, urls(10), progress=progress, cancel=cancel)
+    thread.join(10)
+
+    assert isinstance(outcome["error"], PipelineCancelled)
+    assert set(urls(2)) <= stored_sources(service) < set(urls(10))
+
+
+def test_a_failing_stage_stops_the_run(service, embeddings):
+    embeddings.error = RuntimeError("embedding quota exceeded")
+    pipeline = IngestionPipeline(service, FakeFetcher(), queue_size=1, batch_size=1)
+
+    thread, outcome = run_in_thread(pipeline, urls(20))
+    thread.join(10)
+
+    assert not thread.is_alive()
+    assert str(outcome["error"]) == "embedding quota exceeded"
+    assert stored_sources(service) == set()
@@ -0,0 +1,175 @@
+"""Tests for running ingestion requests as background jobs."""
+import threading
+import time
+
+import pytest
+
+from src.services.job_service import JobService
+
+
+def wait_for(jobs, job_id, *statuses, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {jobs.get(job_id)['status']}, not {statuses}")
+
+
+class Handlers(dict):
+    """Job handlers: "echo" returns its params, "wait" reports progress until cancelled or released"""
+
+    def __init__(self):
+        super().__init__(echo=self.echo, wait=self.wait)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def echo(self, params, progress, cancel):
+        progress({"items": 1})
+        return params
+
+    def wait(self, params, progress, cancel):
+        self.runs += 1
+        progress({"ticks": 1})
+        self.started.set()
+        while not cancel.is_set() and not self.release.is_set():
+            time.sleep(0.01)
+        return {"done": True}
+
+
+@pytest.fixture
+def handlers():
+    return Handlers()
+
+
+@pytest.fixture
+def open_jobs(tmp_path, handlers):
+    """Open JobService instances over one database, closed after the test"""
+    opened = []
+
+    def open_jobs(**kwargs):
+        jobs = JobService(str(tmp_path / "jobs.sqlite"), handlers, poll_interval=0.05, **kwargs)
+        opened.append(jobs)
+        return jobs
+
+    yield open_jobs
+    for jobs in opened:
+        jobs.close()
+
+
+def test_submitted_job_runs_in_the_background(open_jobs):
+    jobs = open_jobs()
+
+    job = jobs.submit("echo", {"urls": ["https://shop"]})
+
+    assert job["status"] in ("queued", "running")
+    done = wait_for(jobs, job["id"], "succeeded")
+    assert done["result"] == {"urls": ["https://shop"]}
+    assert done["progress"] == {"items": 1}
+    assert done["attempts"] == 1
+
+
+def test_unknown_job_type_is_rejected(open_jobs):
+    with pytest.raises(ValueError):
+        open_jobs().submit("rebuild-everything", {})
+
+
+def test_cancelling_a_queued_job_stops_it_from_running(open_jobs, handlers):
+    jobs = open_jobs(workers=1)
+    running = jobs.submit("wait", {})
+    assert handlers.started.wait(10)
+    queued = jobs.submit("wait", {})
+
+    assert jobs.cancel(queued["id"])["status"] == "cancelled"
+    handlers.release.set()
+    wait_for(jobs, running["id"], "succeeded")
+    assert handlers.runs == 1
+
+
+def test_cancelling_a_running_job_keeps_its_progress(open_jobs, handlers):
+    jobs = open_jobs()
+    job = jobs.submit("wait", {})
+    assert handlers.started.wait(10)
+
+    jobs.cancel(job["id"])
+
+    cancelled = wait_for(jobs, job["id"], "cancelled")
+    assert cancelled["progress"] == {"ticks": 1}
+    assert jobs.cancel("missing") is None
+
+
+def test_interrupted_job_resumes_after_a_restart(open_jobs, handlers):
+    jobs = open_jobs()
+    job = jobs.submit("wait", {})
+    assert handlers.started.wait(10)
+
+    jobs.close()
+    assert jobs.get(job["id"])["status"] == "queued"
+    handlers.release.set()
+    restarted = open_jobs()
+    restarted.start()
+
+    done = wait_for(restarted, job["id"], "succeeded")
+    assert done["attempts"] == 1
+    assert handlers.runs == 2
+
+
+def running_elsewhere(jobs, job_type, attempts=1):
+    """Record a job as running in a process that has since died, heartbeating until now"""
+    now = time.time()
+    with jobs._lock:
+        jobs._conn.execute(
+            "INSERT INTO jobs (id, type, status, params, attempts, owner, heartbeat, created_at, started_at) "
+            "VALUES ('crashed', ?, 'running', '{}', ?, 'dead', ?, ?, ?)",
+            (job_type, attempts, now, now, now)
+        )
+    return "crashed"
+
+
+def test_job_of_a_crashed_process_is_requeued_after_its_lease(open_jobs):
+    jobs = open_jobs(lease=0.2)
+    job_id = running_elsewhere(jobs, "echo")
+
+    jobs.start()
+
+    assert jobs.get(job_id)["status"] == "running"
+    done = wait_for(jobs, job_id, "succeeded")
+    assert done["attempts"] == 2
+
+
+def test_job_out_of_attempts_is_given_up(open_jobs):
+    jobs = open_jobs(lease=0.2, max_attempts=2)
+    job_id = running_elsewhere(jobs, "echo", attempts=2)
+
+    jobs.start()
+
+    failed = wait_for(jobs, job_id, "failed")
+    assert failed["error"] == "Worker stopped after 2 attempts"
+
+
+def test_routes_run_ingestion_as_a_job(flask_client, main_service, monkeypatch):
+    urls = []
+
+    def process_product_urls(page_urls, progress, cancel):
+        urls.extend(page_urls)
+        return [{"name": "Red shoe"}], 0
+
+    monkeypatch.setattr(main_service, "process_product_urls", process_product_urls)
+
+    response = flask_client.post(
+        "/process-product-urls", json={"urls": ["https://shop/shoes"]}, headers={"Prefer": "respond-async"}
+    )
+
+    assert response.status_code == 202
+    status_url = response.headers["Location"]
+    deadline = time.time() + 10
+    while flask_client.get(status_url).get_json()["status"] not in ("succeeded", "failed") and time.time() < deadline:
+        time.sleep(0.05)
+    job = flask_client.get(status_url).get_json()
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"products": [{"name": "Red shoe"}], "failed_chunks": 0}
+    assert urls == ["https://shop/shoes"]
+    assert flask_client.get("/jobs/missing").status_code == 404
+    assert flask_client.post(f"{status_url}/cancel").get_json()["status"] == "succeeded"
@@ -0,0 +1,98 @@
+"""Tests for BM25 keyword search and its fusion with vector search."""
+from collections import Counter
+
+import pytest
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from src.services.keyword_index import KeywordIndex, is_keyword_query, reciprocal_rank_fusion, tokenize
+from src.services.vector_store import VectorStoreService
+from tests.test_batch_chat import CountingEmbeddings
+
+
+def doc(doc_id, text=""):
+    return Document(id=doc_id, page_content=text or doc_id)
+
+
+def test_identifiers_are_indexed_whole_and_in_parts():
+    assert tokenize("Model XR-200/B, in Red") == ["model", "xr-200/b", "xr", "200", "b", "in", "red"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("XR-200", True),
+    ("sku 12345", False),
+    ("12345 ab-7", True),
+    ('"Red Runner Shoe"', True),
+    ("do you ship abroad?", False),
+])
+def test_keyword_queries(query, expected):
+    assert is_keyword_query(query) == expected
+
+
+def test_rare_terms_and_short_documents_rank_higher():
+    keyword_index = KeywordIndex()
+    keyword_index.add("a", "red shoe")
+    keyword_index.add("b", "red shoe with laces and a long description of the red shoe")
+    keyword_index.add("c", "red hat")
+    keyword_index.add("d", "blue hat")
+
+    assert [store_id for store_id, _ in keyword_index.search("shoe")] == ["a", "b"]
+    # "shoe" is rarer than "red", so it decides the order
+    assert keyword_index.search("red shoe")[0][0] == "a"
+    assert keyword_index.search("red shoe", k=1) == keyword_index.search("red shoe")[:1]
+
+
+def test_removed_documents_are_not_found():
+    keyword_index = KeywordIndex()
+    keyword_index.add("a", "red shoe")
+    keyword_index.add("b", "red hat")
+    copy = keyword_index.copy()
+
+    copy.remove(["a"])
+
+    assert [store_id for store_id, _ in copy.search("red")] == ["b"]
+    assert [store_id for store_id, _ in keyword_index.search("shoe")] == ["a"]
+
+
+def test_fusion_favours_documents_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion([[doc("a"), doc("b"), doc("c")], [doc("c"), doc("d"), doc("b")]], rrf_k=60)
+
+    assert [d.id for d in fused] == ["c", "b", "a", "d"]
+
+
+@pytest.fixture
+def service(store_path):
+    service = VectorStoreService(CountingEmbeddings(size=16, embedded=Counter()))
+    service.add_documents([
+        Document(page_content="Trail runner XR-200 in red", metadata={"doc_id": "xr"}),
+        Document(page_content="City sneaker CS-10 in white", metadata={"doc_id": "cs"}),
+        Document(page_content="Leather boot LB-5 in brown", metadata={"doc_id": "lb"}),
+    ], Config.PRODUCT_INDEX_NAME)
+    return service
+
+
+def test_keyword_only_query_is_not_embedded(service):
+    hits = service.hybrid_search("XR-200", Config.PRODUCT_INDEX_NAME, k=3)
+
+    assert [d.metadata["doc_id"] for d in hits] == ["xr"]
+    assert service.embeddings.query_calls == 0
+
+
+def test_other_queries_fuse_both_rankings(service):
+    hits = service.hybrid_search("a sneaker for the city", Config.PRODUCT_INDEX_NAME, k=3)
+
+    assert hits[0].metadata.get("doc_id") == "cs"
+    assert service.embeddings.query_calls == 1
+
+
+def test_chat_answers_keyword_queries_without_embedding(main_service, monkeypatch):
+    embeddings = CountingEmbeddings(size=16, embedded=Counter())
+    monkeypatch.setattr(main_service.vector_store, "embeddings", embeddings)
+    main_service.vector_store.add_documents(
+        [Document(page_content="Trail runner XR-200 in red", metadata={"doc_id": "xr"})], Config.PRODUCT_INDEX_NAME
+    )
+
+    result = main_service.get_chatbot_response_with_timings("XR-200")
+
+    assert embeddings.embedded["XR-200"] == 0
+    assert "embedding" not in result["timings"]
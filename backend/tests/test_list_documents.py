@@ -0,0 +1,76 @@
+"""Tests for paging through a vector store's documents."""
+import pytest
+from langchain_core.documents import Document
+
+from src.services.vector_store import VectorStoreService
+
+
+def products(count):
+    return [
+        Document(
+            page_content=str({"name": f"p{i}"}),
+            metadata={"doc_id": f"p{i}", "source": "even" if i % 2 == 0 else "odd"}
+        )
+        for i in range(count)
+    ]
+
+
+def page_through(service, limit, filters=None):
+    doc_ids, cursor = [], None
+    while True:
+        page, cursor = service.list_documents("product_info_index", cursor=cursor, limit=limit, filters=filters)
+        assert len(page) <= limit
+        doc_ids.extend(doc.metadata["doc_id"] for doc in page if "doc_id" in doc.metadata)
+        if cursor is None:
+            return doc_ids
+
+
+@pytest.fixture
+def service(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(10), "product_info_index")
+    return service
+
+
+def test_pages_cover_the_store_once_in_order(service):
+    assert page_through(service, limit=3) == [f"p{i}" for i in range(10)]
+
+
+def test_cursor_survives_deletes_before_it(service):
+    first, cursor = service.list_documents("product_info_index", limit=5)
+    seen = [doc.metadata["doc_id"] for doc in first if "doc_id" in doc.metadata]
+
+    # Rows after the deleted ones shift down; the cursor must not skip any of them
+    service.remove_documents(seen[:2], "product_info_index")
+    rest, _ = service.list_documents("product_info_index", cursor=cursor, limit=100)
+
+    assert [doc.metadata["doc_id"] for doc in rest] == [f"p{i}" for i in range(len(seen), 10)]
+
+
+def test_filters_are_applied_while_paging(service):
+    assert page_through(service, limit=2, filters={"source": "odd"}) == ["p1", "p3", "p5", "p7", "p9"]
+    assert [doc.metadata["doc_id"] for doc in service.get_all_documents("product_info_index", {"source": "even"})] == [
+        "p0", "p2", "p4", "p6", "p8"
+    ]
+
+
+@pytest.mark.parametrize("cursor, limit", [("abc", 5), ("-5", 5), (None, 0)])
+def test_invalid_arguments_are_rejected(service, cursor, limit):
+    with pytest.raises(ValueError):
+        service.list_documents("product_info_index", cursor=cursor, limit=limit)
+
+
+def test_route_returns_next_cursor(flask_client, main_service):
+    main_service.vector_store.add_documents(products(4), "product_info_index")
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        data = flask_client.get("/view-all-products", query_string=params).get_json()
+        names.extend(product["name"] for product in data["products"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert names == ["p0", "p1", "p2", "p3"]
+    assert flask_client.get("/view-all-products", query_string={"cursor": "abc"}).status_code == 400
@@ -0,0 +1,64 @@
+"""Tests for the metadata index behind point lookups."""
+import os
+
+from langchain_core.documents import Document
+
+from src.services.metadata_index import METADATA_INDEX_FILE, MetadataIndex
+from src.services.vector_store import VectorStoreService
+
+
+def product(name, **metadata):
+    return Document(page_content=str({"name": name}), metadata={"type": "product", **metadata})
+
+
+def test_fields_are_read_from_metadata_and_content():
+    metadata_index = MetadataIndex()
+    metadata_index.add("a", 0, product("Red shoe", doc_id="1", source="https://shop/shoes"))
+    metadata_index.add("b", 1, product("Blue shoe", product_id="2"))
+
+    assert metadata_index.lookup("name", "Red shoe") == ["a"]
+    assert metadata_index.lookup("source", "https://shop/shoes") == ["a"]
+    # Older products carry their id as product_id
+    assert metadata_index.lookup("doc_id", "2") == ["b"]
+    assert sorted(metadata_index.lookup("type", "product")) == ["a", "b"]
+
+
+def test_copy_does_not_change_the_original():
+    original = MetadataIndex()
+    original.add("a", 0, product("Red shoe", doc_id="1"))
+    original.add("b", 1, product("Blue shoe", doc_id="2"))
+
+    copy = original.copy()
+    copy.remove(["a"])
+    copy.add("c", 1, product("Green shoe", doc_id="3"))
+
+    assert sorted(original.lookup("type", "product")) == ["a", "b"]
+    assert original.lookup("doc_id", "3") == []
+    assert sorted(copy.lookup("type", "product")) == ["b", "c"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    metadata_index = MetadataIndex()
+    metadata_index.add("a", 0, product("Red shoe", doc_id="1"))
+    metadata_index.add("b", 1, product("Blue shoe", doc_id="2"))
+    metadata_index.remove(["a"])
+    metadata_index.save(str(tmp_path))
+
+    loaded = MetadataIndex.load(str(tmp_path))
+
+    assert loaded.lookup("doc_id", "2") == ["b"]
+    assert loaded.lookup("doc_id", "1") == []
+    assert loaded.seq("b") == metadata_index.seq("b")
+    assert loaded.next_seq == metadata_index.next_seq
+
+
+def test_missing_index_is_rebuilt_from_the_store(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents([product(f"p{i}", doc_id=f"p{i}") for i in range(5)], "product_info_index")
+    service.flush()
+    os.remove(os.path.join(store_path, "product_info_index", METADATA_INDEX_FILE))
+    service.invalidate()
+
+    [doc] = VectorStoreService(embeddings).find_documents("product_info_index", "name", "p3")
+
+    assert doc.metadata["doc_id"] == "p3"
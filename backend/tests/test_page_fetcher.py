@@ -0,0 +1,126 @@
+"""Tests for concurrent page downloads."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.config.config import Config
+from src.services.page_fetcher import PageFetcher
+
+
+class Server:
+    """Local HTTP server; pages under /slow/ are held until release is set
+
+    The server answers as both 127.0.0.1 and localhost, which the fetcher
+    counts as two hosts.
+    """
+
+    def __init__(self):
+        self.failures = {}
+        self.requests = []
+        self.release = threading.Event()
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = self.headers["Host"]
+                with server._lock:
+                    server.requests.append(self.path)
+                    server.in_flight[host] = server.in_flight.get(host, 0) + 1
+                    server.max_in_flight[host] = max(server.max_in_flight.get(host, 0), server.in_flight[host])
+                    failing = server.failures.get(self.path, 0)
+                    if failing:
+                        server.failures[self.path] = failing - 1
+                try:
+                    if self.path.startswith("/slow/"):
+                        server.release.wait(10)
+                    body = b"page " + self.path.encode()
+                    self.send_response(503 if failing else 200)
+                    self.send_header("Content-Type", "text/plain")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.in_flight[host] -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path, host="127.0.0.1"):
+        return f"http://{host}:{self.server.server_port}{path}"
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    yield server
+    server.release.set()
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(Config, "FETCH_BACKOFF", 0)
+
+
+def test_retries_server_errors(server, no_backoff):
+    server.failures["/flaky"] = 2
+    fetcher = PageFetcher(retries=2)
+
+    page = fetcher.fetch(server.url("/flaky"))
+    fetcher.close()
+
+    assert page.error is None
+    assert page.content == b"page /flaky"
+    assert server.requests == ["/flaky"] * 3
+
+
+def test_gives_up_after_retries(server, no_backoff):
+    server.failures["/down"] = 5
+    fetcher = PageFetcher(retries=1)
+
+    pages = list(fetcher.fetch_all([server.url("/down"), server.url("/up")]))
+    fetcher.close()
+
+    by_path = {page.url.rsplit("/", 1)[1]: page for page in pages}
+    assert by_path["down"].error is not None
+    assert by_path["up"].error is None
+    assert server.requests.count("/down") == 2
+
+
+def test_slow_host_does_not_hold_workers_of_other_hosts(server):
+    fetcher = PageFetcher(max_concurrency=2, per_host_concurrency=1)
+    urls = [server.url(f"/slow/{i}") for i in range(3)] + [
+        server.url(f"/fast/{i}", host="localhost") for i in range(3)
+    ]
+    fetched = []
+    fast_done = threading.Event()
+
+    def consume():
+        for page in fetcher.fetch_all(urls):
+            fetched.append(page)
+            if sum("/fast/" in page.url for page in fetched) == 3:
+                fast_done.set()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    try:
+        # The slow host holds one slot; the other worker downloads the fast host's pages meanwhile
+        assert fast_done.wait(10)
+        assert [page.url for page in fetched] == urls[3:]
+    finally:
+        server.release.set()
+        consumer.join(10)
+    fetcher.close()
+
+    assert sorted(page.url for page in fetched) == sorted(urls)
+    assert all(page.error is None for page in fetched)
+    assert set(server.max_in_flight.values()) == {1}
@@ -0,0 +1,91 @@
+"""Tests for extracting products from page chunks with the LLM."""
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from src.config.config import Config
+from src.models.data_models import ListProduct, ProductService
+
+
+class FakeExtractor:
+    """Structured-output stand-in that extracts the chunk text as one product
+
+    Chunks listed in failures raise that many times before succeeding.
+    """
+
+    def __init__(self, failures=None, delay=0.02):
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, content):
+        with self._lock:
+            self.calls.append(content)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failing = self.failures.get(content, 0)
+            if failing:
+                self.failures[content] = failing - 1
+        try:
+            time.sleep(self.delay)
+            if failing:
+                raise RuntimeError(f"cannot parse {content}")
+            return ListProduct(products=[
+                ProductService(name=content, description="", price=1.0, specifications="", features="")
+            ])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def extractor(main_service, monkeypatch):
+    extractor = FakeExtractor()
+    # Set on the instance, as reading the cached property would build the real structured-output runnable
+    monkeypatch.setitem(main_service.llm_service.__dict__, "prod_format_llm", RunnableLambda(extractor))
+    monkeypatch.setattr(Config, "EXTRACTION_CONCURRENCY", 4)
+    return extractor
+
+
+def chunks(count):
+    return [Document(page_content=f"chunk {i}", metadata={"source": "https://shop"}) for i in range(count)]
+
+
+def test_every_chunk_is_extracted_with_bounded_concurrency(main_service, extractor):
+    counters = []
+
+    products, failed = main_service.extract_products(chunks(30), progress=counters.append)
+
+    assert [product["name"] for product in products] == [f"chunk {i}" for i in range(30)]
+    assert failed == 0
+    assert 1 < extractor.max_in_flight <= 4
+    assert counters[-1] == {"chunks_total": 30, "chunks_extracted": 30, "chunks_failed": 0, "products_extracted": 30}
+
+
+def test_failing_chunks_are_retried_then_skipped(main_service, extractor):
+    extractor.failures = {"chunk 1": 1, "chunk 3": 5}
+
+    products, failed = main_service.extract_products(chunks(5))
+
+    assert [product["name"] for product in products] == ["chunk 0", "chunk 1", "chunk 2", "chunk 4"]
+    assert failed == 1
+    assert extractor.calls.count("chunk 3") == Config.EXTRACTION_ATTEMPTS
+
+
+def test_cancel_stops_extraction(main_service, extractor):
+    cancel = threading.Event()
+
+    def progress(counters):
+        if counters["chunks_extracted"] == 2:
+            cancel.set()
+
+    products, _ = main_service.extract_products(chunks(40), progress=progress, cancel=cancel)
+
+    assert 2 <= len(products) < 40
+    assert len(extractor.calls) < 40
@@ -0,0 +1,159 @@
+"""Tests for re-processing product pages through the crawl manifest."""
+import ast
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.config.config import Config
+from src.models.data_models import ListProduct, ProductService
+from src.services.crawl_manifest import content_hash
+
+
+class Site:
+    """Local HTTP server serving pages whose ETag is a hash of their body"""
+
+    def __init__(self):
+        self.pages = {}
+        self.honor_conditional = True
+        self.statuses = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = site.pages[self.path].encode()
+                etag = f'"{content_hash(body)[:16]}"'
+                if site.honor_conditional and self.headers.get("If-None-Match") == etag:
+                    site.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                site.statuses.append(200)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
+
+
+@pytest.fixture
+def extracted(main_service, monkeypatch):
+    """Chunks sent to the LLM; each comma-separated name in a chunk is extracted as a product"""
+    chunks = []
+
+    def parse(page):
+        # Parsing runs unstructured in worker processes; the pages here are plain text
+        future = Future()
+        future.set_result(page.content.decode())
+        return future
+
+    def format_product_infos(contents, max_concurrency):
+        for i, content in enumerate(contents):
+            chunks.append(content)
+            yield i, ListProduct(products=[
+                ProductService(name=name.strip(), description="", price=1.0, specifications="", features="")
+                for name in content.split(",")
+            ])
+
+    monkeypatch.setattr(main_service.page_fetcher, "parse", parse)
+    monkeypatch.setattr(main_service.llm_service, "format_product_infos", format_product_infos)
+    return chunks
+
+
+def stored_products(main_service, url):
+    """(name, doc_id) of the products stored for a page"""
+    documents = main_service.vector_store.find_documents(Config.PRODUCT_INDEX_NAME, "source", url)
+    return sorted((ast.literal_eval(doc.page_content)["name"], doc.metadata["doc_id"]) for doc in documents)
+
+
+def test_not_modified_page_is_not_extracted_again(main_service, site, extracted):
+    site.pages["/shoes"] = "Red shoe, Blue shoe"
+    url = site.url("/shoes")
+
+    products, failed_chunks = main_service.process_product_urls([url])
+    stored = stored_products(main_service, url)
+    again, _ = main_service.process_product_urls([url])
+
+    assert sorted(product["name"] for product in products) == ["Blue shoe", "Red shoe"]
+    assert failed_chunks == 0
+    assert site.statuses == [200, 304]
+    assert again == []
+    assert extracted == ["Red shoe, Blue shoe"]
+    assert stored_products(main_service, url) == stored
+
+
+def test_unchanged_body_is_not_extracted_again(main_service, site, extracted):
+    site.pages["/shoes"] = "Red shoe, Blue shoe"
+    site.honor_conditional = False
+    url = site.url("/shoes")
+
+    main_service.process_product_urls([url])
+    again, _ = main_service.process_product_urls([url])
+
+    assert site.statuses == [200, 200]
+    assert again == []
+    assert len(extracted) == 1
+    assert len(stored_products(main_service, url)) == 2
+
+
+def test_changed_page_replaces_only_its_own_products(main_service, site, extracted):
+    site.pages["/shoes"] = "Red shoe, Blue shoe"
+    site.pages["/hats"] = "Straw hat"
+    shoes, hats = site.url("/shoes"), site.url("/hats")
+    main_service.process_product_urls([shoes, hats])
+    hat_ids = main_service.vector_store.find_ids(Config.PRODUCT_INDEX_NAME, "source", hats)
+    red_shoe = dict(stored_products(main_service, shoes))["Red shoe"]
+
+    site.pages["/shoes"] = "Red shoe, Green shoe"
+    products, _ = main_service.process_product_urls([shoes, hats])
+
+    assert sorted(product["name"] for product in products) == ["Green shoe", "Red shoe"]
+    assert extracted[-1] == "Red shoe, Green shoe"
+    assert [name for name, _ in stored_products(main_service, shoes)] == ["Green shoe", "Red shoe"]
+    # The product id is derived from the page and the name, so it survives re-extraction
+    assert dict(stored_products(main_service, shoes))["Red shoe"] == red_shoe
+    assert main_service.vector_store.find_ids(Config.PRODUCT_INDEX_NAME, "source", hats) == hat_ids
+
+
+def test_products_of_one_page_get_distinct_ids(main_service, site, extracted):
+    site.pages["/shoes"] = "Red shoe, Blue shoe, Green shoe"
+    url = site.url("/shoes")
+
+    main_service.process_product_urls([url])
+
+    assert len({doc_id for _, doc_id in stored_products(main_service, url)}) == 3
+
+
+def test_route_and_job_skip_unchanged_pages(main_service, flask_client, site, extracted):
+    site.pages["/shoes"] = "Red shoe, Blue shoe"
+    url = site.url("/shoes")
+
+    response = flask_client.post("/process-product-urls", json={"urls": [url]})
+    counters = []
+    result = main_service._job_handlers()["process-product-urls"]({"urls": [url]}, counters.append, None)
+
+    assert response.status_code == 200
+    assert len(response.get_json()["products"]) == 2
+    assert result == {"products": [], "failed_chunks": 0}
+    assert counters == [{"pages_fetched": 1, "pages_changed": 0, "pages_failed": 0}]
+    assert len(extracted) == 1
@@ -0,0 +1,58 @@
+"""Tests for routing chat queries between the description and product stores."""
+import pytest
+from langchain_core.documents import Document
+
+from src.services.query_router import QueryRouter
+
+
+def hits(*similarities, doc_type="content"):
+    """(document, squared L2 distance) pairs with the given cosine similarities"""
+    return [(Document(page_content="", metadata={"type": doc_type}), 2 * (1 - s)) for s in similarities]
+
+
+@pytest.fixture
+def router():
+    return QueryRouter(top_n=2, temperature=0.05, min_margin=0.02)
+
+
+def test_better_matching_store_gets_more_documents(router):
+    ratio = router.route(hits(0.5, 0.4), hits(0.8, 0.7))
+
+    assert ratio > 0.99
+    assert router.route(hits(0.8, 0.7), hits(0.5, 0.4)) == pytest.approx(1 - ratio)
+
+
+def test_close_scores_fall_back(router):
+    assert router.route(hits(0.70), hits(0.71)) is None
+    assert router.route(hits(0.70), hits(0.73)) is not None
+
+
+def test_only_the_top_hits_count(router):
+    # The third hit is beyond top_n and does not pull the product score down
+    assert router.route(hits(0.6, 0.6), hits(0.7, 0.7, 0.0)) > 0.5
+
+
+def test_empty_stores(router):
+    placeholder = hits(0.9, doc_type="init")
+    assert router.route(placeholder, hits(0.3)) == 1.0
+    assert router.route(hits(0.3), []) == 0.0
+    assert router.route([], placeholder) == 0.5
+
+
+def test_keyword_ratio_is_the_product_share_of_the_best_scores():
+    assert QueryRouter.route_keywords([(None, 1.0), (None, 0.5)], [(None, 3.0)]) == 0.75
+    assert QueryRouter.route_keywords([], []) == 0.5
+
+
+@pytest.mark.parametrize("min_margin, llm_calls", [(0.0, 0), (float("inf"), 1)])
+def test_llm_router_is_only_called_below_the_margin(main_service, monkeypatch, min_margin, llm_calls):
+    calls = []
+    monkeypatch.setattr(main_service.llm_service, "get_retriever_ratio", lambda query: calls.append(query) or 0.5)
+    main_service.query_router.min_margin = min_margin
+    main_service.vector_store.add_documents([Document(page_content="Red shoe")], "product_info_index")
+    main_service.vector_store.add_documents([Document(page_content="We ship worldwide")], "description_index")
+
+    timings = main_service.get_chatbot_response_with_timings("what do you sell?")["timings"]
+
+    assert len(calls) == llm_calls
+    assert ("router_llm" in timings) == bool(llm_calls)
@@ -0,0 +1,81 @@
+"""Tests for keeping document content in SQLite next to the index."""
+import os
+
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from src.services.sqlite_docstore import SQLiteDocstore
+from src.services.vector_store import VectorStoreService
+
+
+def products(count):
+    return [
+        Document(page_content=f"secret content {i}", metadata={"doc_id": f"p{i}"})
+        for i in range(count)
+    ]
+
+
+def docstore_files(store_path):
+    return sorted(name for name in os.listdir(store_path / "product_info_index") if name.endswith(".sqlite"))
+
+
+def test_documents_are_fetched_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteDocstore, "_BATCH_SIZE", 2)
+    docstore = SQLiteDocstore.create(str(tmp_path))
+    docstore.add({f"id{i}": doc for i, doc in enumerate(products(5))})
+    docstore.delete(["id1"])
+
+    found = docstore.search_many(["id0", "id1", "id4", "missing"])
+
+    assert {doc_id: doc.page_content for doc_id, doc in found.items()} == {
+        "id0": "secret content 0", "id4": "secret content 4"
+    }
+    assert found["id0"].metadata == {"doc_id": "p0"}
+    assert docstore.search("id1") == "ID id1 not found."
+
+
+def test_index_pickle_holds_no_content(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+    service.flush()
+
+    with open(store_path / "product_info_index" / "index.pkl", "rb") as f:
+        assert b"secret content" not in f.read()
+    assert isinstance(service.get_vector_store("product_info_index").docstore, SQLiteDocstore)
+
+
+def test_in_memory_store_is_converted_once_on_load(store_path, embeddings, monkeypatch):
+    monkeypatch.setattr(Config, "DOCSTORE_BACKEND", "memory")
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+    service.flush()
+    assert isinstance(service.get_vector_store("product_info_index").docstore, InMemoryDocstore)
+    assert docstore_files(store_path) == []
+
+    monkeypatch.setattr(Config, "DOCSTORE_BACKEND", "sqlite")
+    service.invalidate()
+    service = VectorStoreService(embeddings)
+    [doc] = service.find_documents("product_info_index", "doc_id", "p1")
+    converted = docstore_files(store_path)
+    service.invalidate()
+
+    assert doc.page_content == "secret content 1"
+    assert len(converted) == 1
+    # The converted checkpoint is loaded as is the next time
+    VectorStoreService(embeddings).get_vector_store("product_info_index")
+    assert docstore_files(store_path) == converted
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_documents_survive_reload(store_path, embeddings, monkeypatch, backend):
+    monkeypatch.setattr(Config, "DOCSTORE_BACKEND", backend)
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+    service.flush()
+    service.invalidate()
+
+    [doc] = VectorStoreService(embeddings).find_documents("product_info_index", "doc_id", "p2")
+
+    assert doc.page_content == "secret content 2"
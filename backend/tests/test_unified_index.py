@@ -0,0 +1,86 @@
+"""Tests for serving both logical stores from one unified index."""
+import sys
+
+import pytest
+from langchain_core.documents import Document
+
+from scripts import migrate_unified_index
+from src.config.config import Config
+from src.services import vector_store
+from src.services.vector_store import VectorStoreService
+
+
+def documents(doc_type, count):
+    return [
+        Document(page_content=f"{doc_type} {i}", metadata={"doc_id": f"{doc_type}{i}"})
+        for i in range(count)
+    ]
+
+
+def listed(service, store_name):
+    return sorted(
+        doc.metadata["doc_id"] for doc in service.get_all_documents(store_name) if "doc_id" in doc.metadata
+    )
+
+
+@pytest.fixture
+def unified(store_path, embeddings, monkeypatch):
+    monkeypatch.setattr(Config, "UNIFIED_INDEX", True)
+    service = VectorStoreService(embeddings)
+    service.add_documents(documents("product", 6), Config.PRODUCT_INDEX_NAME)
+    service.add_documents(documents("description", 4), Config.DESCRIPTION_INDEX_NAME)
+    return service
+
+
+def test_logical_stores_share_one_index(unified, store_path):
+    assert [path.name for path in store_path.iterdir() if path.is_dir()] == [Config.UNIFIED_INDEX_NAME]
+    assert listed(unified, Config.PRODUCT_INDEX_NAME) == [f"product{i}" for i in range(6)]
+    assert listed(unified, Config.DESCRIPTION_INDEX_NAME) == [f"description{i}" for i in range(4)]
+
+
+def test_searches_are_limited_to_the_logical_store(unified):
+    hits = unified.search_documents("description 2", Config.PRODUCT_INDEX_NAME, k=10)
+
+    assert len(hits) == 6
+    assert {doc.metadata["type"] for doc in hits} == {"product"}
+
+
+def test_one_pass_fills_each_type(unified, embeddings):
+    vector = embeddings.embed_query("product 1")
+
+    hits = unified.search_by_types(vector, Config.UNIFIED_INDEX_NAME, {"product": 2, "description": 3})
+    quota = unified.search_with_quotas(vector, Config.UNIFIED_INDEX_NAME, 5, {"description": 4})
+
+    assert [doc.metadata["doc_id"] for doc, _ in hits["product"]][0] == "product1"
+    assert [len(hits["product"]), len(hits["description"])] == [2, 3]
+    assert quota[0][0].metadata["doc_id"] == "product1"
+    assert sum(doc.metadata.get("type") == "description" for doc, _ in quota) == 4
+
+
+def test_removal_is_limited_to_the_logical_store(unified):
+    unified.add_documents([Document(page_content="shared", metadata={"doc_id": "shared"})],
+                          Config.DESCRIPTION_INDEX_NAME)
+    unified.add_documents([Document(page_content="shared", metadata={"doc_id": "shared"})],
+                          Config.PRODUCT_INDEX_NAME)
+
+    assert unified.remove_documents(["shared"], Config.PRODUCT_INDEX_NAME) == 1
+    assert "shared" in listed(unified, Config.DESCRIPTION_INDEX_NAME)
+
+
+def test_migration_merges_the_stores_without_re_embedding(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(documents("product", 3), Config.PRODUCT_INDEX_NAME)
+    service.add_documents(documents("description", 2), Config.DESCRIPTION_INDEX_NAME)
+    service.flush()
+    monkeypatch.setattr(Config, "UNIFIED_INDEX", False)
+    monkeypatch.setattr(sys, "argv", ["migrate_unified_index"])
+    monkeypatch.setattr(migrate_unified_index, "VectorStoreService", lambda: VectorStoreService(embeddings))
+
+    migrate_unified_index.main()
+    vector_store._store_cache.clear()
+    monkeypatch.setattr(Config, "UNIFIED_INDEX", True)
+
+    migrated = VectorStoreService(embeddings)
+    assert listed(migrated, Config.PRODUCT_INDEX_NAME) == ["product0", "product1", "product2"]
+    assert listed(migrated, Config.DESCRIPTION_INDEX_NAME) == ["description0", "description1"]
+    assert migrated.search_documents("product 1", Config.PRODUCT_INDEX_NAME, k=1)[0].metadata["doc_id"] == "product1"
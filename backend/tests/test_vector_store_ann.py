@@ -0,0 +1,113 @@
+"""Tests for IVF and HNSW store indexes."""
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from src.services import vector_store
+from src.services.ann_index import index_kind
+from src.services.vector_store import VectorStoreService
+
+IVF = {"type": "ivf", "nlist": 4, "nprobe": 4}
+HNSW = {"type": "hnsw", "M": 8}
+
+
+def products(start, stop):
+    return [Document(page_content=f"product p{i}", metadata={"doc_id": f"p{i}"}) for i in range(start, stop)]
+
+
+def use_index(monkeypatch, spec):
+    monkeypatch.setattr(Config, "INDEX_TYPES", {**Config.INDEX_TYPES, "product_info_index": spec})
+
+
+def top_doc_id(service, doc_id):
+    hits = service.search_documents(f"product {doc_id}", "product_info_index", k=1)
+    return hits[0].metadata.get("doc_id") if hits else None
+
+
+def assert_rows_consistent(service):
+    entry = service._get_entry("product_info_index")
+    assert entry.metadata_index.is_consistent_with(entry.vector_store.index_to_docstore_id)
+
+
+def test_ivf_store_is_trained_once_it_holds_enough_vectors(store_path, embeddings, monkeypatch):
+    use_index(monkeypatch, IVF)
+    service = VectorStoreService(embeddings)
+
+    service.add_documents(products(0, 100), "product_info_index")
+    assert index_kind(service.get_vector_store("product_info_index").index) == "flat"
+    service.add_documents(products(100, 200), "product_info_index")
+
+    index = service.get_vector_store("product_info_index").index
+    assert index_kind(index) == "ivf" and index.is_trained
+    assert top_doc_id(service, "p42") == "p42"
+    assert top_doc_id(service, "p150") == "p150"
+    assert_rows_consistent(service)
+
+
+def test_ivf_delete_keeps_the_trained_lists_and_renumbers_rows(store_path, embeddings, monkeypatch):
+    use_index(monkeypatch, IVF)
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(0, 200), "product_info_index")
+    store = service.get_vector_store("product_info_index")
+    centroids = store.index.quantizer.reconstruct_n(0, store.index.nlist)
+    before = {row: store_id for row, store_id in store.index_to_docstore_id.items()}
+    kept_vector = store.index.reconstruct(max(before))
+
+    service.remove_documents([f"p{i}" for i in range(0, 200, 10)], "product_info_index")
+
+    store = service.get_vector_store("product_info_index")
+    assert index_kind(store.index) == "ivf"
+    assert np.array_equal(store.index.quantizer.reconstruct_n(0, store.index.nlist), centroids)
+    assert store.index.ntotal == len(store.index_to_docstore_id) == len(before) - 20
+    assert sorted(store.index_to_docstore_id) == list(range(store.index.ntotal))
+    assert np.array_equal(store.index.reconstruct(store.index.ntotal - 1), kept_vector)
+    assert top_doc_id(service, "p10") != "p10"
+    assert top_doc_id(service, "p11") == "p11"
+    assert_rows_consistent(service)
+
+
+def test_hnsw_delete_leaves_tombstones_that_searches_skip(store_path, embeddings, monkeypatch):
+    use_index(monkeypatch, HNSW)
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(0, 20), "product_info_index")
+    ntotal = service.get_vector_store("product_info_index").index.ntotal
+
+    service.remove_documents(["p3", "p7"], "product_info_index")
+
+    store = service.get_vector_store("product_info_index")
+    assert store.index.ntotal == ntotal
+    assert len(store.index_to_docstore_id) == ntotal - 2
+    assert top_doc_id(service, "p3") != "p3"
+    assert top_doc_id(service, "p8") == "p8"
+    assert_rows_consistent(service)
+
+
+def test_hnsw_is_compacted_past_the_tombstone_ratio(store_path, embeddings, monkeypatch):
+    use_index(monkeypatch, HNSW)
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(0, 20), "product_info_index")
+
+    service.remove_documents([f"p{i}" for i in range(5)], "product_info_index")
+
+    store = service.get_vector_store("product_info_index")
+    assert index_kind(store.index) == "hnsw"
+    assert store.index.ntotal == len(store.index_to_docstore_id) == 16
+    assert sorted(store.index_to_docstore_id) == list(range(16))
+    assert top_doc_id(service, "p12") == "p12"
+    assert_rows_consistent(service)
+
+
+@pytest.mark.parametrize("spec, kind", [(HNSW, "hnsw"), (IVF, "ivf")])
+def test_changed_index_type_is_rebuilt_on_load(store_path, embeddings, monkeypatch, spec, kind):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(0, 200), "product_info_index")
+    service.flush()
+    vector_store._store_cache.clear()
+    use_index(monkeypatch, spec)
+
+    reloaded = VectorStoreService(embeddings)
+
+    assert index_kind(reloaded.get_vector_store("product_info_index").index) == kind
+    assert top_doc_id(reloaded, "p77") == "p77"
+    assert_rows_consistent(reloaded)
@@ -0,0 +1,56 @@
+"""Tests for the process-wide cache of loaded vector stores."""
+from src.services.vector_store import VectorStoreService
+from tests.test_vector_store_journal import listed_doc_ids, products, run_and_crash
+
+
+def count_loads(monkeypatch):
+    loads = []
+    load_entry = VectorStoreService._load_entry
+
+    def counting_load_entry(self, store_path):
+        loads.append(store_path)
+        return load_entry(self, store_path)
+
+    monkeypatch.setattr(VectorStoreService, "_load_entry", counting_load_entry)
+    return loads
+
+
+def test_services_share_one_loaded_store(store_path, embeddings, monkeypatch):
+    VectorStoreService(embeddings).add_documents(products(3), "product_info_index")
+    VectorStoreService(embeddings).invalidate()
+    loads = count_loads(monkeypatch)
+
+    first = VectorStoreService(embeddings).get_vector_store("product_info_index")
+    second = VectorStoreService(embeddings).get_vector_store("product_info_index")
+
+    assert first is second
+    assert len(loads) == 1
+
+
+def test_journaled_changes_of_another_process_are_replayed(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(2), "product_info_index")
+    service.flush()
+    loads = count_loads(monkeypatch)
+
+    run_and_crash(store_path, """
+        service.add_documents([Document(page_content="product q0", metadata={"doc_id": "q0"})], "product_info_index")
+    """)
+
+    assert listed_doc_ids(service, "product_info_index") == ["p0", "p1", "q0"]
+    assert loads == []
+
+
+def test_checkpoint_of_another_process_is_reloaded(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(2), "product_info_index")
+    service.flush()
+    before = service.get_vector_store("product_info_index")
+
+    run_and_crash(store_path, """
+        service.remove_documents(["p0"], "product_info_index")
+        service.flush()
+    """)
+
+    assert listed_doc_ids(service, "product_info_index") == ["p1"]
+    assert service.get_vector_store("product_info_index") is not before
@@ -0,0 +1,65 @@
+"""Tests for removing documents from the vector stores."""
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.vector_store import VectorStoreService
+from tests.conftest import NoDocumentEmbeddings
+
+
+def products(count, prefix="p"):
+    return [
+        Document(page_content=f"product {prefix}{i}", metadata={"doc_id": f"{prefix}{i}"})
+        for i in range(count)
+    ]
+
+
+def listed_doc_ids(service, store_name="product_info_index"):
+    return sorted(
+        doc.metadata["doc_id"] for doc in service.get_all_documents(store_name)
+        if "doc_id" in doc.metadata
+    )
+
+
+def stored_vectors(service, doc_ids, store_name="product_info_index"):
+    ids = {doc_id: service.find_ids(store_name, "doc_id", doc_id)[0] for doc_id in doc_ids}
+    vectors = service.get_vectors(store_name, list(ids.values()))
+    return {doc_id: vectors[store_id] for doc_id, store_id in ids.items()}
+
+
+def test_remove_keeps_other_vectors_without_re_embedding(store_path, embeddings):
+    VectorStoreService(embeddings).add_documents(products(10), "product_info_index")
+    service = VectorStoreService(NoDocumentEmbeddings(size=16))
+    kept = [f"p{i}" for i in range(10) if i % 3]
+    before = stored_vectors(service, kept)
+
+    removed = service.remove_documents(["p0", "p3", "p6", "p9", "missing"], "product_info_index")
+
+    assert removed == 4
+    assert listed_doc_ids(service) == sorted(kept)
+    after = stored_vectors(service, kept)
+    assert all(np.array_equal(before[doc_id], after[doc_id]) for doc_id in kept)
+    store = service.get_vector_store("product_info_index")
+    assert store.index.ntotal == len(store.index_to_docstore_id) == len(kept) + 1
+
+
+def test_removed_documents_are_not_found(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(5), "product_info_index")
+
+    service.remove_documents(["p2"], "product_info_index")
+
+    hits = service.search_documents("product p2", "product_info_index", k=10)
+    assert "p2" not in {doc.metadata.get("doc_id") for doc in hits}
+    assert service.find_ids("product_info_index", "doc_id", "p2") == []
+    assert service.keyword_search("p2", "product_info_index") == []
+
+
+def test_removal_survives_reload(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(5), "product_info_index")
+    service.remove_documents(["p1", "p4"], "product_info_index")
+    service.flush()
+
+    service.invalidate()
+
+    assert listed_doc_ids(VectorStoreService(NoDocumentEmbeddings(size=16))) == ["p0", "p2", "p3"]
@@ -0,0 +1,141 @@
+"""Tests for the write-ahead journal and checkpoints of the vector store."""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from langchain_core.documents import Document
+
+from src.services import vector_store
+from src.services.mutation_journal import JOURNAL_FILE
+from src.services.vector_store import VectorStoreService
+from tests.conftest import NoDocumentEmbeddings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def products(count, prefix="p"):
+    return [
+        Document(page_content=f"product {prefix}{i}", metadata={"doc_id": f"{prefix}{i}"})
+        for i in range(count)
+    ]
+
+
+def listed_doc_ids(service, store_name):
+    return sorted(
+        doc.metadata["doc_id"] for doc in service.get_all_documents(store_name)
+        if "doc_id" in doc.metadata
+    )
+
+
+def reopen(store_path):
+    """Forget every loaded store, as a restarted process would"""
+    vector_store._store_cache.clear()
+    return VectorStoreService(NoDocumentEmbeddings(size=16))
+
+
+def run_and_crash(store_path, body):
+    """Run body in a child process that exits without any cleanup, like a killed server"""
+    script = textwrap.dedent("""
+        import os, sys
+        from langchain_core.documents import Document
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from src.config.config import Config
+        from src.services.vector_store import VectorStoreService
+        Config.VECTOR_STORE_PATH = sys.argv[1]
+        Config.JOURNAL_FLUSH_INTERVAL = 3600
+        service = VectorStoreService(DeterministicFakeEmbedding(size=16))
+    """) + textwrap.dedent(body) + "\nos._exit(0)\n"
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    subprocess.run([sys.executable, "-c", script, str(store_path)], cwd=BACKEND_DIR, env=env, check=True)
+
+
+def test_journal_is_replayed_after_crash(store_path):
+    run_and_crash(store_path, """
+        service.add_documents([Document(page_content=f"product p{i}", metadata={"doc_id": f"p{i}"})
+                               for i in range(5)], "product_info_index")
+        service.remove_documents(["p1"], "product_info_index")
+    """)
+    assert os.path.getsize(store_path / "product_info_index" / JOURNAL_FILE) > 0
+
+    service = reopen(store_path)
+    assert listed_doc_ids(service, "product_info_index") == ["p0", "p2", "p3", "p4"]
+    assert service.find_ids("product_info_index", "doc_id", "p1") == []
+
+
+def test_torn_journal_tail_is_discarded(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+    journal_path = store_path / "product_info_index" / JOURNAL_FILE
+    complete_size = os.path.getsize(journal_path)
+    with open(journal_path, "ab") as f:
+        f.write(b'{"op": "add", "ids": ["torn"')
+
+    service = reopen(store_path)
+    assert listed_doc_ids(service, "product_info_index") == ["p0", "p1", "p2"]
+    assert os.path.getsize(journal_path) == complete_size
+
+    VectorStoreService(embeddings).add_documents(products(1, prefix="q"), "product_info_index")
+    assert listed_doc_ids(reopen(store_path), "product_info_index") == ["p0", "p1", "p2", "q0"]
+
+
+def test_checkpoint_compacts_journal(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(4), "product_info_index")
+    service.remove_documents(["p0"], "product_info_index")
+    journal_path = store_path / "product_info_index" / JOURNAL_FILE
+    assert os.path.getsize(journal_path) > 0
+
+    service.flush("product_info_index")
+    assert os.path.getsize(journal_path) == 0
+    assert not [name for name in os.listdir(store_path) if ".checkpoint-" in name]
+    assert listed_doc_ids(reopen(store_path), "product_info_index") == ["p1", "p2", "p3"]
+
+
+def test_checkpoint_keeps_writes_made_while_it_runs(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(2), "product_info_index")
+    write_snapshot = vector_store._write_snapshot
+
+    def write_snapshot_during_add(*args):
+        tmp_path = write_snapshot(*args)
+        service.add_documents(products(1, prefix="late"), "product_info_index")
+        return tmp_path
+
+    monkeypatch.setattr(vector_store, "_write_snapshot", write_snapshot_during_add)
+    service.flush("product_info_index")
+    monkeypatch.setattr(vector_store, "_write_snapshot", write_snapshot)
+
+    journal = list(service._get_entry("product_info_index").journal.read_from(0))
+    assert [record["documents"][0]["metadata"]["doc_id"] for record, _ in journal] == ["late0"]
+    assert listed_doc_ids(reopen(store_path), "product_info_index") == ["late0", "p0", "p1"]
+
+
+def test_interrupted_checkpoint_loses_nothing(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+
+    install_snapshot = vector_store._install_snapshot
+
+    def crash(store_path, tmp_path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vector_store, "_install_snapshot", crash)
+    with pytest.raises(OSError):
+        service.flush("product_info_index")
+    monkeypatch.setattr(vector_store, "_install_snapshot", install_snapshot)
+
+    assert listed_doc_ids(reopen(store_path), "product_info_index") == ["p0", "p1", "p2"]
+
+
+def test_crash_after_checkpoint_replays_only_later_records(store_path):
+    run_and_crash(store_path, """
+        service.add_documents([Document(page_content="product a", metadata={"doc_id": "a"})], "product_info_index")
+        service.flush("product_info_index")
+        service.add_documents([Document(page_content="product b", metadata={"doc_id": "b"})], "product_info_index")
+    """)
+
+    service = reopen(store_path)
+    assert listed_doc_ids(service, "product_info_index") == ["a", "b"]
+    assert len(service.find_ids("product_info_index", "doc_id", "a")) == 1
@@ -0,0 +1,143 @@
+"""Tests for snapshot reads and writer locking of the vector store."""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from src.services import vector_store
+from src.services.vector_store import VectorStoreService
+from tests.conftest import NoDocumentEmbeddings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def products(count, prefix="p"):
+    return [
+        Document(page_content=f"product {prefix}{i}", metadata={"doc_id": f"{prefix}{i}"})
+        for i in range(count)
+    ]
+
+
+def listed_doc_ids(service, store_name):
+    return sorted(
+        doc.metadata["doc_id"] for doc in service.get_all_documents(store_name)
+        if "doc_id" in doc.metadata
+    )
+
+
+def test_readers_do_not_wait_for_writers(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(3), "product_info_index")
+    copy_entry = vector_store._copy_entry
+    copying = threading.Event()
+    release = threading.Event()
+
+    def slow_copy_entry(entry):
+        copying.set()
+        assert release.wait(10)
+        return copy_entry(entry)
+
+    # Removals are applied to a copy of the store
+    monkeypatch.setattr(vector_store, "_copy_entry", slow_copy_entry)
+    writer = threading.Thread(target=service.remove_documents, args=(["p0"], "product_info_index"))
+    writer.start()
+    try:
+        assert copying.wait(10)
+        started = time.monotonic()
+        assert listed_doc_ids(service, "product_info_index") == ["p0", "p1", "p2"]
+        assert len(service.search_documents("product p1", "product_info_index", k=2)) == 2
+        assert time.monotonic() - started < 5
+    finally:
+        release.set()
+        writer.join(10)
+    monkeypatch.setattr(vector_store, "_copy_entry", copy_entry)
+
+    assert listed_doc_ids(service, "product_info_index") == ["p1", "p2"]
+
+
+def test_adds_are_appended_without_copying_the_store(store_path, embeddings, monkeypatch):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(500), "product_info_index")
+    index = service.get_vector_store("product_info_index").index
+    copies = []
+    copy_entry = vector_store._copy_entry
+    monkeypatch.setattr(vector_store, "_copy_entry", lambda entry: copies.append(entry) or copy_entry(entry))
+
+    for i in range(20):
+        service.add_documents(products(1, prefix=f"s{i}-"), "product_info_index")
+
+    assert copies == []
+    assert service.get_vector_store("product_info_index").index is index
+    assert len(listed_doc_ids(service, "product_info_index")) == 520
+
+
+def test_snapshot_stops_at_its_rows(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(2), "product_info_index")
+    snapshot = service._get_entry("product_info_index")
+    rows = snapshot.rows
+    vector = embeddings.embed_query("product q0")
+
+    service.add_documents(products(2, prefix="q"), "product_info_index")
+    service.remove_documents(["p0"], "product_info_index")
+
+    assert snapshot.rows == rows
+    assert snapshot.vector_store.index.ntotal > rows
+    hits = service._search_types(snapshot, vector, {None: 10})[None]
+    assert sorted(snapshot.metadata_index.field_value(store_id, "doc_id") or "" for store_id, _ in hits) == [
+        "", "p0", "p1"
+    ]
+    assert service._lookup(snapshot, None, "doc_id", "q0") == []
+    assert len(service._lookup(snapshot, None, "doc_id", "p0")) == 1
+    assert service._get_entry("product_info_index") is not snapshot
+
+
+def test_concurrent_writer_threads_lose_no_adds(store_path, embeddings):
+    service = VectorStoreService(embeddings)
+    threads = [
+        threading.Thread(
+            target=service.add_documents, args=(products(5, prefix=f"t{n}-"), "product_info_index")
+        )
+        for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    expected = sorted(f"t{n}-{i}" for n in range(4) for i in range(5))
+    assert listed_doc_ids(service, "product_info_index") == expected
+    vector_store._store_cache.clear()
+    assert listed_doc_ids(VectorStoreService(NoDocumentEmbeddings(size=16)), "product_info_index") == expected
+
+
+def test_concurrent_writer_processes_lose_no_adds(store_path):
+    script = textwrap.dedent("""
+        import sys
+        from langchain_core.documents import Document
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from src.config.config import Config
+        from src.services.vector_store import VectorStoreService
+        Config.VECTOR_STORE_PATH = sys.argv[1]
+        service = VectorStoreService(DeterministicFakeEmbedding(size=16))
+        for i in range(10):
+            doc_id = f"{sys.argv[2]}{i}"
+            service.add_documents([Document(page_content=f"product {doc_id}", metadata={"doc_id": doc_id})],
+                                  "product_info_index")
+        service.flush()
+    """)
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    writers = [
+        subprocess.Popen([sys.executable, "-c", script, str(store_path), prefix], cwd=BACKEND_DIR, env=env)
+        for prefix in ("a", "b")
+    ]
+    assert [writer.wait(120) for writer in writers] == [0, 0]
+
+    service = VectorStoreService(NoDocumentEmbeddings(size=16))
+    assert listed_doc_ids(service, "product_info_index") == sorted(
+        f"{prefix}{i}" for prefix in ("a", "b") for i in range(10)
+    )
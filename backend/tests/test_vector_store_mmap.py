@@ -0,0 +1,65 @@
+"""Tests for serving saved indexes memory-mapped."""
+import pytest
+from langchain_core.documents import Document
+
+from src.config.config import Config
+from src.services import vector_store
+from src.services.vector_store import VectorStoreService
+
+
+def products(count, prefix="p"):
+    return [
+        Document(page_content=f"product {prefix}{i}", metadata={"doc_id": f"{prefix}{i}"})
+        for i in range(count)
+    ]
+
+
+def listed_doc_ids(service):
+    return sorted(
+        doc.metadata["doc_id"] for doc in service.get_all_documents("product_info_index")
+        if "doc_id" in doc.metadata
+    )
+
+
+@pytest.fixture
+def saved(store_path, embeddings, monkeypatch):
+    """A checkpointed store, reopened with memory mapping on"""
+    service = VectorStoreService(embeddings)
+    service.add_documents(products(5), "product_info_index")
+    service.flush()
+    vector_store._store_cache.clear()
+    monkeypatch.setattr(Config, "INDEX_MMAP", True)
+    return VectorStoreService(embeddings)
+
+
+def test_checkpointed_store_is_mapped_and_searchable(saved):
+    hits = saved.search_documents("product p3", "product_info_index", k=1)
+
+    assert saved._get_entry("product_info_index").mapped
+    assert hits[0].metadata["doc_id"] == "p3"
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda service: service.add_documents(products(2, prefix="q"), "product_info_index"),
+    lambda service: service.remove_documents(["p1"], "product_info_index"),
+])
+def test_mutation_copies_the_index_into_memory(saved, mutate):
+    mutate(saved)
+
+    assert not saved._get_entry("product_info_index").mapped
+    expected = listed_doc_ids(saved)
+    saved.flush()
+    vector_store._store_cache.clear()
+    reloaded = VectorStoreService(saved.embeddings)
+    assert listed_doc_ids(reloaded) == expected
+    assert reloaded._get_entry("product_info_index").mapped
+
+
+def test_store_with_journaled_changes_loads_into_memory(saved):
+    saved.add_documents(products(1, prefix="q"), "product_info_index")
+    vector_store._store_cache.clear()
+
+    reloaded = VectorStoreService(saved.embeddings)
+
+    assert not reloaded._get_entry("product_info_index").mapped
+    assert "q0" in listed_doc_ids(reloaded)
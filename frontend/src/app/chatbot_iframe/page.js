@@ -31,15 +31,54 @@ export default function ChatbotPage() {
     setLoading(true);
 
     try {
-      const res = await fetch('http://localhost:5000/chatbot', {
+      const res = await fetch('http://localhost:5000/chatbot/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ query: currentQuery })
       });
-      
-      const result = await res.json();
-      const botMessage = { type: 'bot', content: result.response, isMarkdown: true };
-      setMessages(prev => [...prev, botMessage]);
+      if (!res.ok || !res.body) {
+        throw new Error(`Chatbot stream failed with status ${res.status}`);
+      }
+
+      // Read server-sent events and grow the bot message as tokens arrive
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
+
+      const appendToken = (token) => {
+        if (!started) {
+          started = true;
+          setLoading(false);
+          setMessages(prev => [...prev, { type: 'bot', content: token, isMarkdown: true }]);
+          return;
+        }
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+        });
+      };
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          let eventName = 'message';
+          let data = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event: ')) eventName = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+          if (eventName === 'error') throw new Error(payload.error);
+          if (eventName === 'message') appendToken(payload.token);
+        }
+      }
     } catch (err) {
       console.error('Error calling chatbot API:', err);
       const errorMessage = { 
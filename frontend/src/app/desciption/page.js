@@ -11,6 +11,7 @@ export default function DescriptionPage() {
   // State management
   const [descriptions, setDescriptions] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
   
   // Form state
   const [formData, setFormData] = useState({
@@ -24,21 +25,24 @@ export default function DescriptionPage() {
     fetchDescriptions();
   }, []);
 
-  // Fetch all descriptions
-  const fetchDescriptions = async () => {
+  // Fetch the first page of descriptions, or the page after cursor, which is appended
+  const fetchDescriptions = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await axios.get("http://localhost:5000/view-all-descriptions");
+      const response = await axios.get("http://localhost:5000/view-all-descriptions", {
+        params: cursor ? { cursor } : {}
+      });
       
       // Add unique client-side IDs if backend doesn't provide them
       const processedDescriptions = (response.data.descriptions || []).map((doc, index) => {
         return {
           ...doc,
-          clientId: `client-id-${index}-${Date.now()}` // Generate a unique client ID
+          clientId: `client-id-${cursor || 0}-${index}-${Date.now()}` // Generate a unique client ID
         };
       });
       
-      setDescriptions(processedDescriptions);
+      setDescriptions((previous) => (cursor ? [...previous, ...processedDescriptions] : processedDescriptions));
+      setNextCursor(response.data.next_cursor || null);
       
     } catch (error) {
       toast.error(error.response?.data?.error || "Failed to fetch descriptions");
@@ -372,9 +376,18 @@ export default function DescriptionPage() {
             <div className="mt-4 flex justify-between items-center">
               <div className="text-sm text-gray-500">
                 Showing {descriptions.length} description(s)
+                {nextCursor && (
+                  <button
+                    onClick={() => fetchDescriptions(nextCursor)}
+                    disabled={loading}
+                    className="ml-3 text-blue-600 hover:text-blue-800 disabled:opacity-50"
+                  >
+                    Load more
+                  </button>
+                )}
               </div>
               <button
-                onClick={fetchDescriptions}
+                onClick={() => fetchDescriptions()}
                 disabled={loading}
                 className="inline-flex items-center px-4 py-2 text-sm bg-blue-100 text-blue-700 rounded-md hover:bg-blue-200 focus:outline-none focus:ring-2 focus:ring-blue-400"
               >
@@ -15,20 +15,30 @@ export default function ProductsPage() {
   const [status, setStatus] = useState({ success: '', error: '' });
   const [isLoading, setIsLoading] = useState(false);
   const [isTableLoading, setIsTableLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // Fetch all products on component mount
   useEffect(() => {
     fetchProducts();
   }, []);
 
-  const fetchProducts = async () => {
-    setIsTableLoading(true);
+  // Fetch the first page of products, or the page after cursor, which is appended
+  const fetchProducts = async (cursor = null) => {
+    if (cursor) {
+      setIsLoadingMore(true);
+    } else {
+      setIsTableLoading(true);
+    }
     try {
-      const response = await fetch('http://localhost:5000/view-all-products');
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`http://localhost:5000/view-all-products${query}`);
       const data = await response.json();
       
       if (response.ok) {
-        setProducts(data.products || []);
+        const page = data.products || [];
+        setProducts((previous) => (cursor ? [...previous, ...page] : page));
+        setNextCursor(data.next_cursor || null);
       } else {
         console.error('Failed to fetch products:', data.error);
         setStatus({ ...status, error: data.error || 'Failed to fetch products' });
@@ -38,6 +48,7 @@ export default function ProductsPage() {
       setStatus({ ...status, error: 'Error connecting to server' });
     } finally {
       setIsTableLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
@@ -321,6 +332,17 @@ export default function ProductsPage() {
                         ))}
                       </tbody>
                     </table>
+                    {nextCursor && (
+                      <div className="mt-4 text-center">
+                        <button
+                          onClick={() => fetchProducts(nextCursor)}
+                          disabled={isLoadingMore}
+                          className="px-4 py-2 text-sm bg-blue-100 text-blue-700 rounded-md hover:bg-blue-200 transition disabled:opacity-50"
+                        >
+                          {isLoadingMore ? 'Loading...' : 'Load more products'}
+                        </button>
+                      </div>
+                    )}
                   </div>
                 )}
               </div>